@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""
+usage: benchmark.py [-h] [-b BASELINE] [--save-baseline] [-t TOLERANCE] [-r REPEAT] [-s STAGE] [-j JOBS] sources
+
+Times the build stages on a sources directory and checks for regressions.
+
+Every stage runs as its own process, REPEAT times. The fastest wall time and the
+lowest peak RSS of the runs are reported, the peak RSS includes the worker processes.
+The source cache of check.py (see libeli.cache) is removed before every run of a stage,
+except for check_cached, so the other stages are measured cold. The stages are
+
+    concat_geojson      concat_geojson.py, i.e. imagery.geojson
+    legacy_json         convert_geojson_to_legacyjson.py, i.e. imagery.json
+    convert_xml         convert_xml.py, i.e. imagery.xml
+    extract_i18n        extract_i18n.py, i.e. i18n/en.yaml
+    check               check.py
+    check_cached        check.py with the source cache of a previous run
+    build               build.py writing all artifacts at once
+    build_incremental   build.py with a manifest, with one source changed since the last build
+    build_simplify      build.py with --simplify, i.e. also the imagery.z*.geojson variants
+
+Before every run of build_incremental, a line break is appended to another source, so its
+content hash changes and it is rendered again. The sources are restored afterwards.
+
+Regardless of the baseline, build_simplify regressed if it takes more than three times as
+long as build, e.g. as computing the deviations of the simplified variants got slow.
+
+With --baseline, the results are compared to the stored baseline. A stage regressed if
+its wall time or peak RSS exceeds the baseline by more than TOLERANCE, 20% by default,
+and the exit status is 1. With --save-baseline, the results are stored as baseline instead.
+
+Suggested way of running:
+
+find sources -name \*.geojson | xargs python scripts/generate_corpus.py -n 50000 -o /tmp/eli-corpus/sources
+python scripts/benchmark.py -b benchmark-baseline.json /tmp/eli-corpus/sources
+
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from libeli import jsonio
+from libeli.cache import default_cache_path
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    options: List[str] = field(default_factory=list)
+    # Whether the script takes the number of processes with -j
+    parallel: bool = True
+    # Run once before timing, e.g. to write the build manifest
+    warmup: bool = False
+    # Keep the source cache between runs instead of removing it before every run
+    cached: bool = False
+    # Change the content of another source before every run
+    change_source: bool = False
+    # The wall time may be at most max_ratio times the wall time of the stage reference
+    reference: Optional[str] = None
+    max_ratio: float = 0.0
+
+
+STAGES = [
+    Stage("concat_geojson", "concat_geojson.py"),
+    Stage("legacy_json", "convert_geojson_to_legacyjson.py"),
+    Stage("convert_xml", "convert_xml.py"),
+    Stage("extract_i18n", "extract_i18n.py", parallel=False),
+    Stage("check", "check.py", parallel=False),
+    Stage("check_cached", "check.py", parallel=False, warmup=True, cached=True),
+    Stage("build", "build.py", ["-o", "build"]),
+    Stage("build_incremental", "build.py", ["-o", "build", "-m", "manifest.sqlite"], warmup=True, change_source=True),
+    Stage("build_simplify", "build.py", ["-o", "build", "--simplify"], reference="build", max_ratio=3.0),
+]
+
+parser = ArgumentParser(description="Times the build stages on a sources directory and checks for regressions")
+parser.add_argument("sources", help="The sources directory, e.g. written by generate_corpus.py.")
+parser.add_argument("-b", "--baseline", help="Path of the baseline to compare to.")
+parser.add_argument("--save-baseline", action="store_true", help="Store the results as baseline instead.")
+parser.add_argument(
+    "-t", "--tolerance", type=float, default=0.2, help="Allowed regression as a fraction, 0.2 by default."
+)
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs per stage, 3 by default.")
+parser.add_argument(
+    "-s",
+    "--stage",
+    action="append",
+    choices=[stage.name for stage in STAGES],
+    help="Stage to run, can be given multiple times. Defaults to all stages.",
+)
+parser.add_argument(
+    "-j", "--jobs", type=int, help="Number of processes of the stages, defaults to the number of CPUs."
+)
+arguments = parser.parse_args()
+
+
+def run(argv: List[str], workdir: str) -> Optional[Dict[str, float]]:
+    """Runs a script of this directory and measures its wall time and peak RSS"""
+    stderr_path = os.path.join(workdir, "stderr.txt")
+    with io.open(stderr_path, "wb") as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS, argv[0])] + argv[1:],
+            cwd=workdir,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        # wait4 instead of wait, as it returns the resource usage of the stage alone
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        with io.open(stderr_path, "r", encoding="utf-8", errors="replace") as f:
+            print(f"{argv[0]} failed with exit status {process.returncode}:\n{f.read()[-2000:]}")
+        return None
+    # ru_maxrss is the maximum of the stage and its worker processes, in KiB
+    return {"wall_time": wall_time, "peak_rss": rusage.ru_maxrss * 1024}
+
+
+def clear_cache(workdir: str) -> None:
+    """Removes the source cache the scripts write in workdir"""
+    cache_path = default_cache_path()
+    if cache_path is not None and os.path.exists(os.path.join(workdir, cache_path)):
+        os.remove(os.path.join(workdir, cache_path))
+
+
+def benchmark(stage: Stage, paths: List[str], paths_file: str, workdir: str) -> Optional[Dict[str, float]]:
+    argv = [stage.script] + stage.options
+    if stage.parallel and arguments.jobs:
+        argv += ["-j", str(arguments.jobs)]
+    argv.append(paths_file)
+    clear_cache(workdir)
+    if stage.warmup and run(argv, workdir) is None:
+        return None
+    runs = []
+    # Original content of the changed sources
+    originals: Dict[str, bytes] = {}
+    try:
+        for i in range(arguments.repeat):
+            if not stage.cached:
+                clear_cache(workdir)
+            if stage.change_source:
+                path = paths[i * len(paths) // arguments.repeat]
+                with io.open(path, "rb") as f:
+                    data = f.read()
+                originals.setdefault(path, data)
+                with io.open(path, "wb") as f:
+                    f.write(data + b"\n")
+            result = run(argv, workdir)
+            if result is None:
+                return None
+            runs.append(result)
+    finally:
+        for path, data in originals.items():
+            with io.open(path, "wb") as f:
+                f.write(data)
+    return {
+        "wall_time": min(result["wall_time"] for result in runs),
+        "peak_rss": min(result["peak_rss"] for result in runs),
+    }
+
+
+def compare(name: str, result: Dict[str, float], baseline: Dict[str, Any]) -> List[str]:
+    """Regressions of result against the baseline of the stage"""
+    regressions = []
+    for metric in ["wall_time", "peak_rss"]:
+        if metric in baseline and result[metric] > baseline[metric] * (1 + arguments.tolerance):
+            change = result[metric] / baseline[metric] - 1
+            regressions.append(f"{name}: {metric} regressed by {change:.0%}")
+    return regressions
+
+
+paths = sorted(
+    os.path.abspath(os.path.join(directory, filename))
+    for directory, _, filenames in os.walk(arguments.sources)
+    for filename in filenames
+    if filename.endswith(".geojson")
+)
+baseline: Dict[str, Any] = {}
+if arguments.baseline and not arguments.save_baseline and os.path.exists(arguments.baseline):
+    baseline = jsonio.load(arguments.baseline)
+    if baseline.get("sources") != len(paths):
+        print(f"Baseline was measured with {baseline.get('sources')} sources, this run has {len(paths)}")
+
+stages = [stage for stage in STAGES if arguments.stage is None or stage.name in arguments.stage]
+results: Dict[str, Dict[str, float]] = {}
+failed: List[str] = []
+regressions: List[str] = []
+workdir = tempfile.mkdtemp(prefix="eli-benchmark-")
+try:
+    # The source paths are passed as argument file, a large corpus exceeds the command line limit
+    paths_file = os.path.join(workdir, "paths.txt")
+    with io.open(paths_file, "w", encoding="utf-8") as f:
+        f.write("".join(f"{path}\n" for path in paths))
+    # check.py reads the schema from its working directory
+    shutil.copy(os.path.join(SCRIPTS, "..", "schema.json"), workdir)
+
+    print(f"{'stage':<20}{'wall time':>12}{'peak RSS':>12}{'baseline':>12}{'baseline RSS':>14}")
+    for stage in stages:
+        result = benchmark(stage, paths, "@" + paths_file, workdir)
+        if result is None:
+            failed.append(stage.name)
+            continue
+        results[stage.name] = result
+        stage_baseline = baseline.get("stages", {}).get(stage.name, {})
+        regressions += compare(stage.name, result, stage_baseline)
+        if stage.reference in results:
+            ratio = result["wall_time"] / results[stage.reference]["wall_time"]
+            if ratio > stage.max_ratio:
+                regressions.append(f"{stage.name}: took {ratio:.1f} times as long as {stage.reference}")
+        line = f"{stage.name:<20}{result['wall_time']:>11.2f}s{result['peak_rss'] / 2**20:>9.0f} MiB"
+        if stage_baseline:
+            line += f"{stage_baseline['wall_time']:>11.2f}s{stage_baseline['peak_rss'] / 2**20:>11.0f} MiB"
+        print(line)
+finally:
+    shutil.rmtree(workdir)
+
+if arguments.baseline and arguments.save_baseline:
+    with io.open(arguments.baseline, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps_pretty({"sources": len(paths), "stages": results}, sort_keys=True))
+        f.write("\n")
+    print(f"Stored baseline in {arguments.baseline}")
+
+for regression in regressions:
+    print(regression)
+if failed:
+    print(f"Failed stages: {', '.join(failed)}")
+if regressions or failed:
+    sys.exit(1)
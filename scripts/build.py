@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+"""
+usage: build.py [-h] [-o OUTDIR] [-m MANIFEST] [-j JOBS] [--jsonl] [--shards] [--simplify] [--localize]
+                [--i18n-catalog] [--translations DIR] [--coverage] [--flat-index] [--sqlite]
+                [--deltas] [--shared-geometry] [--topology] [--compress] [--profile REPORT]
+                path [path ...]
+
+Builds imagery.geojson, imagery.json, imagery.xml and i18n/en.yaml in a single pass.
+
+Each source is parsed only once and serialized into fragments for every artifact,
+which are then joined to the artifacts. The artifacts are identical to the ones
+written by concat_geojson.py, convert_geojson_to_legacyjson.py, convert_xml.py and
+extract_i18n.py.
+
+With --manifest the content hashes and fragments of all sources are kept in a
+SQLite manifest database. Subsequent builds only parse and serialize sources which
+were added or changed since, splice them into the artifacts and only write their rows
+to the manifest.
+
+Sources are parsed and serialized in a pool of JOBS processes, by default one per CPU.
+
+With --jsonl, imagery.jsonl is written as well. It contains the features of
+imagery.geojson as JSON Lines, so consumers can read it line by line.
+
+With --shards, the sources are split into shards/world.geojson,
+shards/<continent>.geojson and shards/<continent>/<country>.geojson following the
+layout of the sources directory. shards/index.json maps every shard to its bbox,
+country codes and content hash, so clients can fetch only the shards of their region.
+
+With --simplify, imagery.z4.geojson, imagery.z8.geojson and imagery.z12.geojson
+contain the features with geometries simplified for display at these zoom levels.
+Every feature records the maximum deviation from the full geometry, see
+libeli.simplify.simplify_source.
+
+With --localize, localized/<language>.json is written for every translation file in
+the --translations directory (i18n by default). It maps the ids of the sources
+translated into the language to their properties with translated name, description
+and attribution text. The geometries stay in imagery.geojson. Languages are rendered
+in parallel. With --manifest, a language is only rendered again if its translation
+file or its translated sources changed, see libeli.localize.write_localized.
+
+With --i18n-catalog, all translation files are compiled into the binary catalog
+imagery.i18n.bin, which libeli.translations.TranslationCatalog looks up via mmap
+without parsing anything up front. It is only compiled again if a translation file
+changed.
+
+With --coverage, imagery.coverage.json maps tiles at the zoom levels of
+libeli.coverage.COVERAGE_ZOOMS to the sources available for them, best first, then
+newest, then with the highest max_zoom. Tiles are grouped into runs of equal sources per
+row, so libeli.coverage.CoverageIndex answers a lookup with a hash lookup of the row.
+Tiles above the highest of these zooms get the sources of their parent tile as candidates.
+The tiles of every source are kept in the manifest, see libeli.tiles.source_tiles.
+
+With --flat-index, the features of imagery.geojson are also encoded into the binary
+imagery.flat.bin. It holds a packed Hilbert R-tree of the feature bboxes, the properties
+column-wise and the coordinates as delta encoded integers. libeli.flatindex.FlatIndex
+maps it into memory and only decodes the features a bbox query finds.
+
+With --sqlite, imagery.sqlite holds a row per source with indexes on type, country_code,
+category, start_date, end_date and the URL host, the available projections of the sources
+and an R-tree of their bboxes, see libeli.database.write_database.
+
+With --deltas, deltas/<from>-<to>.json lists the features added, removed and changed
+since the previous build, keyed by their id, so clients holding a previous imagery.geojson
+fetch only the changes. deltas/index.json chains the deltas of the last builds by the
+SHA-256 of imagery.geojson, see libeli.delta.write_deltas. The deltas only chain if the
+output directory is kept between builds.
+
+With --shared-geometry, imagery.shared.geojson holds the features of imagery.geojson with
+every distinct geometry stored only once. Geometries are identified by the hash of their
+normalized WKB, which is kept in the manifest, and features refer to them by geometry_ref,
+see libeli.sharedgeometry.write_shared_geojson. imagery.geojson stays the fallback for
+clients not resolving the references.
+
+With --topology, imagery.topo.json holds the geometries of all sources as a TopoJSON
+topology. Boundaries shared by neighbouring sources are stored only once as arcs of delta
+encoded positions, quantized to the precision of the sources, so no position moves.
+libeli.topology.Topology rebuilds the features of single sources on demand.
+
+The generated timestamp is derived from the sources (see libeli.publish.sources_timestamp),
+so the artifacts only change if the sources change. With --compress, .gz and .br
+siblings of the artifacts and imagery.manifest.json with the content hash of the
+sources and the SHA-256 and size of every artifact are written as well.
+
+With --profile, the time spent in every stage of the build and in every stage of
+the added or changed sources is written as JSON to REPORT, and a summary with the
+slowest sources and the sources with most vertices is printed, see libeli.profiling.
+
+Suggested way of running:
+
+find sources -name \*.geojson | LC_ALL=C sort | xargs python scripts/build.py -m .eli-build/manifest.sqlite
+
+"""
+
+import io
+import os
+from argparse import ArgumentParser
+
+from libeli import (
+    artifacts,
+    coverage,
+    database,
+    delta,
+    flatindex,
+    localize,
+    publish,
+    shards,
+    sharedgeometry,
+    simplify,
+    topology,
+    translations,
+)
+from libeli.manifest import BuildManifest
+from libeli.profiling import Profile, timed
+
+parser = ArgumentParser(description="Builds all ELI artifacts in a single pass", fromfile_prefix_chars="@")
+parser.add_argument("path", nargs="+", help="Path of source files to include.")
+parser.add_argument("-o", "--outdir", default=".", help="Directory to write the artifacts to.")
+parser.add_argument("-m", "--manifest", help="Path of the build manifest used for incremental builds.")
+parser.add_argument("-j", "--jobs", type=int, help="Number of processes, defaults to the number of CPUs.")
+parser.add_argument("--jsonl", action="store_true", help="Also write imagery.jsonl with one feature per line.")
+parser.add_argument("--shards", action="store_true", help="Also write per-continent and per-country shards.")
+parser.add_argument("--simplify", action="store_true", help="Also write simplified imagery.z*.geojson variants.")
+parser.add_argument("--localize", action="store_true", help="Also write localized/<language>.json per translation.")
+parser.add_argument("--i18n-catalog", action="store_true", help="Also write the imagery.i18n.bin translation catalog.")
+parser.add_argument("--coverage", action="store_true", help="Also write the imagery.coverage.json tile index.")
+parser.add_argument("--flat-index", action="store_true", help="Also write the imagery.flat.bin binary index.")
+parser.add_argument("--sqlite", action="store_true", help="Also write the imagery.sqlite database.")
+parser.add_argument("--deltas", action="store_true", help="Also write deltas/ against the previous builds.")
+parser.add_argument(
+    "--shared-geometry", action="store_true", help="Also write imagery.shared.geojson with shared geometries."
+)
+parser.add_argument("--topology", action="store_true", help="Also write the imagery.topo.json TopoJSON topology.")
+parser.add_argument("--translations", metavar="DIR", default="i18n", help="Directory of the translation files.")
+parser.add_argument(
+    "--compress",
+    action="store_true",
+    help="Also write compressed artifacts and the imagery.manifest.json artifact manifest.",
+)
+parser.add_argument("--profile", metavar="REPORT", help="Write a profile of the build to REPORT.")
+arguments = parser.parse_args()
+
+
+def output_path(filename: str) -> str:
+    path = os.path.join(arguments.outdir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def write_text(filename: str, text: str) -> None:
+    with io.open(output_path(filename), "w", encoding="utf-8") as f:
+        f.write(text)
+        f.write("\n")
+
+
+profile = Profile() if arguments.profile else None
+simplify_zooms = simplify.SIMPLIFICATION_ZOOMS if arguments.simplify else ()
+coverage_zooms = coverage.COVERAGE_ZOOMS if arguments.coverage else ()
+with timed(profile, "load_manifest"):
+    manifest = BuildManifest(arguments.manifest, simplify_zooms, coverage_zooms)
+update = manifest.update(arguments.path, arguments.jobs, profile)
+if arguments.manifest is not None:
+    print(f"Build manifest: {update}")
+fragments = manifest.fragments(arguments.path)
+with timed(profile, "generated"):
+    generated = artifacts.format_generated(publish.sources_timestamp(arguments.path))
+
+with timed(profile, "write_geojson"), io.open(output_path("imagery.geojson"), "w", encoding="utf-8") as f:
+    artifacts.write_geojson((fragment.geojson for fragment in fragments), f, generated)
+    f.write("\n")
+if arguments.jsonl:
+    with timed(profile, "write_jsonl"), io.open(output_path("imagery.jsonl"), "w", encoding="utf-8") as f:
+        artifacts.write_geojson_lines((fragment.geojson for fragment in fragments), f)
+with timed(profile, "write_json"):
+    write_text("imagery.json", artifacts.join_json(fragments))
+with timed(profile, "write_xml"), io.open(output_path("imagery.xml"), "wb") as f:
+    f.write(artifacts.join_xml(fragments))
+with timed(profile, "write_i18n"):
+    write_text(os.path.join("i18n", "en.yaml"), artifacts.join_i18n(fragments))
+for zoom, filename in zip(simplify_zooms, simplify.simplified_filenames(simplify_zooms)):
+    with timed(profile, "write_simplified"), io.open(output_path(filename), "w", encoding="utf-8") as f:
+        features = (fragment.simplified[str(zoom)] for fragment in fragments)
+        artifacts.write_geojson(features, f, generated, simplify.simplified_meta(zoom))
+        f.write("\n")
+
+shard_index = None
+if arguments.shards:
+    with timed(profile, "write_shards"):
+        shard_index = shards.write_shards(output_path("shards"), arguments.path, fragments, generated)
+
+localized_index = None
+if arguments.localize:
+    # Incremental like the other artifacts, if there is a build manifest
+    localized_state = None
+    if arguments.manifest is not None:
+        localized_state = os.path.join(os.path.dirname(arguments.manifest), "localized.json")
+    with timed(profile, "write_localized"):
+        localized_index, rendered = localize.write_localized(
+            output_path("localized"), arguments.translations, fragments, generated, arguments.jobs, localized_state
+        )
+    print(f"Localized artifacts: {len(rendered)} of {len(localized_index['languages'])} languages rendered")
+
+if arguments.i18n_catalog:
+    with timed(profile, "write_i18n_catalog"):
+        translations.write_catalog(output_path("imagery.i18n.bin"), arguments.translations, arguments.jobs)
+
+if arguments.coverage:
+    with timed(profile, "write_coverage"):
+        coverage_index = coverage.build_coverage(fragments, generated, coverage_zooms)
+        coverage.write_coverage(output_path(coverage.COVERAGE_FILENAME), coverage_index)
+
+if arguments.flat_index:
+    with timed(profile, "write_flat_index"):
+        flatindex.write_flat_index(output_path(flatindex.FLAT_INDEX_FILENAME), fragments, generated, arguments.jobs)
+
+if arguments.sqlite:
+    with timed(profile, "write_sqlite"):
+        database.write_database(output_path(database.DATABASE_FILENAME), fragments, generated)
+
+if arguments.shared_geometry:
+    with timed(profile, "write_shared_geometry"):
+        shared_path = output_path(sharedgeometry.SHARED_GEOMETRY_FILENAME)
+        shared = sharedgeometry.write_shared_geometry(shared_path, fragments, generated)
+    print(f"Shared geometries: {shared['geometries']} geometries for {shared['features']} features")
+
+if arguments.topology:
+    with timed(profile, "write_topology"):
+        topology.write_topology(output_path(topology.TOPOLOGY_FILENAME), fragments, generated)
+
+delta_index = None
+if arguments.deltas:
+    with timed(profile, "write_deltas"):
+        delta_index = delta.write_deltas(output_path("deltas"), output_path("imagery.geojson"), fragments, generated)
+
+if arguments.compress:
+    filenames = ["imagery.geojson", "imagery.json", "imagery.xml"]
+    if arguments.jsonl:
+        filenames.append("imagery.jsonl")
+    filenames += simplify.simplified_filenames(simplify_zooms)
+    if arguments.i18n_catalog:
+        filenames.append("imagery.i18n.bin")
+    if arguments.coverage:
+        filenames.append(coverage.COVERAGE_FILENAME)
+    if arguments.flat_index:
+        filenames.append(flatindex.FLAT_INDEX_FILENAME)
+    if arguments.sqlite:
+        filenames.append(database.DATABASE_FILENAME)
+    if arguments.shared_geometry:
+        filenames.append(sharedgeometry.SHARED_GEOMETRY_FILENAME)
+    if arguments.topology:
+        filenames.append(topology.TOPOLOGY_FILENAME)
+    if delta_index is not None:
+        filenames += [f"deltas/{entry['path']}" for entry in delta_index["deltas"]]
+    if shard_index is not None:
+        filenames += [f"shards/{shard['path']}" for shard in shard_index["shards"].values()]
+    if localized_index is not None:
+        filenames += [f"localized/{language['path']}" for language in localized_index["languages"].values()]
+    sources_hash = publish.content_hash(manifest.source_hashes(arguments.path))
+    with timed(profile, "publish"):
+        publish.publish(arguments.outdir, filenames, generated, sources_hash, arguments.jobs)
+
+with timed(profile, "save_manifest"):
+    manifest.save()
+
+if profile is not None:
+    print(profile.write(arguments.profile))
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 
 """
-usage: check.py [-h] [-v] path [path ...]
+usage: check.py [-h] [-v] [--profile REPORT] path [path ...]
 
 Checks ELI sourcen for validity and common errors
 
@@ -12,6 +12,9 @@ Adding -v increases log verbosity for each occurrence:
     check.py -vv foo.geojson shows debug messages too
     etc.
 
+With --profile, the time spent decoding, validating against the schema and checking
+the geometry of every source is written as JSON to REPORT, and a summary is printed.
+
 Suggested way of running:
 
 find sources -name \*.geojson | xargs python scripts/check.py -vv
@@ -21,27 +24,16 @@ find sources -name \*.geojson | xargs python scripts/check.py -vv
 import io
 import json
 import os
-import warnings
 from argparse import ArgumentParser
+from functools import partial
 
 import colorlog
-from jsonschema import Draft4Validator, RefResolver, ValidationError
-from shapely.geometry import shape
-from shapely.validation import explain_validity
-
-
-def dict_raise_on_duplicates(ordered_pairs):
-    """Reject duplicate keys."""
-    d = {}
-    for k, v in ordered_pairs:
-        if k in d:
-            raise ValidationError("duplicate key: %r" % (k,))
-        else:
-            d[k] = v
-    return d
+from jsonschema import ValidationError
+from libeli.cache import SourceCache, default_cache_path
+from libeli.checks import SourceChecker
+from libeli.profiling import Profile, SourceProfile, StageTimer, count_vertices, timed
 
-
-parser = ArgumentParser(description="Checks ELI sourcen for validity and common errors")
+parser = ArgumentParser(description="Checks ELI sourcen for validity and common errors", fromfile_prefix_chars="@")
 parser.add_argument("path", nargs="+", help="Path of files to check.")
 parser.add_argument(
     "-v",
@@ -51,6 +43,7 @@ parser.add_argument(
     default=0,
     help="increases log verbosity for each occurence.",
 )
+parser.add_argument("--profile", metavar="REPORT", help="Write a profile of the check to REPORT.")
 
 arguments = parser.parse_args()
 logger = colorlog.getLogger()
@@ -61,16 +54,14 @@ handler.setFormatter(colorlog.ColoredFormatter())
 logger.addHandler(handler)
 
 schema = json.load(io.open("schema.json", encoding="utf-8"))
-seen_ids = set()
-
-resolver = RefResolver("", None)
-validator = Draft4Validator(schema, resolver=resolver)
+checker = SourceChecker(schema)
+cache = SourceCache(default_cache_path())
 
 borkenbuild = False
-spacesave = 0
 
 headers = {"User-Agent": "Mozilla/5.0 (compatible; MSIE 6.0; OpenStreetMap Editor Layer Index CI check)"}
 
+profile = Profile() if arguments.profile else None
 tested_sources_count = 0
 for filename in arguments.path:
 
@@ -85,125 +76,29 @@ for filename in arguments.path:
     if ":" in filename:
         raise ValidationError(f"Filename contains invalid \":\" character: {filename}")
 
+    timer = StageTimer() if profile is not None else None
     try:
-        ## dict_raise_on_duplicates raises error on duplicate keys in geojson
-        source = json.load(io.open(filename, encoding="utf-8"), object_pairs_hook=dict_raise_on_duplicates)
+        ## The cache raises an error on duplicate keys in geojson
+        with timed(timer, "decode"):
+            source = cache.load(filename)
     except Exception as e:
         logger.exception(f"Could not parse file: {filename}: {e}")
         raise ValidationError(f"Could not parse file: {filename}: {e}")
 
     try:
-
-        ## dict_raise_on_duplicates raises error on duplicate keys in geojson
-        source = json.load(io.open(filename, encoding="utf-8"), object_pairs_hook=dict_raise_on_duplicates)
-
-        ## jsonschema validate
-        validator.validate(source, schema)
-        sourceid = source["properties"]["id"]
-        if sourceid in seen_ids:
-            raise ValidationError("Id %s used multiple times" % sourceid)
-        seen_ids.add(sourceid)
-
-        ## {z} instead of {zoom}
-        if "{z}" in source["properties"]["url"]:
-            raise ValidationError("{z} found instead of {zoom} in tile url")
-
-        ## Check for license url. Too many missing to mark as required in schema.
-        if "license_url" not in source["properties"]:
-            logger.debug("{} has no license_url".format(filename))
-
-        if "attribution" not in source["properties"]:
-            logger.debug("{} has no attribution".format(filename))
-
-        ## Check for big fat embedded icons
-        if "icon" in source["properties"]:
-            if source["properties"]["icon"].startswith("data:"):
-                iconsize = len(source["properties"]["icon"].encode("utf-8"))
-                spacesave += iconsize
-                warnings.warn(f"{filename} icon should be disembedded to save {round(iconsize/1024.0, 2)} KB")
-
-        ## Validate that url has the tokens we expect
-        params = []
-
-        ### tms
-        if source["properties"]["type"] == "tms":
-            if "max_zoom" in source["properties"]:
-                if source["properties"]["max_zoom"] == 20:
-                    logger.warning(f"Useless max_zoom parameter in {filename}")
-            if "available_projections" in source["properties"]:
-                warnings.warn(f"Senseless available_projections parameter in {filename}")
-            if "min_zoom" in source["properties"]:
-                if source["properties"]["min_zoom"] == 0:
-                    logger.warning(f"Useless min_zoom parameter in {filename}")
-            params = ["{zoom}", "{x}", "{y}"]
-
-        ### wms: {proj}, {bbox}, {width}, {height}
-        elif source["properties"]["type"] == "wms":
-            if not "available_projections" in source["properties"]:
-                raise ValidationError(f"Missing available_projections parameter in {filename}")
-            params = ["{proj}", "{bbox}", "{width}", "{height}"]
-
-        ### wmts:
-        if source["properties"]["type"] == "wmts":
-            for tms_url_parameter in ["{zoom}", "{x}", "{y}", "{-y}"]:
-                if tms_url_parameter in source["properties"]["url"]:
-                    raise ValidationError(f"wmts URL should not contain tms parameter {tms_url_parameter} in URL")
-            if not "available_projections" in source["properties"]:
-                raise ValidationError(f"Missing available_projections parameter in {filename}")
-            if (
-                "available_projections" in source["properties"]
-                and "EPSG:3857" in source["properties"]["available_projections"]
-            ):
-                logger.warning(f"WMTS source supports EPSG:3857, could this be tms? {filename}")
-
-        missingparams = [x for x in params if x not in source["properties"]["url"].replace("{-y}", "{y}")]
-        if missingparams:
-            raise ValidationError("Missing parameter in {}: {}".format(filename, missingparams))
-
-        # Check for double brackets
-        if "{{" in source["properties"]["url"] or "}}" in source["properties"]["url"]:
-            raise ValidationError(f"{filename}: Double {{{{ or }}}} in URL: {source['properties']['url']}")
-
-        # If we're not global we must have a geometry.
-        # The geometry itself is validated by jsonschema
-        if "world" not in filename:
-            if not "type" in source["geometry"]:
-                raise ValidationError("{} should have a valid geometry or be global".format(filename))
-            if source["geometry"]["type"] not in {"Polygon", "MultiPolygon"}:
-                raise ValidationError("{} should have a Polygon or MultiPolygon geometry".format(filename))
-            if not "country_code" in source["properties"]:
-                raise ValidationError("{} should have a country or be global".format(filename))
-
-            geom = shape(source["geometry"])
-             # Check validity of geometries
-            if not geom.is_valid:
-                raise ValidationError(f"{filename} geometry is not valid: {explain_validity(geom)}")
-
-            min_lon, min_lat, max_lon, max_lat = geom.bounds
-            within_bounds = True
-            for lon in [min_lon, max_lon]:
-                if lon < -180.0 or lon > 180.0:
-                    within_bounds = False
-            for lat in [min_lat, max_lat]:
-                if lat < -90.0 or lat > 90.0:
-                    within_bounds = False
-            if not within_bounds:
-                raise ValidationError(
-                    "{} contains invalid coordinates.: Geometry extent: {}"
-                    "".format(filename, ",".join(map(str, [min_lon, min_lat, max_lon, max_lat])))
-                )
-        else:
-            if "geometry" not in source:
-                raise ValidationError("{} should have null geometry".format(filename))
-            elif source["geometry"] != None:
-                raise ValidationError("{} should have null geometry but it is {}".format(filename, source["geometry"]))
+        checker.check(filename, source, partial(cache.geometry, filename), timer)
         tested_sources_count += 1
     except ValidationError as e:
         borkenbuild = True
         logger.exception("Error in {} : {}".format(filename, e))
-if spacesave > 0:
-    logger.warning("Disembedding all icons would save {} KB".format(round(spacesave / 1024.0, 2)))
+    if profile is not None:
+        profile.add_source(SourceProfile(filename, count_vertices(source.get("geometry")), timer.stages))
+cache.save()
+if checker.spacesave > 0:
+    logger.warning("Disembedding all icons would save {} KB".format(round(checker.spacesave / 1024.0, 2)))
 
 print(f"Checked {tested_sources_count} sources.")
+if profile is not None:
+    print(profile.write(arguments.profile))
 if borkenbuild or tested_sources_count == 0:
     raise SystemExit(1)
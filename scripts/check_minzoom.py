@@ -1,7 +1,5 @@
 import argparse
 import asyncio
-import glob
-import json
 import logging
 import os
 import re
@@ -12,7 +10,6 @@ import aiohttp
 import imagehash
 import mercantile
 from shapely.geometry import shape, Point
-import aiofiles
 from aiohttp import ClientSession
 from PIL import Image
 from io import BytesIO
@@ -22,6 +19,8 @@ from pyproj import Transformer
 from pyproj.crs import CRS
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 from enum import Enum
+from libeli import jsonio
+from libeli.catalog import SourceCatalog
 
 
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +37,7 @@ parser.add_argument(
 
 args = parser.parse_args()
 sources_directory = args.sources
+catalog = SourceCatalog([sources_directory])
 
 response_cache = {}
 domain_lockes = {}
@@ -218,9 +218,7 @@ async def process_source(filename):
         if os.path.exists(out_image):
             return
 
-        async with aiofiles.open(filename, mode="r", encoding="utf-8") as f:
-            contents = await f.read()
-        source = json.loads(contents)
+        source = catalog.source(filename)
 
         # Skip non tms layers
         if not source["properties"]["type"] in {"tms", "wms"}:
@@ -373,8 +371,7 @@ async def process_source(filename):
                         source["properties"]["min_zoom"] = selected_min_zoom
 
                     with open(filename, "w", encoding="utf-8") as out:
-                        json.dump(source, out, indent=4, sort_keys=False, ensure_ascii=False)
-                        out.write("\n")
+                        jsonio.dump_source(source, out)
 
         def on_click(event):
             try:
@@ -420,13 +417,11 @@ async def process_source(filename):
         return
 
 
-def start_processing(sources_directory):
+def start_processing():
+    # sources_directory may also be a single source file, only TMS and WMS sources are opened
+    for entry in catalog.filter(type={"tms", "wms"}):
+        asyncio.run(process_source(entry.path))
+    catalog.save()
 
-    if os.path.isfile(sources_directory):
-        asyncio.run(process_source(sources_directory))
-    elif os.path.isdir(sources_directory):
-        for filename in glob.glob(os.path.join(sources_directory, "**", "*.geojson"), recursive=True):
-            asyncio.run(process_source(filename))
 
-
-start_processing(sources_directory)
+start_processing()
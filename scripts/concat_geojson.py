@@ -1,25 +1,27 @@
 #!/usr/bin/env python
-import json
+import argparse
 import sys
-import io
-from datetime import datetime
 
-source_features = []
-for file in sys.argv[1:]:
-    with io.open(file, "r") as f:
-        # simplify all floats to 5 decimal points
-        source_features.append(json.load(f, parse_float=lambda x: round(float(x), 5)))
+from libeli import artifacts
+from libeli.parallel import process_imap
 
-generated = "{:%Y-%m-%d %H:%M:%S}".format(datetime.utcnow())
-version = "1.0"
+parser = argparse.ArgumentParser(
+    description="Concatenate sources to a single GeoJSON FeatureCollection", fromfile_prefix_chars="@"
+)
+parser.add_argument("files", metavar="F", nargs="+", help="file(s) to process")
+parser.add_argument("-j", dest="jobs", type=int, help="number of processes, defaults to the number of CPUs")
+parser.add_argument(
+    "-l",
+    dest="lines",
+    action="store_true",
+    help="write JSON Lines (one feature per line) instead of a FeatureCollection",
+)
+args = parser.parse_args()
 
-collection = {
-    "type": "FeatureCollection",
-    "meta": {"generated": generated, "format_version": version},
-    "features": source_features,
-}
-
-output = json.dumps(collection, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
-if sys.version_info.major == 2:
-    output = output.encode("utf8")
-print(output)
+# Features are written as soon as they are loaded instead of holding the whole collection in memory
+features = process_imap(artifacts.load_geojson_feature, args.files, args.jobs)
+if args.lines:
+    artifacts.write_geojson_lines(features, sys.stdout)
+else:
+    artifacts.write_geojson(features, sys.stdout)
+    sys.stdout.write("\n")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""
+usage: generate_corpus.py [-h] -o OUTDIR [-n COUNT] [-s SEED] [-j JOBS] path [path ...]
+
+Writes a synthetic sources directory for benchmarks, e.g. to see how the build scales
+to many more sources than the index has today.
+
+The synthetic sources are sampled from the real sources given as path: every synthetic
+source copies the properties of a random real source, with a unique id and name, and
+gets a random geometry with the same number of polygons, rings and vertices, placed
+within the bbox of the real source. The mix of tms/wms/wmts sources, properties and
+vertex counts therefore follows the real index.
+
+Suggested way of running:
+
+find sources -name \*.geojson | xargs python scripts/generate_corpus.py -n 50000 -o /tmp/eli-corpus/sources
+
+"""
+
+from argparse import ArgumentParser
+
+from libeli import corpus
+from libeli.parallel import process_map
+
+parser = ArgumentParser(description="Writes a synthetic sources directory for benchmarks")
+parser.add_argument("path", nargs="+", help="Path of real source files to sample from.")
+parser.add_argument("-o", "--outdir", required=True, help="The sources directory to write to.")
+parser.add_argument("-n", "--count", type=int, default=10000, help="Number of sources to write, 10000 by default.")
+parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the random generator, 0 by default.")
+parser.add_argument("-j", "--jobs", type=int, help="Number of processes, defaults to the number of CPUs.")
+arguments = parser.parse_args()
+
+templates = process_map(corpus.source_template, sorted(arguments.path), arguments.jobs)
+paths = corpus.write_corpus(arguments.outdir, templates, arguments.count, arguments.seed)
+print(f"Wrote {len(paths)} synthetic sources to {arguments.outdir}")
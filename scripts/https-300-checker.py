@@ -1,9 +1,9 @@
 #!/usr/bin/env python
 
-import json
 import requests
 import argparse
 import re
+from libeli import jsonio
 
 switch = re.compile("{switch:([^,]*),[^}]*}")
 verbose = False
@@ -56,7 +56,7 @@ args = parser.parse_args()
 features = []
 for file in args.files:
     with open(file, "r") as f:
-        data = json.load(f)
+        data = jsonio.loads(f.read())
         for feature in data["features"]:
             try:
                 check_url(feature["properties"]["url"])
@@ -0,0 +1,570 @@
+import hashlib
+import io
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+import yaml
+from shapely import get_num_geometries, normalize, to_wkb
+from shapely.geometry import MultiPolygon, Polygon, shape
+
+from . import jsonio
+from .jsonio import dumps, round_float
+from .parallel import process_map
+from .profiling import SourceProfile, StageTimer, count_vertices, timed
+from .quantize import quantize_source
+from .simplify import fit_ring, simplify_source
+from .tiles import source_tiles
+
+Source = Dict[str, Any]
+
+GEOJSON_FORMAT_VERSION = "1.0"
+JOSM_NAMESPACE = "http://josm.openstreetmap.de/maps-1.0"
+
+LEGACY_JSON_PROPERTIES = [
+    "name",
+    "type",
+    "url",
+    "license_url",
+    "id",
+    "description",
+    "country_code",
+    "default",
+    "best",
+    "start_date",
+    "end_date",
+    "overlay",
+    "available_projections",
+    "attribution",
+    "icon",
+    "privacy_policy_url",
+]
+
+
+def load_source(path: str, timer: Optional[StageTimer] = None) -> Source:
+    """Loads a single ELI source with all floats rounded to 5 decimal points
+
+    The source is parsed with native floats and then quantized, see quantize.quantize_source.
+    Consecutive duplicate positions the rounding creates are dropped.
+
+    Parameters
+    ----------
+    path : str
+        Path of the .geojson source file
+    timer : Optional[StageTimer], optional
+        Timer of the "decode" and "quantize" stages, by default None
+
+    Returns
+    -------
+    Source
+        The parsed source
+    """
+    with timed(timer, "decode"):
+        source = jsonio.load(path)
+    with timed(timer, "quantize"):
+        return quantize_source(source)
+
+
+def load_source_without_coordinates(path: str) -> Source:
+    """Loads a single ELI source like load_source, but without the coordinates of its geometry
+
+    The geometry keeps its type, its coordinates are None. Tools which only need the properties
+    load sources several times faster this way, see jsonio.loads_without_coordinates.
+    """
+    source, _ = jsonio.load_without_coordinates(path)
+    geometry = source.get("geometry")
+    if isinstance(geometry, dict) and "coordinates" in geometry:
+        geometry["coordinates"] = None
+    return quantize_source(source)
+
+
+def load_sources(paths: Sequence[str], jobs: Optional[int] = 1, coordinates: bool = True) -> List[Source]:
+    """Loads ELI sources in the order of paths, in parallel if jobs is not 1
+
+    Without coordinates, the sources are loaded with load_source_without_coordinates.
+    """
+    return process_map(load_source if coordinates else load_source_without_coordinates, paths, jobs)
+
+
+def format_generated(timestamp: Optional[datetime] = None) -> str:
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+    return "{:%Y-%m-%d %H:%M:%S}".format(timestamp)
+
+
+def geojson_collection(sources: List[Source], generated: Optional[str] = None) -> Dict[str, Any]:
+    """Builds the FeatureCollection of imagery.geojson"""
+    if generated is None:
+        generated = format_generated()
+    return {
+        "type": "FeatureCollection",
+        "meta": {"generated": generated, "format_version": GEOJSON_FORMAT_VERSION},
+        "features": sources,
+    }
+
+
+def legacy_json_source(
+    source: Source, gen_bbox: bool = False, tms_only: bool = False, remove_polygons: bool = False
+) -> Dict[str, Any]:
+    """Converts a source to the legacy imagery.json representation
+
+    Parameters
+    ----------
+    source : Source
+        The source to convert
+    gen_bbox : bool, optional
+        Generate bounding boxes from polygons, by default False
+    tms_only : bool, optional
+        Return an empty object for WMS sources, by default False
+    remove_polygons : bool, optional
+        Remove polygons from the extent, by default False
+
+    Returns
+    -------
+    Dict[str, Any]
+        The legacy json object
+    """
+    converted: Dict[str, Any] = {}
+    extent_obj: Dict[str, Any] = {}
+
+    geometry = source.get("geometry")
+    if geometry and (gen_bbox or not remove_polygons):
+        geom = shape(geometry)
+
+        if gen_bbox:
+            minx, miny, maxx, maxy = geom.bounds
+            bbox_obj = {"min_lon": minx, "max_lon": maxx, "min_lat": miny, "max_lat": maxy}
+            extent_obj["bbox"] = bbox_obj
+
+        if not remove_polygons:
+            exterior_rings = []
+            if isinstance(geom, Polygon):
+                exterior_rings.append(list(geom.exterior.coords))
+            elif isinstance(geom, MultiPolygon):
+                for poly in geom.geoms:
+                    exterior_rings.append(list(poly.exterior.coords))
+            extent_obj["polygon"] = exterior_rings
+
+    properties = source.get("properties") or {}
+    if tms_only and properties["type"] == "wms":
+        return {}
+
+    for f in LEGACY_JSON_PROPERTIES:
+        thing = properties.get(f)
+        if thing is not None:
+            converted[f] = thing
+
+    for f in ["min_zoom", "max_zoom"]:
+        thing = properties.get(f)
+        if thing is not None:
+            extent_obj[f] = thing
+
+    if extent_obj:
+        converted["extent"] = extent_obj
+
+    return converted
+
+
+def load_legacy_json_source(
+    path: str, gen_bbox: bool = False, tms_only: bool = False, remove_polygons: bool = False
+) -> Dict[str, Any]:
+    """Loads the source at path and converts it with legacy_json_source
+
+    Sources converted without bbox and polygons are loaded without coordinates.
+    """
+    if remove_polygons and not gen_bbox:
+        source = load_source_without_coordinates(path)
+    else:
+        source = load_source(path)
+    return legacy_json_source(source, gen_bbox, tms_only, remove_polygons)
+
+
+def load_legacy_json_sources(
+    paths: Sequence[str],
+    gen_bbox: bool = False,
+    tms_only: bool = False,
+    remove_polygons: bool = False,
+    jobs: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Loads and converts the sources of paths in parallel, see legacy_json_source"""
+    func = partial(load_legacy_json_source, gen_bbox=gen_bbox, tms_only=tms_only, remove_polygons=remove_polygons)
+    return process_map(func, paths, jobs)
+
+
+def _coord_str(coord: float) -> str:
+    return "{0:.6f}".format(coord)
+
+
+def add_xml_entry(root: ET.Element, source: Source) -> List[Tuple[int, float]]:
+    """Appends the JOSM <entry> element of source to root
+
+    Shapes with more points than JOSM supports are simplified, see simplify.fit_ring.
+
+    Returns
+    -------
+    List[Tuple[int, float]]
+        The number of points and the maximum deviation from the geometry of source in degrees
+        of every simplified shape
+    """
+    props = source["properties"]
+    simplified: List[Tuple[int, float]] = []
+    entry = ET.SubElement(root, "entry")
+
+    name = ET.SubElement(entry, "name")
+    name.text = props["name"]
+
+    id = ET.SubElement(entry, "id")
+    id.text = props["id"]
+
+    type = ET.SubElement(entry, "type")
+    type.text = props["type"]
+
+    url = ET.SubElement(entry, "url")
+    url.text = props["url"]
+
+    category = ET.SubElement(entry, "category")
+    if "category" in props:
+        category.text = props["category"]
+    else:
+        category.text = "photo"
+
+    if props.get("overlay"):
+        entry.set("overlay", "true")
+
+    if props.get("best"):
+        entry.set("eli-best", "true")
+
+    if "available_projections" in props:
+        projections = ET.SubElement(entry, "projections")
+        for projection in props["available_projections"]:
+            code = ET.SubElement(projections, "code")
+            code.text = projection
+
+    if "attribution" in props:
+        attribution = props["attribution"]
+
+        if attribution.get("text"):
+            text = ET.SubElement(entry, "attribution-text")
+            if attribution.get("required"):
+                text.set("mandatory", "true")
+            text.text = attribution["text"]
+
+        if attribution.get("url"):
+            url = ET.SubElement(entry, "attribution-url")
+            url.text = attribution["url"]
+
+    if source.get("default", False):
+        default = ET.SubElement(entry, "default")
+        default.text = "true"
+
+    if "start_date" in props:
+        date = ET.SubElement(entry, "date")
+        if "end_date" in props and props["start_date"] == props["end_date"]:
+            date.text = props["start_date"]
+        elif "end_date" in props and props["start_date"] != props["end_date"]:
+            date.text = ";".join([props["start_date"], props["end_date"]])
+        else:
+            date.text = ";".join([props["start_date"], "-"])
+
+    if "icon" in props:
+        icon = ET.SubElement(entry, "icon")
+        icon.text = props["icon"]
+
+    if "country_code" in props and props["country_code"].upper() not in ["XN", "ZZ"]:
+        country_code = ET.SubElement(entry, "country-code")
+        country_code.text = props["country_code"]
+
+    if "license_url" in props:
+        permission_ref = ET.SubElement(entry, "permission-ref")
+        permission_ref.text = props["license_url"]
+
+    if "description" in props:
+        description = ET.SubElement(entry, "description")
+        description.text = props["description"]
+        description.set("lang", "en")
+
+    if "min_zoom" in props:
+        min_zoom = ET.SubElement(entry, "min-zoom")
+        min_zoom.text = str(props["min_zoom"])
+
+    if "max_zoom" in props:
+        max_zoom = ET.SubElement(entry, "max-zoom")
+        max_zoom.text = str(min(24, props["max_zoom"]))
+
+    geometry = source.get("geometry")
+    if geometry:
+        geom = shape(geometry)
+
+        bounds = ET.SubElement(entry, "bounds")
+        minx, miny, maxx, maxy = geom.bounds
+        bounds.set("min-lon", _coord_str(minx))
+        bounds.set("min-lat", _coord_str(miny))
+        bounds.set("max-lon", _coord_str(maxx))
+        bounds.set("max-lat", _coord_str(maxy))
+
+        if isinstance(geom, Polygon):
+            polygons = [geom]
+        elif isinstance(geom, MultiPolygon) and get_num_geometries(geom) <= 100:
+            polygons = list(geom.geoms)
+        else:
+            polygons = []
+        for poly in polygons:
+            # JOSM only knows the outer ring, which is simplified to fit its point limit if necessary
+            coords, deviation = fit_ring(poly.exterior.coords)
+            if len(coords) < len(poly.exterior.coords):
+                simplified.append((len(coords), deviation))
+            shape_element = ET.SubElement(bounds, "shape")
+            for lon, lat in coords:
+                point = ET.SubElement(shape_element, "point")
+                point.set("lon", _coord_str(lon))
+                point.set("lat", _coord_str(lat))
+
+    return simplified
+
+
+def _report_xml_entry(root: ET.Element, source: Source) -> None:
+    """Appends the entry of source to root, reporting failures and simplified shapes"""
+    try:
+        simplified = add_xml_entry(root, source)
+    except Exception as e:
+        print(f"Failed to convert {source}: {e}")
+        return
+    source_id = source["properties"]["id"]
+    for points, deviation in simplified:
+        print(f"Simplified shape of {source_id} to {points} points, max deviation {deviation:.6f} degrees")
+
+
+def xml_entry(source: Source) -> str:
+    """Serializes the imagery.xml entry of source, empty if it fails to convert, see join_xml_entries"""
+    root = ET.Element("imagery")
+    _report_xml_entry(root, source)
+    return "".join(ET.tostring(entry, encoding="unicode") for entry in root)
+
+
+def load_xml_entry(path: str) -> str:
+    """Loads the source at path and serializes its imagery.xml entry"""
+    return xml_entry(load_source(path))
+
+
+def xml_tree(sources: List[Source]) -> ET.ElementTree:
+    """Builds the JOSM imagery.xml tree. Sources that fail to convert are reported and skipped."""
+    root = ET.Element("imagery", {"xmlns": JOSM_NAMESPACE})
+    for source in sources:
+        _report_xml_entry(root, source)
+    return ET.ElementTree(root)
+
+
+def write_xml(tree: ET.ElementTree, path: str) -> None:
+    with io.open(path, mode="wb") as f:
+        tree.write(f, encoding="utf-8", xml_declaration=True)
+
+
+def i18n_source(source: Source) -> Dict[str, Any]:
+    """Extracts the translatable strings of source keyed by its id, or an empty dict if i18n is not enabled"""
+    props = source["properties"]
+    if not ("i18n" in props and props["i18n"]):
+        return {}
+    strings: Dict[str, Any] = {}
+    if "name" in props:
+        strings["name"] = props["name"]
+    if "description" in props:
+        strings["description"] = props["description"]
+    if "attribution" in props:
+        attr = props["attribution"]
+        strings["attribution"] = {}
+        if "text" in attr:
+            strings["attribution"]["text"] = attr["text"]
+    return {props["id"]: strings}
+
+
+def i18n_strings(sources: List[Source]) -> Dict[str, Any]:
+    """Extracts the translatable strings of all sources with i18n enabled"""
+    data: Dict[str, Any] = {}
+    for source in sources:
+        data.update(i18n_source(source))
+    return data
+
+
+def i18n_yaml(sources: List[Source]) -> str:
+    """Renders the i18n/en.yaml template"""
+    return dump_i18n_yaml(i18n_strings(sources))
+
+
+def dump_i18n_yaml(data: Dict[str, Any]) -> str:
+    # The libyaml based dumper renders the same output as the pure Python SafeDumper, just faster
+    return yaml.dump(
+        {"en": {"imagery": data}},
+        Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+        allow_unicode=True,
+        default_flow_style=False,
+        default_style="",
+        width=99999,
+    )
+
+
+@dataclass
+class SourceFragments:
+    """The serialized parts of a single source in each artifact"""
+
+    geojson: str
+    json: str
+    xml: str
+    i18n: Dict[str, Any]
+    bbox: Optional[List[float]]
+    country_code: Optional[str]
+    simplified: Dict[str, str]
+    tiles: Dict[str, List[List[int]]]
+    geometry_hash: Optional[str]
+
+
+def geometry_hash(geometry: Any) -> str:
+    """SHA-256 of the normalized WKB of a shapely geometry
+
+    Normalizing orders the rings, parts and vertices, so geometries with the same vertices have
+    the same hash regardless of where their rings start and of their orientation.
+    """
+    return hashlib.sha256(to_wkb(normalize(geometry))).hexdigest()
+
+
+def render_fragments(
+    source: Source,
+    simplify_zooms: Sequence[int] = (),
+    timer: Optional[StageTimer] = None,
+    coverage_zooms: Sequence[int] = (),
+) -> SourceFragments:
+    """Serializes source for every artifact
+
+    The fragments can be joined with join_geojson, join_json and join_xml to the exact
+    bytes of the complete artifacts without having the other sources at hand. The features
+    simplified for simplify_zooms and the tiles intersecting the source at coverage_zooms
+    (see tiles.source_tiles) are keyed by the zoom level. The geometry is identified by
+    geometry_hash, so artifacts can share equal geometries. With timer, the time spent on
+    every artifact is recorded as a stage.
+    """
+    with timed(timer, "geojson"):
+        geojson = dumps(source)
+    with timed(timer, "legacy_json"):
+        legacy_json = dumps(legacy_json_source(source))
+    with timed(timer, "xml"):
+        xml = xml_entry(source)
+    with timed(timer, "i18n"):
+        i18n = i18n_source(source)
+    with timed(timer, "shape"):
+        geometry = source.get("geometry")
+        geom = shape(geometry) if geometry else None
+        bbox = list(geom.bounds) if geom is not None else None
+        geom_hash = geometry_hash(geom) if geom is not None else None
+    with timed(timer, "simplify"):
+        simplified = {str(zoom): dumps(simplify_source(source, zoom)) for zoom in simplify_zooms}
+    with timed(timer, "tiles"):
+        tiles = source_tiles(source, coverage_zooms) if coverage_zooms else {}
+    return SourceFragments(
+        geojson=geojson,
+        json=legacy_json,
+        xml=xml,
+        i18n=i18n,
+        bbox=bbox,
+        country_code=(source.get("properties") or {}).get("country_code"),
+        simplified=simplified,
+        tiles=tiles,
+        geometry_hash=geom_hash,
+    )
+
+
+def render_source_file(
+    path: str, simplify_zooms: Sequence[int] = (), coverage_zooms: Sequence[int] = ()
+) -> SourceFragments:
+    """Loads the source at path and serializes it with render_fragments"""
+    return render_fragments(load_source(path), simplify_zooms, coverage_zooms=coverage_zooms)
+
+
+def profile_source_file(
+    path: str, simplify_zooms: Sequence[int] = (), coverage_zooms: Sequence[int] = ()
+) -> Tuple[SourceFragments, SourceProfile]:
+    """Like render_source_file, but also returns the time spent in every stage"""
+    timer = StageTimer()
+    source = load_source(path, timer)
+    fragments = render_fragments(source, simplify_zooms, timer, coverage_zooms)
+    return fragments, SourceProfile(path, count_vertices(source.get("geometry")), timer.stages)
+
+
+def render_source_files(
+    paths: Sequence[str],
+    jobs: Optional[int] = None,
+    simplify_zooms: Sequence[int] = (),
+    coverage_zooms: Sequence[int] = (),
+) -> List[SourceFragments]:
+    """Loads and serializes the sources of paths in parallel. The fragments are in the order of paths."""
+    func = partial(render_source_file, simplify_zooms=simplify_zooms, coverage_zooms=coverage_zooms)
+    return process_map(func, paths, jobs)
+
+
+def join_geojson(fragments: Sequence[SourceFragments], generated: Optional[str] = None) -> str:
+    """Joins fragments to imagery.geojson, equal to dumps(geojson_collection(sources))"""
+    f = io.StringIO()
+    write_geojson((fragment.geojson for fragment in fragments), f, generated)
+    return f.getvalue()
+
+
+def load_geojson_feature(path: str) -> str:
+    """Loads the source at path and serializes it as feature of imagery.geojson"""
+    return dumps(load_source(path))
+
+
+def write_geojson(
+    features: Iterable[str], f: TextIO, generated: Optional[str] = None, meta: Optional[Dict[str, Any]] = None
+) -> None:
+    """Streams serialized features to f as imagery.geojson
+
+    Every feature is written as soon as it is available, so only a single feature has to be kept
+    in memory. The output is equal to dumps(geojson_collection(sources)), as "features" is the
+    first key of the sorted collection and "meta" and "type" follow it. Entries of meta are added
+    to the meta member of the collection.
+    """
+    meta = dict(geojson_collection([], generated)["meta"], **(meta or {}))
+    f.write('{"features":[')
+    for i, feature in enumerate(features):
+        if i > 0:
+            f.write(",")
+        f.write(feature)
+    f.write(f'],"meta":{dumps(meta)},"type":"FeatureCollection"}}')
+
+
+def write_geojson_lines(features: Iterable[str], f: TextIO) -> None:
+    """Streams serialized features to f as JSON Lines, i.e. one feature per line
+
+    The JSON serialization escapes all line breaks within strings, so every line is a complete feature.
+    """
+    for feature in features:
+        f.write(feature)
+        f.write("\n")
+
+
+def join_json(fragments: Sequence[SourceFragments]) -> str:
+    """Joins fragments to imagery.json"""
+    return "[" + ",".join(fragment.json for fragment in fragments) + "]"
+
+
+def join_xml(fragments: Sequence[SourceFragments]) -> bytes:
+    """Joins fragments to imagery.xml, equal to the output of write_xml"""
+    return join_xml_entries(fragment.xml for fragment in fragments)
+
+
+def join_xml_entries(entries: Iterable[str]) -> bytes:
+    """Joins serialized entries to imagery.xml, equal to the output of write_xml"""
+    joined = "".join(entries)
+    if joined:
+        document = f'<imagery xmlns="{JOSM_NAMESPACE}">{joined}</imagery>'
+    else:
+        document = f'<imagery xmlns="{JOSM_NAMESPACE}" />'
+    return ("<?xml version='1.0' encoding='utf-8'?>\n" + document).encode("utf-8")
+
+
+def join_i18n(fragments: Sequence[SourceFragments]) -> str:
+    """Joins fragments to i18n/en.yaml"""
+    data: Dict[str, Any] = {}
+    for fragment in fragments:
+        data.update(fragment.i18n)
+    return dump_i18n_yaml(data)
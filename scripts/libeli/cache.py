@@ -0,0 +1,302 @@
+import hashlib
+import io
+import os
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+from . import jsonio
+from .parallel import process_map
+
+Source = Dict[str, Any]
+
+CACHE_VERSION = 1
+CACHE_MAGIC = b"ELICACHE"
+# Magic, version and length of the index
+_HEADER = struct.Struct("<8sII")
+DEFAULT_CACHE_PATH = os.path.join(".eli-build", "sources.cache")
+
+
+def default_cache_path() -> Optional[str]:
+    """Path of the source cache shared by all scripts
+
+    The path is taken from the ELI_SOURCE_CACHE environment variable and defaults to
+    .eli-build/sources.cache in the working directory. If ELI_SOURCE_CACHE is empty, sources
+    are only cached in memory.
+    """
+    path = os.environ.get("ELI_SOURCE_CACHE", DEFAULT_CACHE_PATH)
+    return path or None
+
+
+@dataclass
+class CacheEntry:
+    """A parsed source file
+
+    The source is stored as compact JSON with the coordinates of its geometry replaced by null
+    and the geometry as WKB. Geometries which do not survive the round trip through WKB exactly,
+    e.g. with integer or three dimensional coordinates, are kept in the JSON and wkb is None.
+    """
+
+    sha256: str
+    mtime_ns: int
+    size: int
+    feature: bytes
+    wkb: Optional[bytes]
+
+    def properties(self) -> Dict[str, Any]:
+        """The properties of the source, without decoding its geometry"""
+        return jsonio.loads(self.feature)["properties"]
+
+
+_UINT32 = struct.Struct("<I")
+# WKB geometry type of Polygon, after the byte order byte
+_WKB_POLYGON = 3
+
+
+def _wkb_rings(wkb: bytes, offset: int) -> Tuple[List[List[List[float]]], int]:
+    """The rings of the WKB polygon at offset, after its byte order and type, and the offset after it"""
+    (count,) = _UINT32.unpack_from(wkb, offset)
+    offset += 4
+    rings = []
+    for _ in range(count):
+        (size,) = _UINT32.unpack_from(wkb, offset)
+        offset += 4
+        rings.append(np.frombuffer(wkb, "<f8", 2 * size, offset).reshape(size, 2).tolist())
+        offset += 16 * size
+    return rings, offset
+
+
+def _wkb_coordinates(wkb: bytes) -> List[Any]:
+    """The GeoJSON coordinates of a little endian, two dimensional WKB Polygon or MultiPolygon
+
+    The WKB is read directly, which is several times faster than building shapely geometries.
+    """
+    (geometry_type,) = _UINT32.unpack_from(wkb, 1)
+    if geometry_type == _WKB_POLYGON:
+        return _wkb_rings(wkb, 5)[0]
+    (count,) = _UINT32.unpack_from(wkb, 5)
+    offset = 9
+    polygons = []
+    for _ in range(count):
+        rings, offset = _wkb_rings(wkb, offset + 5)
+        polygons.append(rings)
+    return polygons
+
+
+def encode_source(source: Source) -> Tuple[bytes, Optional[bytes]]:
+    """Splits a parsed source into its JSON without coordinates and the WKB of its geometry, see CacheEntry"""
+    geometry = source.get("geometry") if isinstance(source, dict) else None
+    if (
+        isinstance(geometry, dict)
+        and geometry.get("type") in {"Polygon", "MultiPolygon"}
+        and "coordinates" in geometry
+    ):
+        try:
+            wkb = shapely.to_wkb(shape(geometry), output_dimension=2, byte_order=1)
+            exact = jsonio.dumps(_wkb_coordinates(wkb)) == jsonio.dumps(geometry["coordinates"])
+        except Exception:
+            exact = False
+        if exact:
+            feature = dict(source, geometry=dict(geometry, coordinates=None))
+            return jsonio.dumps(feature, sort_keys=False).encode("utf-8"), wkb
+    return jsonio.dumps(source, sort_keys=False).encode("utf-8"), None
+
+
+def decode_source(feature: bytes, wkb: Optional[bytes]) -> Source:
+    """Reassembles a source split by encode_source"""
+    source = jsonio.loads(feature)
+    if wkb is not None:
+        source["geometry"]["coordinates"] = _wkb_coordinates(wkb)
+    return source
+
+
+def file_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_source_file(path: str) -> CacheEntry:
+    """Reads and parses the source at path into a CacheEntry
+
+    Raises the errors of jsonio.load(path, unique_keys=True), so only files without duplicate
+    keys are cached.
+    """
+    stat = os.stat(path)
+    with io.open(path, "rb") as f:
+        data = f.read()
+    feature, wkb = encode_source(jsonio.loads(data, unique_keys=True))
+    return CacheEntry(sha256=file_sha256(data), mtime_ns=stat.st_mtime_ns, size=stat.st_size, feature=feature, wkb=wkb)
+
+
+class SourceCache:
+    """Parsed source files, kept in a single bundle file across runs of all scripts
+
+    A source is looked up by its path first and is a hit if size and mtime did not change.
+    Otherwise the file is hashed and looked up by its SHA-256 content hash, so touched, moved
+    and freshly checked out files are hits as well and only changed files are parsed again.
+    The bundle is read with a single read, which is much cheaper than opening every source on
+    a cold runner.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """Inits the SourceCache
+
+        Parameters
+        ----------
+        path : Optional[str], optional
+            Path of the bundle file, e.g. default_cache_path(). If None, sources are only cached in memory.
+        """
+        self.path = path
+        self.entries: Dict[str, CacheEntry] = {}
+        self._by_hash: Dict[str, CacheEntry] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str) -> None:
+        with io.open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            return
+        magic, version, index_length = _HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return
+        offset = _HEADER.size + index_length
+        try:
+            index = jsonio.loads(data[_HEADER.size : offset])
+        except ValueError:
+            return
+        for source_path, sha256, mtime_ns, size, feature_length, wkb_length in index:
+            feature = data[offset : offset + feature_length]
+            offset += feature_length
+            wkb = None
+            if wkb_length >= 0:
+                wkb = data[offset : offset + wkb_length]
+                offset += wkb_length
+            self._add(source_path, CacheEntry(sha256, mtime_ns, size, feature, wkb))
+
+    def _add(self, path: str, entry: CacheEntry) -> None:
+        self.entries[path] = entry
+        self._by_hash[entry.sha256] = entry
+
+    def save(self) -> None:
+        """Writes the bundle if it was modified, dropping the entries of files which no longer exist"""
+        if self.path is None or not self._dirty:
+            return
+        index = []
+        blobs = []
+        for source_path, entry in self.entries.items():
+            if not os.path.exists(source_path):
+                continue
+            wkb_length = -1 if entry.wkb is None else len(entry.wkb)
+            index.append([source_path, entry.sha256, entry.mtime_ns, entry.size, len(entry.feature), wkb_length])
+            blobs.append(entry.feature)
+            if entry.wkb is not None:
+                blobs.append(entry.wkb)
+        index_data = jsonio.dumps(index, sort_keys=False).encode("utf-8")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Scripts may run concurrently, the bundle is replaced at once and never left truncated
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with io.open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(index_data)))
+            f.write(index_data)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _lookup(self, path: str) -> Tuple[Optional[CacheEntry], os.stat_result]:
+        """The entry of path if the file did not change, without parsing it"""
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry, stat
+        with io.open(path, "rb") as f:
+            sha256 = file_sha256(f.read())
+        entry = self._by_hash.get(sha256)
+        if entry is None:
+            return None, stat
+        if entry.mtime_ns != stat.st_mtime_ns or self.entries.get(path) is not entry:
+            entry = CacheEntry(sha256, stat.st_mtime_ns, stat.st_size, entry.feature, entry.wkb)
+            self._add(path, entry)
+            self._dirty = True
+        return entry, stat
+
+    def entry(self, path: str) -> CacheEntry:
+        """The up to date entry of the source at path, parsing the file if it changed"""
+        entry, _ = self._lookup(path)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = parse_source_file(path)
+        self._add(path, entry)
+        self._dirty = True
+        return entry
+
+    def update(self, paths: Sequence[str], jobs: Optional[int] = None) -> None:
+        """Parses all changed sources of paths in parallel
+
+        Parameters
+        ----------
+        paths : Sequence[str]
+            Paths of the sources
+        jobs : Optional[int], optional
+            Number of processes parsing the changed sources, by default the number of CPUs
+        """
+        stale = []
+        for path in paths:
+            entry, _ = self._lookup(path)
+            if entry is None:
+                stale.append(path)
+            else:
+                self.hits += 1
+        self.misses += len(stale)
+        for path, entry in zip(stale, process_map(parse_source_file, stale, jobs)):
+            self._add(path, entry)
+            self._dirty = True
+
+    def load(self, path: str) -> Source:
+        """The source at path, equal to jsonio.load(path, unique_keys=True)
+
+        Every call returns a new object, which may be modified by the caller.
+        """
+        entry = self.entry(path)
+        return decode_source(entry.feature, entry.wkb)
+
+    def load_all(self, paths: Sequence[str], jobs: Optional[int] = None) -> List[Source]:
+        """The sources of paths in their order, parsing changed sources in parallel, see update"""
+        self.update(paths, jobs)
+        return [decode_source(self.entries[path].feature, self.entries[path].wkb) for path in paths]
+
+    def properties(self, path: str) -> Dict[str, Any]:
+        """The properties of the source at path, without decoding its geometry"""
+        return self.entry(path).properties()
+
+    def geometry(self, path: str) -> Optional[BaseGeometry]:
+        """The geometry of the source at path as shapely geometry, or None if it has none
+
+        Geometries stored as WKB are read directly, without building the coordinate lists.
+        """
+        entry = self.entry(path)
+        if entry.wkb is not None:
+            return shapely.from_wkb(entry.wkb)
+        geometry = jsonio.loads(entry.feature).get("geometry")
+        return shape(geometry) if geometry else None
+
+
+def load_sources(paths: Sequence[str], jobs: Optional[int] = None) -> List[Source]:
+    """Loads the sources of paths through the source cache at default_cache_path()"""
+    cache = SourceCache(default_cache_path())
+    sources = cache.load_all(paths, jobs)
+    cache.save()
+    return sources
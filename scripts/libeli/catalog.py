@@ -0,0 +1,160 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, Iterator, List, Optional, Sequence, Union
+
+from shapely.geometry.base import BaseGeometry
+
+from .cache import Source, SourceCache, default_cache_path
+
+# A value or a collection of values to match, see SourceCatalog.filter
+Match = Union[None, str, Collection[str]]
+
+
+@dataclass
+class CatalogEntry:
+    """The indexed properties of a source"""
+
+    path: str
+    id: str
+    type: Optional[str]
+    country_code: Optional[str]
+    category: Optional[str]
+
+
+def find_sources(directories: Sequence[str]) -> List[str]:
+    """Paths of all .geojson files below directories, sorted like LC_ALL=C sort
+
+    Paths of files instead of directories are included as they are.
+    """
+    paths = []
+    for directory in directories:
+        if os.path.isfile(directory):
+            paths.append(directory)
+            continue
+        for root, _, filenames in os.walk(directory):
+            paths.extend(os.path.join(root, filename) for filename in filenames if filename.endswith(".geojson"))
+    return sorted(paths)
+
+
+def _matches(value: Optional[str], wanted: Match) -> bool:
+    if wanted is None:
+        return True
+    if isinstance(wanted, str):
+        return value == wanted
+    return value in wanted
+
+
+class SourceCatalog:
+    """Index of all sources below the source directories
+
+    The source files are enumerated once. The index of ids, types, country codes and
+    categories is built from the properties in the source cache, see cache.SourceCache, so
+    unchanged sources are not opened and their geometries are not decoded. Properties, whole
+    sources and geometries are loaded on demand.
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[str] = ("sources",),
+        cache: Optional[SourceCache] = None,
+        jobs: Optional[int] = None,
+    ) -> None:
+        """Inits the SourceCatalog
+
+        Parameters
+        ----------
+        directories : Sequence[str], optional
+            The source directories or single source files, by default "sources"
+        cache : Optional[SourceCache], optional
+            The source cache, by default the one at cache.default_cache_path()
+        jobs : Optional[int], optional
+            Number of processes parsing changed sources, by default the number of CPUs
+        """
+        self.directories = list(directories)
+        self.cache = cache if cache is not None else SourceCache(default_cache_path())
+        self.jobs = jobs
+        self._paths: Optional[List[str]] = None
+        self._entries: Optional[List[CatalogEntry]] = None
+        self._by_id: Dict[str, CatalogEntry] = {}
+        # Path -> error of the sources which failed to parse and are not indexed
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def paths(self) -> List[str]:
+        """Paths of all sources, sorted"""
+        if self._paths is None:
+            self._paths = find_sources(self.directories)
+        return self._paths
+
+    @property
+    def entries(self) -> List[CatalogEntry]:
+        """The index entries of all sources which parsed fine, in the order of paths"""
+        return self._index()
+
+    def _index(self) -> List[CatalogEntry]:
+        if self._entries is None:
+            try:
+                self.cache.update(self.paths, self.jobs)
+                updated = True
+            except Exception:
+                # A source failed to parse, the sources are looked up one by one below
+                updated = False
+            self._entries = []
+            for path in self.paths:
+                try:
+                    cache_entry = self.cache.entries[path] if updated else self.cache.entry(path)
+                    properties = cache_entry.properties()
+                except Exception as e:
+                    self.errors[path] = str(e)
+                    continue
+                entry = CatalogEntry(
+                    path=path,
+                    id=properties.get("id"),
+                    type=properties.get("type"),
+                    country_code=properties.get("country_code"),
+                    category=properties.get("category"),
+                )
+                self._entries.append(entry)
+                self._by_id.setdefault(entry.id, entry)
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self) -> Iterator[CatalogEntry]:
+        return iter(self._index())
+
+    def get(self, source_id: str) -> Optional[CatalogEntry]:
+        """The entry of the source with source_id, the first one if the id is used more than once"""
+        self._index()
+        return self._by_id.get(source_id)
+
+    def filter(self, type: Match = None, country_code: Match = None, category: Match = None) -> Iterator[CatalogEntry]:
+        """The entries matching all given criteria
+
+        Every criterion is either a single value or a collection of values, e.g.
+        filter(type={"tms", "wms"}, country_code="DE"). Criteria which are None match all sources.
+        """
+        for entry in self._index():
+            if (
+                _matches(entry.type, type)
+                and _matches(entry.country_code, country_code)
+                and _matches(entry.category, category)
+            ):
+                yield entry
+
+    def properties(self, path: str) -> Dict[str, Any]:
+        """The properties of the source at path"""
+        return self.cache.properties(path)
+
+    def source(self, path: str) -> Source:
+        """The source at path, see SourceCache.load"""
+        return self.cache.load(path)
+
+    def geometry(self, path: str) -> Optional[BaseGeometry]:
+        """The geometry of the source at path as shapely geometry, see SourceCache.geometry"""
+        return self.cache.geometry(path)
+
+    def save(self) -> None:
+        """Writes the source cache, so the next catalog is built without parsing the sources"""
+        self.cache.save()
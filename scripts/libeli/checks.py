@@ -0,0 +1,169 @@
+import logging
+import warnings
+from typing import Any, Callable, Dict, Optional
+
+from jsonschema import Draft4Validator, RefResolver, ValidationError
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+from shapely.validation import explain_validity
+
+from .profiling import StageTimer, timed
+
+logger = logging.getLogger(__name__)
+
+
+class SourceChecker:
+    """The basic checks of check.py: schema, id uniqueness, URL tokens and geometry
+
+    The checker remembers the ids of the checked sources, so ids used by more than one
+    source are reported. Checking a source again, e.g. after it changed, is fine.
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        self.schema = schema
+        self.validator = Draft4Validator(schema, resolver=RefResolver("", None))
+        # Id -> filename of the source using it and back
+        self.seen_ids: Dict[str, str] = {}
+        self._ids: Dict[str, str] = {}
+        # Bytes embedded icons use
+        self.spacesave = 0
+
+    def forget(self, filename: str) -> None:
+        """Forgets the id of the source at filename, e.g. as it was removed"""
+        sourceid = self._ids.pop(filename, None)
+        if sourceid is not None and self.seen_ids.get(sourceid) == filename:
+            del self.seen_ids[sourceid]
+
+    def check(
+        self,
+        filename: str,
+        source: Dict[str, Any],
+        load_geometry: Optional[Callable[[], BaseGeometry]] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> None:
+        """Checks a parsed source
+
+        Parameters
+        ----------
+        filename : str
+            Path of the source, sources of a "world" directory must not have a geometry
+        source : Dict[str, Any]
+            The parsed source
+        load_geometry : Optional[Callable[[], BaseGeometry]], optional
+            Returns the shapely geometry of the source, e.g. SourceCache.geometry. By default it is
+            built from the GeoJSON geometry.
+        timer : Optional[StageTimer], optional
+            Timer of the "schema", "shape" and "is_valid" stages, by default None
+
+        Raises
+        ------
+        ValidationError
+            The first error found
+        """
+        self.forget(filename)
+
+        ## jsonschema validate
+        with timed(timer, "schema"):
+            self.validator.validate(source)
+        sourceid = source["properties"]["id"]
+        if sourceid in self.seen_ids:
+            raise ValidationError("Id %s used multiple times" % sourceid)
+        self.seen_ids[sourceid] = filename
+        self._ids[filename] = sourceid
+
+        ## {z} instead of {zoom}
+        if "{z}" in source["properties"]["url"]:
+            raise ValidationError("{z} found instead of {zoom} in tile url")
+
+        ## Check for license url. Too many missing to mark as required in schema.
+        if "license_url" not in source["properties"]:
+            logger.debug("{} has no license_url".format(filename))
+
+        if "attribution" not in source["properties"]:
+            logger.debug("{} has no attribution".format(filename))
+
+        ## Check for big fat embedded icons
+        if "icon" in source["properties"]:
+            if source["properties"]["icon"].startswith("data:"):
+                iconsize = len(source["properties"]["icon"].encode("utf-8"))
+                self.spacesave += iconsize
+                warnings.warn(f"{filename} icon should be disembedded to save {round(iconsize/1024.0, 2)} KB")
+
+        ## Validate that url has the tokens we expect
+        params = []
+
+        ### tms
+        if source["properties"]["type"] == "tms":
+            if "max_zoom" in source["properties"]:
+                if source["properties"]["max_zoom"] == 20:
+                    logger.warning(f"Useless max_zoom parameter in {filename}")
+            if "available_projections" in source["properties"]:
+                warnings.warn(f"Senseless available_projections parameter in {filename}")
+            if "min_zoom" in source["properties"]:
+                if source["properties"]["min_zoom"] == 0:
+                    logger.warning(f"Useless min_zoom parameter in {filename}")
+            params = ["{zoom}", "{x}", "{y}"]
+
+        ### wms: {proj}, {bbox}, {width}, {height}
+        elif source["properties"]["type"] == "wms":
+            if not "available_projections" in source["properties"]:
+                raise ValidationError(f"Missing available_projections parameter in {filename}")
+            params = ["{proj}", "{bbox}", "{width}", "{height}"]
+
+        ### wmts:
+        if source["properties"]["type"] == "wmts":
+            for tms_url_parameter in ["{zoom}", "{x}", "{y}", "{-y}"]:
+                if tms_url_parameter in source["properties"]["url"]:
+                    raise ValidationError(f"wmts URL should not contain tms parameter {tms_url_parameter} in URL")
+            if not "available_projections" in source["properties"]:
+                raise ValidationError(f"Missing available_projections parameter in {filename}")
+            if (
+                "available_projections" in source["properties"]
+                and "EPSG:3857" in source["properties"]["available_projections"]
+            ):
+                logger.warning(f"WMTS source supports EPSG:3857, could this be tms? {filename}")
+
+        missingparams = [x for x in params if x not in source["properties"]["url"].replace("{-y}", "{y}")]
+        if missingparams:
+            raise ValidationError("Missing parameter in {}: {}".format(filename, missingparams))
+
+        # Check for double brackets
+        if "{{" in source["properties"]["url"] or "}}" in source["properties"]["url"]:
+            raise ValidationError(f"{filename}: Double {{{{ or }}}} in URL: {source['properties']['url']}")
+
+        # If we're not global we must have a geometry.
+        # The geometry itself is validated by jsonschema
+        if "world" not in filename:
+            if not "type" in source["geometry"]:
+                raise ValidationError("{} should have a valid geometry or be global".format(filename))
+            if source["geometry"]["type"] not in {"Polygon", "MultiPolygon"}:
+                raise ValidationError("{} should have a Polygon or MultiPolygon geometry".format(filename))
+            if not "country_code" in source["properties"]:
+                raise ValidationError("{} should have a country or be global".format(filename))
+
+            with timed(timer, "shape"):
+                geom = load_geometry() if load_geometry is not None else shape(source["geometry"])
+            # Check validity of geometries
+            with timed(timer, "is_valid"):
+                is_valid = geom.is_valid
+            if not is_valid:
+                raise ValidationError(f"{filename} geometry is not valid: {explain_validity(geom)}")
+
+            min_lon, min_lat, max_lon, max_lat = geom.bounds
+            within_bounds = True
+            for lon in [min_lon, max_lon]:
+                if lon < -180.0 or lon > 180.0:
+                    within_bounds = False
+            for lat in [min_lat, max_lat]:
+                if lat < -90.0 or lat > 90.0:
+                    within_bounds = False
+            if not within_bounds:
+                raise ValidationError(
+                    "{} contains invalid coordinates.: Geometry extent: {}"
+                    "".format(filename, ",".join(map(str, [min_lon, min_lat, max_lon, max_lat])))
+                )
+        else:
+            if "geometry" not in source:
+                raise ValidationError("{} should have null geometry".format(filename))
+            elif source["geometry"] != None:
+                raise ValidationError("{} should have null geometry but it is {}".format(filename, source["geometry"]))
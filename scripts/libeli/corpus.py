@@ -0,0 +1,161 @@
+import copy
+import io
+import math
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import artifacts, jsonio
+from .artifacts import Source
+
+
+@dataclass
+class SourceTemplate:
+    """A real source to sample synthetic sources from"""
+
+    directory: str
+    properties: Dict[str, Any]
+    geometry_type: Optional[str]
+    # Number of positions of every ring, grouped by polygon
+    ring_sizes: List[List[int]]
+    bbox: Optional[List[float]]
+
+
+def _relative_directory(path: str) -> str:
+    """Directory of path below the source directory, e.g. europe/de"""
+    parts = os.path.normpath(path).split(os.sep)
+    if "sources" in parts[:-1]:
+        parts = parts[parts.index("sources") + 1 :]
+    return "/".join(parts[:-1])
+
+
+def source_template(path: str) -> SourceTemplate:
+    """Describes the source at path as a template, see SourceTemplate"""
+    source = artifacts.load_source(path)
+    geometry = source.get("geometry")
+    geometry_type = None
+    ring_sizes: List[List[int]] = []
+    bbox = None
+    if geometry:
+        geometry_type = geometry["type"]
+        polygons = [geometry["coordinates"]] if geometry_type == "Polygon" else geometry["coordinates"]
+        ring_sizes = [[len(ring) for ring in polygon] for polygon in polygons]
+        positions = [position for polygon in polygons for ring in polygon for position in ring]
+        bbox = [
+            min(position[0] for position in positions),
+            min(position[1] for position in positions),
+            max(position[0] for position in positions),
+            max(position[1] for position in positions),
+        ]
+    return SourceTemplate(
+        directory=_relative_directory(path),
+        properties=source["properties"],
+        geometry_type=geometry_type,
+        ring_sizes=ring_sizes,
+        bbox=bbox,
+    )
+
+
+def _min_radius(size: int) -> float:
+    """Radius keeping the positions of a ring far enough apart to not collapse when rounded to 5 decimal points"""
+    return max(3, size - 1) * 5e-5
+
+
+def _ring(rng: random.Random, lon: float, lat: float, radius: float, size: int, clockwise: bool) -> List[List[float]]:
+    """A closed, star shaped ring of size positions around lon/lat"""
+    count = max(3, size - 1)
+    radius = max(radius, _min_radius(size))
+    # Jittered but evenly spread angles keep the center within the ring, so it does not self-intersect
+    angles = [2 * math.pi * (i + rng.uniform(0, 0.4)) / count for i in range(count)]
+    if clockwise:
+        angles.reverse()
+    ring = []
+    for angle in angles:
+        distance = radius * rng.uniform(0.6, 1.0)
+        ring.append(
+            [
+                round(min(180.0, max(-180.0, lon + distance * math.cos(angle))), 5),
+                round(min(90.0, max(-90.0, lat + distance * math.sin(angle))), 5),
+            ]
+        )
+    return ring + [ring[0]]
+
+
+def _geometry(rng: random.Random, template: SourceTemplate) -> Optional[Dict[str, Any]]:
+    """A geometry with the ring sizes of template, placed within the bbox of template"""
+    if template.bbox is None:
+        return None
+    west, south, east, north = template.bbox
+    columns = math.ceil(math.sqrt(len(template.ring_sizes)))
+    # Large rings may need more space than the bbox, the polygons must not overlap each other
+    min_size = max(0.001, 2.5 * max(_min_radius(sizes[0]) for sizes in template.ring_sizes))
+    width = max((east - west) / columns, min_size)
+    height = max((north - south) / columns, min_size)
+    radius = 0.4 * min(width, height)
+    polygons = []
+    for i, sizes in enumerate(template.ring_sizes):
+        lon = west + (i % columns + 0.5) * width + rng.uniform(-0.1, 0.1) * radius
+        lat = south + (i // columns + 0.5) * height + rng.uniform(-0.1, 0.1) * radius
+        # Exterior rings are counterclockwise, holes clockwise and well inside the exterior
+        rings = [_ring(rng, lon, lat, radius, sizes[0], False)]
+        for j, size in enumerate(sizes[1:]):
+            angle = 2 * math.pi * j / (len(sizes) - 1)
+            hole_radius = radius * 0.5 / len(sizes)
+            offset = radius * 0.3 if len(sizes) > 2 else 0
+            rings.append(
+                _ring(rng, lon + offset * math.cos(angle), lat + offset * math.sin(angle), hole_radius, size, True)
+            )
+        polygons.append(rings)
+    if template.geometry_type == "Polygon":
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def synthetic_source(rng: random.Random, template: SourceTemplate, index: int) -> Source:
+    """A synthetic source with the properties, type and vertex counts of template
+
+    The id and name are made unique by index, the geometry is a random shape with the same
+    number of polygons, rings and positions as the geometry of template.
+    """
+    properties = copy.deepcopy(template.properties)
+    properties["id"] = f"synthetic-{index:06d}-{properties['id']}"
+    properties["name"] = f"{properties['name']} (synthetic {index})"
+    return {"type": "Feature", "properties": properties, "geometry": _geometry(rng, template)}
+
+
+def write_corpus(outdir: str, templates: Sequence[SourceTemplate], count: int, seed: int = 0) -> List[str]:
+    """Writes count synthetic sources to the sources directory outdir
+
+    Every synthetic source is sampled from a random template, so the mix of source types,
+    properties, geometry types and vertex counts follows the templates. Each source is written
+    to the directory of its template, e.g. outdir/europe/de, in the format of the source files.
+
+    Parameters
+    ----------
+    outdir : str
+        The sources directory to write to
+    templates : Sequence[SourceTemplate]
+        The templates, usually of all real sources
+    count : int
+        Number of sources to write
+    seed : int, optional
+        Seed of the random generator, by default 0. Equal seeds and templates result in equal corpora.
+
+    Returns
+    -------
+    List[str]
+        Paths of the written sources
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        template = rng.choice(templates)
+        source = synthetic_source(rng, template, index)
+        directory = os.path.join(outdir, *template.directory.split("/"))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"synthetic-{index:06d}.geojson")
+        with io.open(path, "w", encoding="utf-8") as f:
+            jsonio.dump_source(source, f)
+        paths.append(path)
+    return paths
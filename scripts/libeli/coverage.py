@@ -0,0 +1,186 @@
+import bisect
+import io
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from . import artifacts, jsonio
+from .artifacts import Source, SourceFragments
+from .tiles import lonlat_to_tile
+
+# Zoom levels of the index. A tile at another zoom is looked up at the next lower level.
+COVERAGE_ZOOMS = (0, 4, 8, 12)
+COVERAGE_FILENAME = "imagery.coverage.json"
+
+
+def _date(properties: Dict[str, Any]) -> str:
+    return str(properties.get("end_date") or properties.get("start_date") or "")
+
+
+def rank_sources(sources: Sequence[Source]) -> List[int]:
+    """Indices of sources in the order candidates are listed: best first, then newest, then highest max_zoom
+
+    Sources without date or max_zoom follow the ones with. Ties keep the order of sources.
+    """
+    properties = [source.get("properties") or {} for source in sources]
+    order = list(range(len(sources)))
+    # Stable sorts from the least to the most significant key
+    order.sort(key=lambda i: properties[i].get("max_zoom", -1), reverse=True)
+    order.sort(key=lambda i: _date(properties[i]), reverse=True)
+    order.sort(key=lambda i: not properties[i].get("best", False))
+    return order
+
+
+def _sweep(ranges: List[Tuple[int, int, int]]) -> List[Tuple[int, int, Tuple[int, ...]]]:
+    """Splits overlapping (first, last, rank) ranges of a row into runs of equal candidates"""
+    events: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for first, last, rank in ranges:
+        events[first].append((rank, 1))
+        events[last + 1].append((rank, -1))
+    runs: List[Tuple[int, int, Tuple[int, ...]]] = []
+    active: Dict[int, int] = defaultdict(int)
+    positions = sorted(events)
+    for position, end in zip(positions, positions[1:]):
+        for rank, delta in events[position]:
+            active[rank] += delta
+            if not active[rank]:
+                del active[rank]
+        if not active:
+            continue
+        candidates = tuple(sorted(active))
+        if runs and runs[-1][1] + 1 == position and runs[-1][2] == candidates:
+            runs[-1] = (runs[-1][0], end - 1, candidates)
+        else:
+            runs.append((position, end - 1, candidates))
+    return runs
+
+
+def build_coverage(
+    fragments: Sequence[SourceFragments], generated: str, zooms: Sequence[int] = COVERAGE_ZOOMS
+) -> Dict[str, Any]:
+    """Builds the tile coverage index of the sources from the tiles of their fragments
+
+    For every row of tiles at each of zooms, the index holds runs of consecutive tiles with the
+    same candidate sources, as [first x, last x, set]. set refers to the list of candidates in
+    "sets", which holds the positions of the sources in "sources" and is shared by all runs with
+    equal candidates. "sources" is ordered by rank_sources, so every set lists the best candidate
+    first. The min_zoom and max_zoom of the sources are kept, as a level serves several zooms.
+
+    Parameters
+    ----------
+    fragments : Sequence[SourceFragments]
+        Fragments of all sources of the build, rendered with zooms as coverage_zooms
+    generated : str
+        The generation timestamp of the build
+    zooms : Sequence[int], optional
+        The zoom levels to index, by default COVERAGE_ZOOMS
+
+    Returns
+    -------
+    Dict[str, Any]
+        The coverage index, see CoverageIndex
+    """
+    properties = []
+    for fragment in fragments:
+        source, _ = jsonio.loads_without_coordinates(fragment.geojson.encode("utf-8"))
+        properties.append(source.get("properties") or {})
+    order = rank_sources([{"properties": props} for props in properties])
+
+    rows: Dict[int, Dict[int, List[Tuple[int, int, int]]]] = {zoom: defaultdict(list) for zoom in zooms}
+    for rank, index in enumerate(order):
+        for zoom, ranges in fragments[index].tiles.items():
+            for row, first, last in ranges:
+                rows[int(zoom)][row].append((first, last, rank))
+
+    sets: List[List[int]] = []
+    set_indexes: Dict[Tuple[int, ...], int] = {}
+    levels: Dict[str, Dict[str, List[List[int]]]] = {}
+    for zoom in sorted(zooms):
+        level: Dict[str, List[List[int]]] = {}
+        for row in sorted(rows[zoom]):
+            runs = []
+            for first, last, candidates in _sweep(rows[zoom][row]):
+                set_index = set_indexes.get(candidates)
+                if set_index is None:
+                    set_index = set_indexes[candidates] = len(sets)
+                    sets.append(list(candidates))
+                runs.append([first, last, set_index])
+            level[str(row)] = runs
+        levels[str(zoom)] = level
+
+    return {
+        "format_version": artifacts.GEOJSON_FORMAT_VERSION,
+        "generated": generated,
+        "zooms": sorted(zooms),
+        "sources": {
+            "id": [properties[i]["id"] for i in order],
+            "min_zoom": [properties[i].get("min_zoom", 0) for i in order],
+            "max_zoom": [properties[i].get("max_zoom") for i in order],
+        },
+        "sets": sets,
+        "tiles": levels,
+    }
+
+
+def write_coverage(path: str, coverage: Dict[str, Any]) -> None:
+    with io.open(path, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps(coverage, sort_keys=False))
+        f.write("\n")
+
+
+class CoverageIndex:
+    """Answers which sources are available for a tile from the coverage index of build_coverage
+
+    A lookup is a hash lookup of the row of the tile at the next lower indexed zoom and a binary
+    search within its runs. Candidates are returned best first. Above the highest indexed zoom,
+    the candidates are those of the parent tile, so some of them may not intersect the tile
+    itself; check the geometries of the candidates where that matters.
+    """
+
+    def __init__(self, coverage: Dict[str, Any]) -> None:
+        self.zooms: List[int] = coverage["zooms"]
+        self.ids: List[str] = coverage["sources"]["id"]
+        self._min_zoom: List[float] = coverage["sources"]["min_zoom"]
+        self._max_zoom: List[float] = [math.inf if z is None else z for z in coverage["sources"]["max_zoom"]]
+        self._sets: List[List[int]] = coverage["sets"]
+        self._tiles: Dict[str, Dict[str, List[List[int]]]] = coverage["tiles"]
+
+    @classmethod
+    def from_file(cls, path: str) -> "CoverageIndex":
+        return cls(jsonio.load(path))
+
+    def tile(self, zoom: int, x: int, y: int) -> List[str]:
+        """Ids of the candidate sources for tile x/y at zoom, best first
+
+        Parameters
+        ----------
+        zoom : int
+            Zoom level of the tile
+        x : int
+            Column of the web mercator tile
+        y : int
+            Row of the web mercator tile
+
+        Returns
+        -------
+        List[str]
+            The ids of the sources with min_zoom <= zoom <= max_zoom intersecting the parent tile
+            at the next lower indexed zoom, a superset of the sources intersecting the tile itself
+        """
+        level = max((z for z in self.zooms if z <= zoom), default=None)
+        if level is None:
+            return []
+        shift = zoom - level
+        runs = self._tiles[str(level)].get(str(y >> shift))
+        if not runs:
+            return []
+        column = x >> shift
+        position = bisect.bisect_right(runs, column, key=lambda run: run[0]) - 1
+        if position < 0 or runs[position][1] < column:
+            return []
+        return [self.ids[i] for i in self._sets[runs[position][2]] if self._min_zoom[i] <= zoom <= self._max_zoom[i]]
+
+    def at_point(self, lon: float, lat: float, zoom: int) -> List[str]:
+        """Ids of the candidate sources for the tile containing lon/lat at zoom, see tile"""
+        x, y = lonlat_to_tile(lon, lat, zoom)
+        return self.tile(zoom, x, y)
@@ -0,0 +1,138 @@
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from . import artifacts, jsonio
+from .artifacts import SourceFragments
+
+DATABASE_FILENAME = "imagery.sqlite"
+# Bump if the schema changes
+SCHEMA_VERSION = 1
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+SWITCH_PLACEHOLDER = re.compile(r"\{switch:[^}]*\}")
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE sources (
+    fid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    url TEXT NOT NULL,
+    host TEXT,
+    country_code TEXT,
+    category TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    min_zoom INTEGER,
+    max_zoom INTEGER,
+    best INTEGER NOT NULL,
+    overlay INTEGER NOT NULL,
+    properties TEXT NOT NULL,
+    geometry TEXT
+);
+CREATE INDEX sources_type ON sources (type);
+CREATE INDEX sources_country_code ON sources (country_code);
+CREATE INDEX sources_category ON sources (category);
+CREATE INDEX sources_start_date ON sources (start_date);
+CREATE INDEX sources_end_date ON sources (end_date);
+CREATE INDEX sources_host ON sources (host);
+CREATE TABLE projections (
+    code TEXT NOT NULL,
+    source INTEGER NOT NULL REFERENCES sources (fid),
+    PRIMARY KEY (code, source)
+) WITHOUT ROWID;
+CREATE INDEX projections_source ON projections (source);
+CREATE VIRTUAL TABLE sources_rtree USING rtree (fid, min_lon, max_lon, min_lat, max_lat);
+"""
+
+
+def url_host(url: str) -> Optional[str]:
+    """The lower case host of url with {switch:a,b,c} placeholders shortened to {switch}, None if it has none"""
+    try:
+        return urlparse(SWITCH_PLACEHOLDER.sub("{switch}", url)).hostname
+    except ValueError:
+        return None
+
+
+def source_rows(fid: int, geojson: str, bbox: Optional[List[float]]) -> Tuple[Tuple[Any, ...], ...]:
+    """The rows of a feature of imagery.geojson in the sources table, the R-tree and the projections table
+
+    Sources without geometry cover the world.
+    """
+    feature = jsonio.loads(geojson)
+    props: Dict[str, Any] = feature.get("properties") or {}
+    geometry = feature.get("geometry")
+    row = (
+        fid,
+        props["id"],
+        props["name"],
+        props["type"],
+        props["url"],
+        url_host(props["url"]),
+        props.get("country_code"),
+        props.get("category"),
+        props.get("start_date"),
+        props.get("end_date"),
+        props.get("min_zoom"),
+        props.get("max_zoom"),
+        bool(props.get("best", False)),
+        bool(props.get("overlay", False)),
+        jsonio.dumps(props),
+        jsonio.dumps(geometry) if geometry else None,
+    )
+    min_lon, min_lat, max_lon, max_lat = bbox if bbox is not None else WORLD_BBOX
+    projections = tuple((code, fid) for code in sorted(set(props.get("available_projections", []))))
+    return row, (fid, min_lon, max_lon, min_lat, max_lat), projections
+
+
+def write_database(path: str, fragments: Sequence[SourceFragments], generated: str) -> None:
+    """Writes all sources to the SQLite database at path
+
+    The database has a row per source in the sources table, with the properties most queries
+    filter on in indexed columns and all properties and the geometry as JSON. The available
+    projections are normalized into the projections table and the bboxes of the geometries are
+    indexed in the sources_rtree R-tree, e.g.:
+
+        SELECT s.id FROM sources s JOIN projections p ON p.source = s.fid
+        WHERE s.type = 'wms' AND s.country_code = 'DE' AND p.code = 'EPSG:25832'
+
+        SELECT s.id FROM sources s JOIN sources_rtree r ON r.fid = s.fid
+        WHERE r.min_lon <= 13.4 AND r.max_lon >= 13.4 AND r.min_lat <= 52.5 AND r.max_lat >= 52.5
+
+    Parameters
+    ----------
+    path : str
+        Path of the database, an existing database is replaced
+    fragments : Sequence[SourceFragments]
+        Fragments of all sources of the build
+    generated : str
+        The generation timestamp of the build
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            meta = {
+                "format_version": artifacts.GEOJSON_FORMAT_VERSION,
+                "generated": generated,
+                "schema_version": str(SCHEMA_VERSION),
+            }
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+            rows = [source_rows(fid, fragment.geojson, fragment.bbox) for fid, fragment in enumerate(fragments, 1)]
+            connection.executemany(f"INSERT INTO sources VALUES ({', '.join('?' * 16)})", (row[0] for row in rows))
+            connection.executemany("INSERT INTO sources_rtree VALUES (?, ?, ?, ?, ?)", (row[1] for row in rows))
+            connection.executemany("INSERT INTO projections VALUES (?, ?)", (code for row in rows for code in row[2]))
+        # Smaller and faster to read, as the database is never written again
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
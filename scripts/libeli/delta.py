@@ -0,0 +1,222 @@
+import bisect
+import hashlib
+import io
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import artifacts, jsonio, publish
+from .artifacts import SourceFragments
+
+DELTA_INDEX = "index.json"
+DELTA_STATE = "state.json"
+# Number of consecutive deltas kept, i.e. how many builds behind a client can catch up
+DELTA_HISTORY = 10
+
+
+def geojson_hash(data: bytes) -> str:
+    """The content hash of imagery.geojson, which deltas refer to versions by"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _feature_hash(geojson: str) -> str:
+    return hashlib.sha256(geojson.encode("utf-8")).hexdigest()
+
+
+def _stable_ids(previous_ids: List[str], ids: List[str]) -> set:
+    """Ids of the features kept in their relative order, the longest increasing subsequence of previous positions"""
+    positions = {source_id: position for position, source_id in enumerate(previous_ids)}
+    kept = [source_id for source_id in ids if source_id in positions]
+    # Patience sorting, tails[i] is the position of the last element of the best subsequence of length i + 1
+    tails: List[int] = []
+    tail_ids: List[int] = []
+    parents: List[int] = []
+    for index, source_id in enumerate(kept):
+        length = bisect.bisect_left(tails, positions[source_id])
+        if length == len(tails):
+            tails.append(positions[source_id])
+            tail_ids.append(index)
+        else:
+            tails[length] = positions[source_id]
+            tail_ids[length] = index
+        parents.append(tail_ids[length - 1] if length > 0 else -1)
+    stable = set()
+    index = tail_ids[-1] if tail_ids else -1
+    while index != -1:
+        stable.add(kept[index])
+        index = parents[index]
+    return stable
+
+
+def build_delta(
+    previous: Sequence[Tuple[str, str]],
+    fragments: Sequence[SourceFragments],
+    from_hash: str,
+    to_hash: str,
+    generated: str,
+) -> Dict[str, Any]:
+    """The delta from the previous version of imagery.geojson to the one of fragments
+
+    Features are matched by their id. The delta lists the ids of removed features, the changed
+    features and the added features with their position in the new version. Features which
+    changed their position relative to the others, e.g. as their source moved to another
+    directory, are removed and added again, so apply_delta reproduces the new version exactly.
+
+    Parameters
+    ----------
+    previous : Sequence[Tuple[str, str]]
+        Id and hash of every feature of the previous version, in its order
+    fragments : Sequence[SourceFragments]
+        Fragments of the sources of the new version
+    from_hash : str
+        Content hash of the previous imagery.geojson, see geojson_hash
+    to_hash : str
+        Content hash of the new imagery.geojson
+    generated : str
+        The generation timestamp of the new version
+
+    Returns
+    -------
+    Dict[str, Any]
+        The delta
+    """
+    previous_hashes = dict(previous)
+    ids = [_feature_id(fragment) for fragment in fragments]
+    stable = _stable_ids([source_id for source_id, _ in previous], ids)
+
+    added: List[List[Any]] = []
+    changed: List[Any] = []
+    for position, (source_id, fragment) in enumerate(zip(ids, fragments)):
+        if source_id not in stable:
+            added.append([position, jsonio.loads(fragment.geojson)])
+        elif previous_hashes[source_id] != _feature_hash(fragment.geojson):
+            changed.append(jsonio.loads(fragment.geojson))
+    removed = [source_id for source_id, _ in previous if source_id not in stable]
+    return {
+        "format_version": artifacts.GEOJSON_FORMAT_VERSION,
+        "from": from_hash,
+        "to": to_hash,
+        "generated": generated,
+        "removed": removed,
+        "changed": changed,
+        "added": added,
+    }
+
+
+def _feature_id(fragment: SourceFragments) -> str:
+    source, _ = jsonio.loads_without_coordinates(fragment.geojson.encode("utf-8"))
+    return source["properties"]["id"]
+
+
+def apply_delta(data: bytes, delta: Dict[str, Any]) -> bytes:
+    """Applies delta to the imagery.geojson data it was built from
+
+    Raises
+    ------
+    ValueError
+        If data is not the version the delta starts from, or the result is not the version it leads to
+    """
+    if geojson_hash(data) != delta["from"]:
+        raise ValueError(f"The delta applies to {delta['from']}, not to {geojson_hash(data)}")
+    features = jsonio.loads(data)["features"]
+    removed = set(delta["removed"])
+    changed = {feature["properties"]["id"]: feature for feature in delta["changed"]}
+    features = [
+        changed.get(feature["properties"]["id"], feature)
+        for feature in features
+        if feature["properties"]["id"] not in removed
+    ]
+    for position, feature in delta["added"]:
+        features.insert(position, feature)
+
+    f = io.StringIO()
+    artifacts.write_geojson((jsonio.dumps(feature) for feature in features), f, delta["generated"])
+    f.write("\n")
+    result = f.getvalue().encode("utf-8")
+    if geojson_hash(result) != delta["to"]:
+        raise ValueError(f"Applying the delta resulted in {geojson_hash(result)}, not in {delta['to']}")
+    return result
+
+
+def write_deltas(
+    outdir: str, geojson_path: str, fragments: Sequence[SourceFragments], generated: str
+) -> Dict[str, Any]:
+    """Writes the delta from the previous build to the imagery.geojson at geojson_path
+
+    The ids and hashes of the features of the latest version are kept in a state file in outdir.
+    The delta index lists the last DELTA_HISTORY deltas, oldest first, so a client holding the
+    version of any of them applies the chain of deltas starting at its version. Nothing is written
+    if imagery.geojson did not change.
+
+    Parameters
+    ----------
+    outdir : str
+        Directory of the deltas, the index and the state
+    geojson_path : str
+        Path of the imagery.geojson of this build
+    fragments : Sequence[SourceFragments]
+        Fragments of the sources of this build
+    generated : str
+        The generation timestamp of the build
+
+    Returns
+    -------
+    Dict[str, Any]
+        The delta index
+    """
+    with io.open(geojson_path, "rb") as f:
+        to_hash = geojson_hash(f.read())
+    os.makedirs(outdir, exist_ok=True)
+    index_path = os.path.join(outdir, DELTA_INDEX)
+    state_path = os.path.join(outdir, DELTA_STATE)
+    index: Dict[str, Any] = {"format_version": artifacts.GEOJSON_FORMAT_VERSION, "latest": None, "deltas": []}
+    if os.path.exists(index_path):
+        index = jsonio.load(index_path)
+    state: Optional[Dict[str, Any]] = jsonio.load(state_path) if os.path.exists(state_path) else None
+    if state is not None and state["sha256"] == to_hash:
+        return index
+
+    if state is not None:
+        delta = build_delta(state["features"], fragments, state["sha256"], to_hash, generated)
+        filename = f"{state['sha256'][:16]}-{to_hash[:16]}.json"
+        data = (jsonio.dumps(delta) + "\n").encode("utf-8")
+        with io.open(os.path.join(outdir, filename), "wb") as f:
+            f.write(data)
+        index["deltas"].append(
+            {
+                "from": state["sha256"],
+                "to": to_hash,
+                "path": filename,
+                "generated": generated,
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size": len(data),
+            }
+        )
+        for expired in index["deltas"][:-DELTA_HISTORY]:
+            publish.remove_artifact(os.path.join(outdir, expired["path"]))
+        index["deltas"] = index["deltas"][-DELTA_HISTORY:]
+    index["latest"] = to_hash
+
+    state = {"sha256": to_hash, "features": [[_feature_id(f), _feature_hash(f.geojson)] for f in fragments]}
+    with io.open(state_path, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps(state))
+    with io.open(index_path, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps_pretty(index, sort_keys=True))
+        f.write("\n")
+    return index
+
+
+def delta_chain(index: Dict[str, Any], from_hash: str) -> Optional[List[Dict[str, Any]]]:
+    """The entries of the deltas leading from the version from_hash to the latest version
+
+    Returns
+    -------
+    Optional[List[Dict[str, Any]]]
+        The deltas to apply in order, empty if from_hash is the latest version, or None if the
+        version is too old or unknown and the full imagery.geojson has to be downloaded
+    """
+    if from_hash == index["latest"]:
+        return []
+    for position, entry in enumerate(index["deltas"]):
+        if entry["from"] == from_hash:
+            return index["deltas"][position:]
+    return None
@@ -0,0 +1,356 @@
+import io
+import math
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import artifacts, jsonio
+from .artifacts import Source, SourceFragments
+from .parallel import process_map
+
+FLAT_INDEX_FILENAME = "imagery.flat.bin"
+FLAT_INDEX_MAGIC = b"ELIFLAT\0"
+FLAT_INDEX_VERSION = 2
+# Coordinates are stored as integers in units of the 5 decimal points the sources are rounded to
+SCALE = 100000
+NODE_SIZE = 16
+# Magic, version, number of features, columns, values and tree nodes, the meta value and the
+# offset of the geometry data
+_HEADER = struct.Struct("<8sIIIIIIQ")
+# Offset and length of a value in the value data
+_VALUE = struct.Struct("<II")
+# Geometry type, width of the coordinate deltas in bytes and the number of polygons
+_GEOMETRY = struct.Struct("<BBxxI")
+# Value index of properties which are not set
+NO_VALUE = 0xFFFFFFFF
+
+_NODE = np.dtype([("bbox", "<i4", 4), ("index", "<u4")])
+# Original position of the feature and offset and length of its geometry in the geometry data
+_FEATURE = np.dtype([("position", "<u4"), ("offset", "<u4"), ("length", "<u4")])
+_WORLD = (-180 * SCALE, -90 * SCALE, 180 * SCALE, 90 * SCALE)
+_GEOMETRY_TYPES = {"Polygon": 1, "MultiPolygon": 2}
+_HILBERT_BITS = 16
+
+
+def _pad(data: bytes) -> bytes:
+    """data padded with zeros to a multiple of 4 bytes, keeping the following arrays aligned"""
+    return data + bytes(-len(data) % 4)
+
+
+def encode_geometry(geometry: Optional[Dict[str, Any]]) -> Tuple[Tuple[int, int, int, int], bytes]:
+    """Encodes a Polygon or MultiPolygon as delta encoded integer coordinates
+
+    The encoding holds the number of rings of every polygon and of positions of every ring, the
+    first position as int32 and the differences of the following positions to their predecessor,
+    in units of 1e-5 degrees. The differences are stored as int16 if all of them fit, else as
+    int32. Sources without geometry are encoded as empty geometry covering the world.
+
+    Returns
+    -------
+    Tuple[Tuple[int, int, int, int], bytes]
+        The integer bbox and the encoded geometry
+    """
+    if not geometry:
+        return _WORLD, _GEOMETRY.pack(0, 0, 0)
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    ring_counts = np.array([len(polygon) for polygon in polygons], dtype="<u4")
+    rings = [ring for polygon in polygons for ring in polygon]
+    position_counts = np.array([len(ring) for ring in rings], dtype="<u4")
+    positions = np.rint(np.array([position[:2] for ring in rings for position in ring]) * SCALE).astype(np.int64)
+    deltas = np.diff(positions, axis=0)
+    width = 2 if np.all(np.abs(deltas) <= np.iinfo(np.int16).max) else 4
+    minx, miny = positions.min(axis=0)
+    maxx, maxy = positions.max(axis=0)
+    data = _GEOMETRY.pack(_GEOMETRY_TYPES[geometry["type"]], width, len(polygons))
+    data += ring_counts.tobytes() + position_counts.tobytes() + positions[0].astype("<i4").tobytes()
+    data += deltas.astype(f"<i{width}").tobytes()
+    return (int(minx), int(miny), int(maxx), int(maxy)), _pad(data)
+
+
+def hilbert(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Positions of the cells x/y of a 2^16 x 2^16 grid on the Hilbert curve"""
+    x = x.astype(np.int64)
+    y = y.astype(np.int64)
+    d = np.zeros(len(x), dtype=np.int64)
+    mask = (1 << _HILBERT_BITS) - 1
+    s = 1 << (_HILBERT_BITS - 1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, mask - x, x)
+        y = np.where(flip, mask - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return d
+
+
+def _level_bounds(count: int) -> List[Tuple[int, int]]:
+    """Start and end of every level of the packed tree of count items, leaves first"""
+    bounds = []
+    start = 0
+    while True:
+        bounds.append((start, start + count))
+        start += count
+        if count == 1:
+            return bounds
+        count = math.ceil(count / NODE_SIZE)
+
+
+def pack_tree(bboxes: np.ndarray) -> np.ndarray:
+    """Packs the bboxes, sorted along the Hilbert curve, into an R-tree with NODE_SIZE children per node
+
+    The leaves refer to the position of their bbox, all other nodes to the position of their
+    first child. The root is the last node.
+    """
+    bounds = _level_bounds(len(bboxes))
+    nodes = np.zeros(bounds[-1][1], dtype=_NODE)
+    nodes["bbox"][: len(bboxes)] = bboxes
+    nodes["index"][: len(bboxes)] = np.arange(len(bboxes))
+    for (child_start, child_end), (start, end) in zip(bounds, bounds[1:]):
+        firsts = np.arange(child_start, child_end, NODE_SIZE)
+        children = nodes["bbox"][child_start:child_end]
+        nodes["index"][start:end] = firsts
+        offsets = firsts - child_start
+        nodes["bbox"][start:end, :2] = np.minimum.reduceat(children[:, :2], offsets)
+        nodes["bbox"][start:end, 2:] = np.maximum.reduceat(children[:, 2:], offsets)
+    return nodes
+
+
+def encode_feature(geojson: str) -> Tuple[Tuple[int, int, int, int], Dict[str, str], bytes]:
+    """The integer bbox, the serialized properties and the encoded geometry of a feature of imagery.geojson"""
+    source = jsonio.loads(geojson)
+    bbox, geometry = encode_geometry(source.get("geometry"))
+    properties = {key: jsonio.dumps(value) for key, value in (source.get("properties") or {}).items()}
+    return bbox, properties, geometry
+
+
+def encode_flat_index(features: Sequence[str], generated: str, jobs: Optional[int] = 1) -> bytes:
+    """Encodes the features of imagery.geojson into the binary flat index
+
+    The features are sorted along the Hilbert curve by the center of their bbox and indexed by a
+    packed R-tree, so the features of a region are close to each other in the file. Properties
+    are stored column-wise: every property has a column with the value of every feature, which
+    refers to the deduplicated JSON serialization of the value. Geometries are encoded with
+    encode_geometry. All tables are arrays of fixed size records, which FlatIndex reads in place.
+
+    Parameters
+    ----------
+    features : Sequence[str]
+        The serialized features of imagery.geojson
+    generated : str
+        The generation timestamp of the build
+    jobs : Optional[int], optional
+        Number of processes encoding the features, by default 1
+
+    Returns
+    -------
+    bytes
+        The flat index
+    """
+    encoded = process_map(encode_feature, features, jobs)
+    bboxes = np.array([bbox for bbox, _, _ in encoded], dtype=np.int64).reshape(-1, 4)
+    centers = (bboxes[:, :2] + bboxes[:, 2:]) // 2 - np.array(_WORLD[:2])
+    cells = centers * ((1 << _HILBERT_BITS) - 1) // (np.array(_WORLD[2:]) - np.array(_WORLD[:2]))
+    cells = np.clip(cells, 0, (1 << _HILBERT_BITS) - 1)
+    order = np.argsort(hilbert(cells[:, 0], cells[:, 1]), kind="stable")
+
+    values: List[bytes] = []
+    value_indexes: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        index = value_indexes.get(value)
+        if index is None:
+            index = value_indexes[value] = len(values)
+            values.append(value.encode("utf-8"))
+        return index
+
+    meta = intern(jsonio.dumps({"format_version": artifacts.GEOJSON_FORMAT_VERSION, "generated": generated}))
+    names = sorted({name for _, properties, _ in encoded for name in properties})
+    name_values = [intern(jsonio.dumps(name)) for name in names]
+    columns = np.full((len(names), len(encoded)), NO_VALUE, dtype="<u4")
+    for column, name in enumerate(names):
+        for row, index in enumerate(order):
+            value = encoded[index][1].get(name)
+            if value is not None:
+                columns[column, row] = intern(value)
+
+    feature_table = np.zeros(len(encoded), dtype=_FEATURE)
+    geometries = io.BytesIO()
+    for row, index in enumerate(order):
+        geometry = encoded[index][2]
+        feature_table[row] = (index, geometries.tell(), len(geometry))
+        geometries.write(geometry)
+    nodes = pack_tree(bboxes[order]) if len(encoded) else np.zeros(0, dtype=_NODE)
+
+    value_table = io.BytesIO()
+    offset = 0
+    for data in values:
+        value_table.write(_VALUE.pack(offset, len(data)))
+        offset += len(data)
+    body = [
+        np.array(name_values, dtype="<u4").tobytes(),
+        value_table.getvalue(),
+        nodes.tobytes(),
+        feature_table.tobytes(),
+        columns.tobytes(),
+        _pad(b"".join(values)),
+    ]
+    geometry_offset = _HEADER.size + sum(len(part) for part in body)
+    header = _HEADER.pack(
+        FLAT_INDEX_MAGIC,
+        FLAT_INDEX_VERSION,
+        len(encoded),
+        len(names),
+        len(values),
+        len(nodes),
+        meta,
+        geometry_offset,
+    )
+    return b"".join([header] + body + [geometries.getvalue()])
+
+
+def write_flat_index(
+    path: str, fragments: Sequence[SourceFragments], generated: str, jobs: Optional[int] = None
+) -> None:
+    """Encodes the features of fragments with encode_flat_index and writes the flat index to path"""
+    data = encode_flat_index([fragment.geojson for fragment in fragments], generated, jobs)
+    tmp_path = path + ".tmp"
+    with io.open(tmp_path, "wb") as f:
+        f.write(data)
+    # An editor reading the index keeps the mapping of the previous file
+    os.replace(tmp_path, path)
+
+
+class FlatIndex:
+    """Reads features from a flat index written by write_flat_index
+
+    The index is memory mapped and its tables are used in place as numpy arrays, so opening it
+    only reads the header. A bbox query walks the packed R-tree and only decodes the properties
+    and geometries of the features it finds.
+    """
+
+    def __init__(self, path: str) -> None:
+        with io.open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{path} is not a flat index")
+        magic, version, features, columns, values, nodes, meta, geometry_offset = _HEADER.unpack_from(self._mmap)
+        if magic != FLAT_INDEX_MAGIC or version != FLAT_INDEX_VERSION:
+            raise ValueError(f"{path} is not a flat index of version {FLAT_INDEX_VERSION}")
+        offset = _HEADER.size
+        self._names = np.frombuffer(self._mmap, "<u4", columns, offset)
+        offset += self._names.nbytes
+        self._values = np.frombuffer(self._mmap, "<u4", values * 2, offset).reshape(-1, 2)
+        offset += self._values.nbytes
+        self._nodes = np.frombuffer(self._mmap, _NODE, nodes, offset)
+        offset += self._nodes.nbytes
+        self._features = np.frombuffer(self._mmap, _FEATURE, features, offset)
+        offset += self._features.nbytes
+        self._columns = np.frombuffer(self._mmap, "<u4", columns * features, offset).reshape(columns, features)
+        self._value_offset = offset + self._columns.nbytes
+        self._geometry_offset = geometry_offset
+        self._levels = _level_bounds(features) if features else []
+        self.meta: Dict[str, Any] = self._value(meta)
+        self.columns: List[str] = [self._value(name) for name in self._names]
+
+    def close(self) -> None:
+        # The arrays must be released before the mapping can be closed
+        self._names = self._values = self._nodes = self._features = self._columns = None  # type: ignore
+        self._mmap.close()
+
+    def __enter__(self) -> "FlatIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _value(self, index: int) -> Any:
+        offset, length = self._values[index]
+        start = self._value_offset + int(offset)
+        return jsonio.loads(self._mmap[start : start + int(length)])
+
+    def properties(self, row: int) -> Dict[str, Any]:
+        """The properties of the feature in row"""
+        return {
+            name: self._value(value) for name, value in zip(self.columns, self._columns[:, row]) if value != NO_VALUE
+        }
+
+    def geometry(self, row: int) -> Optional[Dict[str, Any]]:
+        """The geometry of the feature in row, None for features without geometry"""
+        _, offset, length = self._features[row]
+        start = self._geometry_offset + int(offset)
+        geometry_type, width, polygons = _GEOMETRY.unpack_from(self._mmap, start)
+        if geometry_type == 0:
+            return None
+        start += _GEOMETRY.size
+        ring_counts = np.frombuffer(self._mmap, "<u4", polygons, start)
+        start += ring_counts.nbytes
+        position_counts = np.frombuffer(self._mmap, "<u4", int(ring_counts.sum()), start)
+        start += position_counts.nbytes
+        first = np.frombuffer(self._mmap, "<i4", 2, start)
+        start += first.nbytes
+        deltas = np.frombuffer(self._mmap, f"<i{width}", (int(position_counts.sum()) - 1) * 2, start)
+        positions = np.concatenate([first.reshape(1, 2), deltas.reshape(-1, 2)])
+        coordinates = (np.cumsum(positions, axis=0, dtype=np.int64) / SCALE).tolist()
+
+        rings = []
+        position = 0
+        for count in position_counts.tolist():
+            rings.append(coordinates[position : position + count])
+            position += count
+        result = []
+        ring = 0
+        for count in ring_counts.tolist():
+            result.append(rings[ring : ring + count])
+            ring += count
+        if geometry_type == _GEOMETRY_TYPES["Polygon"]:
+            return {"type": "Polygon", "coordinates": result[0]}
+        return {"type": "MultiPolygon", "coordinates": result}
+
+    def feature(self, row: int) -> Source:
+        """The feature in row, equal to the feature of imagery.geojson"""
+        return {"geometry": self.geometry(row), "properties": self.properties(row), "type": "Feature"}
+
+    def search(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """Rows of the features whose bbox intersects the bbox, in the order of imagery.geojson"""
+        if not self._levels:
+            return np.zeros(0, dtype=np.int64)
+        query = [
+            math.floor(west * SCALE),
+            math.floor(south * SCALE),
+            math.ceil(east * SCALE),
+            math.ceil(north * SCALE),
+        ]
+
+        def intersecting(nodes: np.ndarray) -> np.ndarray:
+            bbox = self._nodes["bbox"][nodes]
+            return nodes[
+                (bbox[:, 0] <= query[2])
+                & (bbox[:, 1] <= query[3])
+                & (bbox[:, 2] >= query[0])
+                & (bbox[:, 3] >= query[1])
+            ]
+
+        nodes = intersecting(np.array([self._levels[-1][0]]))
+        for _, end in reversed(self._levels[:-1]):
+            # The children of a node are the NODE_SIZE nodes following its first child, within its level
+            children = (self._nodes["index"][nodes].astype(np.int64)[:, None] + np.arange(NODE_SIZE)).ravel()
+            nodes = intersecting(children[children < end])
+        rows = self._nodes["index"][nodes].astype(np.int64)
+        return rows[np.argsort(self._features["position"][rows], kind="stable")]
+
+    def in_bbox(self, west: float, south: float, east: float, north: float) -> List[Source]:
+        """Features whose bbox intersects the bbox, in the order of imagery.geojson
+
+        Features without geometry cover the world and are always returned.
+        """
+        return [self.feature(row) for row in self.search(west, south, east, north)]
@@ -0,0 +1,210 @@
+import io
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, TextIO, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ELI_JSON_BACKEND=json disables the orjson backend even if it is installed
+if os.environ.get("ELI_JSON_BACKEND", "orjson") != "orjson":
+    orjson = None
+
+# Non-zero floats json formats in positional notation, orjson formats others differently: 1e-05 is
+# 0.00001, 1e+16 is 1e16, 1e-07 is 1e-7 and NaN and Infinity are null
+_POSITIONAL_MIN = 1e-4
+_POSITIONAL_MAX = 1e16
+
+_COORDINATES_KEY = b'"coordinates"'
+_COORDINATES_SEPARATOR = re.compile(rb"\s*:\s*\[")
+# All characters of a JSON array of numbers
+_NUMERIC_ARRAY = b"0123456789+-.eE,[] \t\r\n"
+
+
+class DuplicateKeyError(ValueError):
+    """A JSON object has the same key more than once"""
+
+
+def backend() -> str:
+    """Name of the JSON backend in use, "orjson" or "json" """
+    return "json" if orjson is None else "orjson"
+
+
+def round_float(value: str) -> float:
+    """Simplify all floats to 5 decimal points"""
+    return round(float(value), 5)
+
+
+def round_floats(obj: Any) -> Any:
+    """Simplifies all floats in obj to 5 decimal points, returning a copy of the lists and dicts"""
+    if type(obj) is float:
+        return round(obj, 5)
+    if type(obj) is list:
+        return [round_floats(value) for value in obj]
+    if type(obj) is dict:
+        return {key: round_floats(value) for key, value in obj.items()}
+    return obj
+
+
+def _unique_object(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    obj = dict(pairs)
+    if len(obj) != len(pairs):
+        seen = set()
+        for key, _ in pairs:
+            if key in seen:
+                raise DuplicateKeyError("duplicate key: %r" % (key,))
+            seen.add(key)
+    return obj
+
+
+def loads(data: Union[str, bytes], rounded: bool = False, unique_keys: bool = False) -> Any:
+    """Parses the JSON document data
+
+    Parameters
+    ----------
+    data : Union[str, bytes]
+        The JSON document, bytes are decoded as UTF-8
+    rounded : bool, optional
+        Simplify all floats to 5 decimal points, by default False
+    unique_keys : bool, optional
+        Raise DuplicateKeyError if an object has the same key more than once, by default False. As
+        orjson silently keeps the last value, such documents are always parsed with json.
+
+    Returns
+    -------
+    Any
+        The parsed document
+    """
+    if orjson is not None and not unique_keys:
+        obj = orjson.loads(data)
+        return round_floats(obj) if rounded else obj
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(
+        data,
+        parse_float=round_float if rounded else None,
+        object_pairs_hook=_unique_object if unique_keys else None,
+    )
+
+
+def load(path: str, rounded: bool = False, unique_keys: bool = False) -> Any:
+    """Parses the JSON file at path, see loads"""
+    with io.open(path, "rb") as f:
+        return loads(f.read(), rounded, unique_keys)
+
+
+@dataclass
+class SkippedCoordinates:
+    """The undecoded coordinates of a geometry, see loads_without_coordinates"""
+
+    data: bytes
+    start: int
+    end: int
+
+    def decode(self) -> Any:
+        """The coordinates, parsed like loads"""
+        return loads(self.data[self.start : self.end])
+
+
+def _coordinates_span(data: bytes) -> Optional[Tuple[int, int]]:
+    """Byte range of the value of the only "coordinates" member in data, if it is an array of numbers"""
+    key = data.find(_COORDINATES_KEY)
+    if key == -1 or data.find(_COORDINATES_KEY, key + 1) != -1:
+        return None
+    separator = _COORDINATES_SEPARATOR.match(data, key + len(_COORDINATES_KEY))
+    if separator is None:
+        return None
+    start = separator.end() - 1
+    # An array of numbers ends before the next string or object end, found at the speed of memchr
+    end = len(data)
+    for delimiter in [b'"', b"}"]:
+        position = data.find(delimiter, start)
+        if position != -1:
+            end = min(end, position)
+    end = data.rfind(b"]", start, end) + 1
+    if end == 0 or data[start:end].translate(None, _NUMERIC_ARRAY):
+        return None
+    return start, end
+
+
+def loads_without_coordinates(data: bytes) -> Tuple[Any, Optional[SkippedCoordinates]]:
+    """Parses a source, skipping the coordinates of its geometry
+
+    The coordinates, which are most of the bytes of a source, are located with a few byte
+    searches and replaced by null before parsing, so no lists of floats are built for them. The
+    returned source has None as coordinates of its geometry. If the coordinates cannot be skipped
+    safely, e.g. as "coordinates" occurs more than once, the source is parsed completely.
+
+    Parameters
+    ----------
+    data : bytes
+        The JSON document of the source
+
+    Returns
+    -------
+    Tuple[Any, Optional[SkippedCoordinates]]
+        The parsed source and its skipped coordinates, which can be decoded later, or None if
+        the coordinates were not skipped
+    """
+    span = _coordinates_span(data)
+    if span is not None:
+        start, end = span
+        source = loads(data[:start] + b"null" + data[end:])
+        geometry = source.get("geometry") if isinstance(source, dict) else None
+        if isinstance(geometry, dict) and "coordinates" in geometry and geometry["coordinates"] is None:
+            return source, SkippedCoordinates(data, start, end)
+    return loads(data), None
+
+
+def load_without_coordinates(path: str) -> Tuple[Any, Optional[SkippedCoordinates]]:
+    """Parses the source file at path, skipping the coordinates of its geometry, see loads_without_coordinates"""
+    with io.open(path, "rb") as f:
+        return loads_without_coordinates(f.read())
+
+
+def _orjson_floats(obj: Any) -> bool:
+    """Whether orjson formats all floats in obj like json"""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        value_type = type(value)
+        if value_type is float:
+            # Also false for NaN
+            if value != 0.0 and not _POSITIONAL_MIN <= abs(value) < _POSITIONAL_MAX:
+                return False
+        elif value_type is list or value_type is tuple:
+            stack.extend(value)
+        elif value_type is dict:
+            stack.extend(value.values())
+    return True
+
+
+def dumps(obj: Any, sort_keys: bool = True) -> str:
+    """Serializes obj in the compact format used by all JSON artifacts
+
+    The output is always equal to json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False,
+    separators=(",", ":")). Documents orjson would format differently, e.g. with floats below
+    1e-4 or NaN, or cannot serialize are serialized with json. Only the floats are checked
+    beforehand, not the serialized document.
+    """
+    if orjson is not None and _orjson_floats(obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_pretty(obj: Any, sort_keys: bool = False) -> str:
+    """Serializes obj indented by 4 spaces, the format of the source files"""
+    return json.dumps(obj, indent=4, sort_keys=sort_keys, ensure_ascii=False)
+
+
+def dump_source(source: Any, f: TextIO) -> None:
+    """Writes source to f in the format of the source files"""
+    f.write(dumps_pretty(source))
+    f.write("\n")
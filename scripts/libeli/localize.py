@@ -0,0 +1,238 @@
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from . import artifacts, jsonio, publish
+from .artifacts import SourceFragments
+from .parallel import process_map
+
+LOCALIZED_INDEX = "index.json"
+# The template extracted by extract_i18n.py, it has no translations
+TEMPLATE_LANGUAGE = "en"
+
+
+def _code_fingerprint() -> str:
+    """Hash of this module, localized artifacts rendered by other code are rendered again"""
+    with io.open(__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def find_languages(translations_dir: str, include_template: bool = False) -> Dict[str, str]:
+    """Paths of the translation files in translations_dir keyed by language, by default without the template"""
+    languages = {}
+    for filename in sorted(os.listdir(translations_dir)):
+        language, extension = os.path.splitext(filename)
+        if extension == ".yaml" and (include_template or language != TEMPLATE_LANGUAGE):
+            languages[language] = os.path.join(translations_dir, filename)
+    return languages
+
+
+def load_translations(path: str) -> Dict[str, Dict[str, Any]]:
+    """The translated strings of a translation file in the format of i18n/en.yaml, keyed by source id"""
+    with io.open(path, "rb") as f:
+        data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    if not data:
+        return {}
+    language_data = next(iter(data.values())) or {}
+    return language_data.get("imagery") or {}
+
+
+def translatable_properties(fragments: Sequence[SourceFragments]) -> Dict[str, Dict[str, Any]]:
+    """The properties of all sources with i18n enabled, keyed by id
+
+    The properties are parsed from the GeoJSON fragments without their coordinates, see
+    jsonio.loads_without_coordinates.
+    """
+    properties = {}
+    for fragment in fragments:
+        if not fragment.i18n:
+            continue
+        source, _ = jsonio.loads_without_coordinates(fragment.geojson.encode("utf-8"))
+        properties[source["properties"]["id"]] = source["properties"]
+    return properties
+
+
+def localize_properties(properties: Dict[str, Any], strings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The properties with the translated name, description and attribution text applied
+
+    Strings which are not translated, i.e. missing or empty, keep their English value.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The localized properties, or None if no string differs from the English one
+    """
+    localized = dict(properties)
+    changed = False
+    for key in ["name", "description"]:
+        value = strings.get(key)
+        if key in properties and value and value != properties[key]:
+            localized[key] = value
+            changed = True
+    text = (strings.get("attribution") or {}).get("text")
+    attribution = properties.get("attribution")
+    if isinstance(attribution, dict) and "text" in attribution and text and text != attribution["text"]:
+        localized["attribution"] = dict(attribution, text=text)
+        changed = True
+    return localized if changed else None
+
+
+def _inputs_hash(language_sha256: str, ids: Sequence[str], properties: Dict[str, Dict[str, Any]]) -> str:
+    """Hash of everything the localized artifact of a language depends on"""
+    digest = hashlib.sha256(language_sha256.encode("utf-8"))
+    for source_id in ids:
+        digest.update(jsonio.dumps([source_id, properties.get(source_id)]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class LanguageTask:
+    """A language whose localized artifact is (re-)written"""
+
+    language: str
+    translations_path: str
+    path: str
+    properties: Dict[str, Dict[str, Any]]
+
+
+def render_language(task: LanguageTask) -> Dict[str, Any]:
+    """Writes the localized artifact of a language and returns its index entry"""
+    with io.open(task.translations_path, "rb") as f:
+        language_data = f.read()
+    translations = load_translations(task.translations_path)
+    sources = {}
+    for source_id in sorted(translations):
+        if source_id in task.properties:
+            localized = localize_properties(task.properties[source_id], translations[source_id] or {})
+            if localized is not None:
+                sources[source_id] = localized
+
+    localized_data = {
+        "format_version": artifacts.GEOJSON_FORMAT_VERSION,
+        "language": task.language,
+        "sources": sources,
+    }
+    data = (artifacts.dumps(localized_data) + "\n").encode("utf-8")
+    os.makedirs(os.path.dirname(task.path), exist_ok=True)
+    with io.open(task.path, "wb") as f:
+        f.write(data)
+
+    language_sha256 = hashlib.sha256(language_data).hexdigest()
+    translated = sorted(translations)
+    return {
+        "path": os.path.basename(task.path),
+        "sources": len(sources),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "translations_sha256": language_sha256,
+        "translated_ids": translated,
+        "inputs": _inputs_hash(language_sha256, translated, task.properties),
+    }
+
+
+def _is_current(
+    entry: Optional[Dict[str, Any]], translations_path: str, path: str, properties: Dict[str, Dict[str, Any]]
+) -> bool:
+    """Whether the localized artifact of entry is up to date with its translations and sources"""
+    if entry is None or not os.path.exists(path):
+        return False
+    with io.open(translations_path, "rb") as f:
+        language_sha256 = hashlib.sha256(f.read()).hexdigest()
+    if language_sha256 != entry["translations_sha256"]:
+        return False
+    return _inputs_hash(language_sha256, entry["translated_ids"], properties) == entry["inputs"]
+
+
+def _load_state(state_path: Optional[str]) -> Dict[str, Any]:
+    """The index entries and input hashes of the previous build, if it was rendered by this code"""
+    if state_path is None or not os.path.exists(state_path):
+        return {}
+    try:
+        state = jsonio.load(state_path)
+    except ValueError:
+        return {}
+    if state.get("renderer") != _code_fingerprint():
+        return {}
+    return state.get("languages", {})
+
+
+def write_localized(
+    outdir: str,
+    translations_dir: str,
+    fragments: Sequence[SourceFragments],
+    generated: str,
+    jobs: Optional[int] = None,
+    state_path: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Writes the localized artifact of every language and their index
+
+    The localized artifact <language>.json of a language maps the id of every source translated
+    into the language to its properties with the translated name, description and attribution
+    text, so a client replaces the properties of these features of imagery.geojson. The
+    geometries are only in the base artifact and are not repeated for each language.
+
+    The languages are rendered in parallel. With state_path, the hashes of the translation files
+    and of the properties of the translated sources are kept, so only languages whose translation
+    file or translated sources changed since the last build are rendered again.
+
+    Parameters
+    ----------
+    outdir : str
+        Directory to write the localized artifacts to
+    translations_dir : str
+        Directory of the translation files, e.g. i18n
+    fragments : Sequence[SourceFragments]
+        Fragments of all sources of the build
+    generated : str
+        The generation timestamp of the build, only written to the index
+    jobs : Optional[int], optional
+        Number of processes rendering the languages, by default the number of CPUs
+    state_path : Optional[str], optional
+        Path of the file keeping the hashes between builds. If None, all languages are rendered.
+
+    Returns
+    -------
+    Tuple[Dict[str, Any], List[str]]
+        The index of the localized artifacts and the languages which were rendered again
+    """
+    previous = _load_state(state_path)
+    properties = translatable_properties(fragments)
+    languages = find_languages(translations_dir)
+    state: Dict[str, Any] = {}
+    tasks = []
+    for language, translations_path in languages.items():
+        path = os.path.join(outdir, f"{language}.json")
+        entry = previous.get(language)
+        if _is_current(entry, translations_path, path, properties):
+            state[language] = entry
+        else:
+            tasks.append(LanguageTask(language, translations_path, path, properties))
+    for task, entry in zip(tasks, process_map(render_language, tasks, jobs)):
+        state[task.language] = entry
+
+    # Remove localized artifacts of languages which have no translation file anymore, with their compressed siblings
+    index_path = os.path.join(outdir, LOCALIZED_INDEX)
+    if os.path.exists(index_path):
+        for language, entry in jsonio.load(index_path).get("languages", {}).items():
+            if language not in languages:
+                publish.remove_artifact(os.path.join(outdir, entry["path"]))
+
+    index = {
+        language: {key: state[language][key] for key in ["path", "sources", "sha256", "size"]}
+        for language in sorted(state)
+    }
+    localized_index = {"format_version": artifacts.GEOJSON_FORMAT_VERSION, "generated": generated, "languages": index}
+    with io.open(index_path, "w", encoding="utf-8") as f:
+        f.write(artifacts.dumps(localized_index))
+        f.write("\n")
+    if state_path is not None:
+        directory = os.path.dirname(state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with io.open(state_path, "w", encoding="utf-8") as f:
+            f.write(jsonio.dumps({"renderer": _code_fingerprint(), "languages": state}, sort_keys=False))
+    return localized_index, [task.language for task in tasks]
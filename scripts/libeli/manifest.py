@@ -0,0 +1,278 @@
+import hashlib
+import io
+import os
+import sqlite3
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from . import artifacts, jsonio, quantize, simplify, tiles
+from .artifacts import SourceFragments
+from .parallel import process_map
+from .profiling import Profile, timed
+
+MANIFEST_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    fragments TEXT NOT NULL
+);
+"""
+
+
+def renderer_fingerprint(simplify_zooms: Sequence[int] = (), coverage_zooms: Sequence[int] = ()) -> str:
+    """Hash of the code and options rendering the fragments
+
+    Fragments of a manifest written by other code or with other options are discarded.
+    """
+    digest = hashlib.sha256()
+    modules = [artifacts.__file__, jsonio.__file__, quantize.__file__, simplify.__file__, tiles.__file__, __file__]
+    for module in modules:
+        with io.open(module, "rb") as f:
+            digest.update(f.read())
+    digest.update(repr([list(simplify_zooms), list(coverage_zooms)]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """Content hash and pre-serialized fragments of a single source file"""
+
+    sha256: str
+    mtime_ns: int
+    size: int
+    fragments: SourceFragments
+
+
+@dataclass
+class ManifestUpdate:
+    """Paths of sources which were (re-)serialized or dropped by BuildManifest.update()"""
+
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: int
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged sources"
+        )
+
+
+class BuildManifest:
+    """Per-source content hashes and pre-serialized artifact fragments.
+
+    Only sources which were added or whose content changed since the manifest was written are
+    parsed and serialized again. Unchanged sources are detected by size and mtime first and by
+    their SHA-256 content hash second, so touching a file without changing it is cheap as well.
+
+    The manifest is a SQLite database with a row per source, so saving it only writes the rows
+    of the sources which were added, changed, touched or removed.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, simplify_zooms: Sequence[int] = (), coverage_zooms: Sequence[int] = ()
+    ) -> None:
+        """Inits the BuildManifest
+
+        Parameters
+        ----------
+        path : Optional[str], optional
+            Path of the manifest database. If None, the manifest is kept in memory only.
+        simplify_zooms : Sequence[int], optional
+            Zoom levels to render simplified features for, by default none
+        coverage_zooms : Sequence[int], optional
+            Zoom levels to find the tiles of the sources at, by default none
+        """
+        self.path = path
+        self.simplify_zooms = list(simplify_zooms)
+        self.coverage_zooms = list(coverage_zooms)
+        self.entries: Dict[str, ManifestEntry] = {}
+        # Rows to write on save: all of them, the ones with new fragments, new mtimes or removed sources
+        self._reset = True
+        self._rendered: Set[str] = set()
+        self._touched: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._fingerprint = renderer_fingerprint(self.simplify_zooms, self.coverage_zooms)
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str) -> None:
+        connection = sqlite3.connect(path)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            if meta.get("version") != str(MANIFEST_VERSION) or meta.get("renderer") != self._fingerprint:
+                return
+            rows = connection.execute("SELECT path, sha256, mtime_ns, size, fragments FROM sources").fetchall()
+        except sqlite3.DatabaseError:
+            return
+        finally:
+            connection.close()
+        for source_path, sha256, mtime_ns, size, fragments in rows:
+            self.entries[source_path] = ManifestEntry(
+                sha256=sha256,
+                mtime_ns=mtime_ns,
+                size=size,
+                fragments=SourceFragments(**jsonio.loads(fragments)),
+            )
+        self._reset = False
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path)
+        try:
+            connection.executescript(SCHEMA)
+        except sqlite3.DatabaseError:
+            # Not a manifest database, e.g. a manifest of an older version
+            connection.close()
+            os.remove(path)
+            connection = sqlite3.connect(path)
+            connection.executescript(SCHEMA)
+        return connection
+
+    def save(self) -> None:
+        """Writes the rows of the sources modified since the manifest was loaded or saved
+
+        All rows are written in a single transaction, so an interrupted build never leaves a
+        partially written manifest behind.
+        """
+        if self.path is None or not (self._reset or self._rendered or self._touched or self._removed):
+            return
+        rendered = self.entries if self._reset else self._rendered
+        connection = self._connect(self.path)
+        try:
+            with connection:
+                if self._reset:
+                    connection.execute("DELETE FROM sources")
+                    meta = {"version": str(MANIFEST_VERSION), "renderer": self._fingerprint}
+                    connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+                connection.executemany(
+                    "DELETE FROM sources WHERE path = ?", ((source_path,) for source_path in self._removed)
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (
+                            source_path,
+                            self.entries[source_path].sha256,
+                            self.entries[source_path].mtime_ns,
+                            self.entries[source_path].size,
+                            jsonio.dumps(vars(self.entries[source_path].fragments), sort_keys=False),
+                        )
+                        for source_path in rendered
+                    ),
+                )
+                connection.executemany(
+                    "UPDATE sources SET mtime_ns = ?, size = ? WHERE path = ?",
+                    (
+                        (self.entries[source_path].mtime_ns, self.entries[source_path].size, source_path)
+                        for source_path in self._touched
+                        if source_path not in rendered
+                    ),
+                )
+        finally:
+            connection.close()
+        self._reset = False
+        self._rendered.clear()
+        self._touched.clear()
+        self._removed.clear()
+
+    def update(
+        self, paths: List[str], jobs: Optional[int] = None, profile: Optional[Profile] = None
+    ) -> ManifestUpdate:
+        """Synchronizes the manifest with the source files in paths
+
+        Parameters
+        ----------
+        paths : List[str]
+            Paths of all sources of the build
+        jobs : Optional[int], optional
+            Number of processes serializing added or changed sources, by default the number of CPUs
+        profile : Optional[Profile], optional
+            Profile to record the "scan" and "render" stages and the added or changed sources in,
+            by default None
+
+        Returns
+        -------
+        ManifestUpdate
+            The sources which were added, changed or removed
+        """
+        with timed(profile, "scan"):
+            result, stale = self._scan(paths)
+        stale_paths = [source_path for source_path, _, _ in stale]
+        with timed(profile, "render"):
+            if profile is None:
+                fragments = artifacts.render_source_files(stale_paths, jobs, self.simplify_zooms, self.coverage_zooms)
+            else:
+                func = partial(
+                    artifacts.profile_source_file,
+                    simplify_zooms=self.simplify_zooms,
+                    coverage_zooms=self.coverage_zooms,
+                )
+                fragments = []
+                for source_fragments, source_profile in process_map(func, stale_paths, jobs):
+                    fragments.append(source_fragments)
+                    profile.add_source(source_profile)
+        for (source_path, sha256, stat), source_fragments in zip(stale, fragments):
+            if source_path in self.entries:
+                result.changed.append(source_path)
+            else:
+                result.added.append(source_path)
+            self._rendered.add(source_path)
+            self.entries[source_path] = ManifestEntry(
+                sha256=sha256,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                fragments=source_fragments,
+            )
+        return result
+
+    def _scan(self, paths: List[str]) -> Tuple[ManifestUpdate, List[Tuple[str, str, os.stat_result]]]:
+        """Removes sources not in paths and finds the sources which need to be serialized again"""
+        result = ManifestUpdate(added=[], changed=[], removed=[], unchanged=0)
+        wanted = set(paths)
+        for source_path in list(self.entries):
+            if source_path not in wanted:
+                del self.entries[source_path]
+                result.removed.append(source_path)
+                self._removed.add(source_path)
+                self._rendered.discard(source_path)
+                self._touched.discard(source_path)
+
+        stale: List[Tuple[str, str, os.stat_result]] = []
+        for source_path in paths:
+            stat = os.stat(source_path)
+            entry = self.entries.get(source_path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                result.unchanged += 1
+                continue
+
+            with io.open(source_path, "rb") as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+            if entry is not None and entry.sha256 == sha256:
+                entry.mtime_ns = stat.st_mtime_ns
+                entry.size = stat.st_size
+                self._touched.add(source_path)
+                result.unchanged += 1
+                continue
+            stale.append((source_path, sha256, stat))
+        return result, stale
+
+    def fragments(self, paths: List[str]) -> List[SourceFragments]:
+        """Fragments of the sources in the order of paths"""
+        return [self.entries[source_path].fragments for source_path in paths]
+
+    def source_hashes(self, paths: List[str]) -> List[str]:
+        """SHA-256 content hashes of the sources in the order of paths"""
+        return [self.entries[source_path].sha256 for source_path in paths]
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def default_jobs() -> int:
+    """Number of CPUs available to this process"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _apply_chunk(func: Callable[[T], R], chunk: Sequence[T]) -> List[R]:
+    return [func(item) for item in chunk]
+
+
+def process_imap(func: Callable[[T], R], items: Sequence[T], jobs: Optional[int] = None) -> Iterator[R]:
+    """Applies func to all items in a process pool and yields the results as they become available
+
+    The results are yielded in the order of items, regardless of which worker finished first. Only a
+    few chunks per worker are in flight at any time, so memory stays bounded even if the consumer
+    is slower than the workers.
+
+    Parameters
+    ----------
+    func : Callable[[T], R]
+        Picklable function, i.e. defined on module level or a functools.partial of such a function
+    items : Sequence[T]
+        The items to process, e.g. the paths of source files
+    jobs : Optional[int], optional
+        Number of worker processes. Defaults to the number of available CPUs. With 1 job or less
+        than 2 items, func is applied in the current process.
+
+    Yields
+    ------
+    Iterator[R]
+        The results of func in the order of items
+    """
+    if jobs is None:
+        jobs = default_jobs()
+    jobs = min(jobs, len(items))
+    if jobs <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    # Small chunks keep all workers busy even if a few sources with huge geometries end up in one chunk
+    chunksize = max(1, min(16, len(items) // (jobs * 8)))
+    chunks = (items[i : i + chunksize] for i in range(0, len(items), chunksize))
+
+    # The scripts using process_map have no __main__ guard, so workers must not re-import them as spawn would
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+        pending: Deque[Future[List[R]]] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_apply_chunk, func, chunk))
+            if len(pending) >= jobs * 4:
+                break
+        while pending:
+            results = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(_apply_chunk, func, chunk))
+            yield from results
+
+
+def process_map(func: Callable[[T], R], items: Sequence[T], jobs: Optional[int] = None) -> List[R]:
+    """Applies func to all items in a process pool, see process_imap
+
+    Returns
+    -------
+    List[R]
+        The results of func in the order of items
+    """
+    return list(process_imap(func, items, jobs))
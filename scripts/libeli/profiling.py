@@ -0,0 +1,138 @@
+import io
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Union
+
+from . import jsonio
+
+
+class StageTimer:
+    """Accumulates the time spent in named stages"""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(timer: Optional[Union[StageTimer, "Profile"]], name: str) -> ContextManager[None]:
+    """Times the stage name with timer or profile, or nothing if it is None"""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def count_vertices(geometry: Optional[Dict[str, Any]]) -> int:
+    """Number of positions of a Polygon or MultiPolygon"""
+    if not isinstance(geometry, dict) or geometry.get("type") not in {"Polygon", "MultiPolygon"}:
+        return 0
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    return sum(len(ring) for polygon in polygons for ring in polygon)
+
+
+@dataclass
+class SourceProfile:
+    """The time spent on a single source in every stage"""
+
+    path: str
+    vertices: int
+    stages: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+
+class Profile:
+    """Collects the stage timings of a build or check and the profiles of all sources
+
+    Stages of the whole run are timed in wall time. Stages of single sources, which may run in
+    worker processes, are summed over all sources.
+    """
+
+    def __init__(self) -> None:
+        self.timer = StageTimer()
+        self.sources: List[SourceProfile] = []
+        self._start = time.perf_counter()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Times a stage of the whole run"""
+        return self.timer.stage(name)
+
+    def add_source(self, source: SourceProfile) -> None:
+        self.sources.append(source)
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """The profile report
+
+        Parameters
+        ----------
+        top : int, optional
+            Number of sources to list as slowest and largest sources, by default 20
+
+        Returns
+        -------
+        Dict[str, Any]
+            The total wall time, the wall time of every stage, the time of every source stage
+            summed over all sources and the slowest and largest sources
+        """
+        source_stages: Dict[str, float] = {}
+        for source in self.sources:
+            for name, seconds in source.stages.items():
+                source_stages[name] = source_stages.get(name, 0.0) + seconds
+
+        def describe(source: SourceProfile) -> Dict[str, Any]:
+            return {"path": source.path, "vertices": source.vertices, "total": source.total, "stages": source.stages}
+
+        return {
+            "total": time.perf_counter() - self._start,
+            "stages": dict(self.timer.stages),
+            "sources": len(self.sources),
+            "source_stages": source_stages,
+            "slowest_sources": [describe(s) for s in sorted(self.sources, key=lambda s: -s.total)[:top]],
+            "largest_sources": [describe(s) for s in sorted(self.sources, key=lambda s: -s.vertices)[:top]],
+        }
+
+    def write(self, path: str, top: int = 20) -> str:
+        """Writes the report as JSON to path and returns its summary, see summary"""
+        report = self.report(top)
+        with io.open(path, "w", encoding="utf-8") as f:
+            f.write(jsonio.dumps_pretty(report))
+            f.write("\n")
+        return summary(report)
+
+
+def _slowest_stage(stages: Dict[str, float]) -> str:
+    if not stages:
+        return ""
+    name = max(stages, key=lambda name: stages[name])
+    return f"{name} {stages[name]:.3f}s"
+
+
+def summary(report: Dict[str, Any], top: int = 10) -> str:
+    """Human readable summary of a profile report"""
+    lines = [f"Profile: {report['total']:.2f}s, {report['sources']} sources profiled"]
+    lines.append("Stages:")
+    for name, seconds in report["stages"].items():
+        lines.append(f"  {name:<24}{seconds:>9.3f}s")
+    if report["source_stages"]:
+        lines.append("Source stages, summed over all sources:")
+        for name, seconds in sorted(report["source_stages"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<24}{seconds:>9.3f}s")
+    if report["slowest_sources"]:
+        lines.append("Slowest sources:")
+        for source in report["slowest_sources"][:top]:
+            slowest_stage = _slowest_stage(source["stages"])
+            lines.append(
+                f"  {source['total']:>8.3f}s {source['vertices']:>8} vertices  {source['path']} ({slowest_stage})"
+            )
+    if report["largest_sources"]:
+        lines.append("Largest sources:")
+        for source in report["largest_sources"][:top]:
+            lines.append(f"  {source['vertices']:>8} vertices {source['total']:>8.3f}s  {source['path']}")
+    return "\n".join(lines)
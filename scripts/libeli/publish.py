@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import io
+import os
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import jsonio
+from .parallel import process_map
+
+ARTIFACT_MANIFEST = "imagery.manifest.json"
+
+
+def _git(args: List[str], cwd: Optional[str] = None) -> Optional[str]:
+    try:
+        result = subprocess.run(["git"] + args, cwd=cwd, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout
+
+
+def _uncommitted(directory: str) -> List[str]:
+    """Paths of existing files in directory with uncommitted changes or which are not tracked at all"""
+    toplevel = _git(["rev-parse", "--show-toplevel"], directory)
+    if toplevel is None:
+        return []
+    # The paths are relative to the root of the repository, whatever the working directory
+    status = _git(["status", "--porcelain", "-z", "--untracked-files=all", "--", "."], directory) or ""
+    uncommitted = []
+    records = iter(status.split("\0"))
+    for record in records:
+        if not record:
+            continue
+        code, path = record[:2], record[3:]
+        if "R" in code or "C" in code:
+            # Renames and copies are followed by the original path
+            next(records, None)
+        path = os.path.join(toplevel.rstrip("\n"), path)
+        if os.path.exists(path):
+            uncommitted.append(path)
+    return uncommitted
+
+
+def _source_directory(paths: Sequence[str]) -> str:
+    """The deepest directory containing all paths"""
+    if not paths:
+        return "."
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+
+def sources_timestamp(paths: Sequence[str]) -> datetime:
+    """Derives the generation timestamp of the artifacts from the sources
+
+    In order of precedence, this is SOURCE_DATE_EPOCH if set, the time of the latest commit
+    touching the directory of the sources (or the modification time of files with uncommitted
+    changes in it if that is later) or, outside of a git checkout, the latest modification time
+    of the sources. The timestamp therefore only changes if the sources change, not with every
+    build. git is given the directory rather than every path, so there is no limit on the number
+    of sources and commits deleting sources count as well.
+
+    Parameters
+    ----------
+    paths : Sequence[str]
+        Paths of all sources of the build
+
+    Returns
+    -------
+    datetime
+        The timestamp (UTC, naive)
+    """
+    if "SOURCE_DATE_EPOCH" in os.environ:
+        epoch = int(os.environ["SOURCE_DATE_EPOCH"])
+    else:
+        directory = _source_directory(paths)
+        commit_time = _git(["log", "-1", "--format=%ct", "--", "."], directory)
+        if commit_time:
+            epoch = int(commit_time)
+            epoch = max([epoch] + [int(os.stat(path).st_mtime) for path in _uncommitted(directory)])
+        else:
+            epoch = max([int(os.stat(path).st_mtime) for path in paths], default=0)
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None)
+
+
+def content_hash(source_hashes: Sequence[str]) -> str:
+    """Combines the SHA-256 hashes of all sources, in build order, to the hash of the whole index"""
+    digest = hashlib.sha256()
+    for source_hash in source_hashes:
+        digest.update(bytes.fromhex(source_hash))
+    return digest.hexdigest()
+
+
+def _describe(data: bytes) -> Dict[str, Any]:
+    return {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+
+
+def compress_artifact(path: str) -> Dict[str, Any]:
+    """Writes the .gz and, if brotli is installed, .br siblings of path
+
+    The gzip header carries no timestamp, so equal artifacts always compress to equal bytes.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The SHA-256 and size of the artifact and of its compressed siblings
+    """
+    with io.open(path, "rb") as f:
+        data = f.read()
+    entry = _describe(data)
+
+    compressed = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(data, quality=11)
+    for extension, compressed_data in compressed.items():
+        with io.open(f"{path}.{extension}", "wb") as f:
+            f.write(compressed_data)
+        entry[extension] = _describe(compressed_data)
+    return entry
+
+
+def remove_artifact(path: str) -> None:
+    """Removes the artifact at path and the .gz and .br siblings written by compress_artifact"""
+    for sibling in [path, f"{path}.gz", f"{path}.br"]:
+        if os.path.exists(sibling):
+            os.remove(sibling)
+
+
+def _is_current(path: str, entry: Optional[Dict[str, Any]]) -> bool:
+    """Whether entry of the previous artifact manifest still describes path and its compressed siblings"""
+    if entry is None or not os.path.exists(path):
+        return False
+    with io.open(path, "rb") as f:
+        if _describe(f.read()) != {"sha256": entry["sha256"], "size": entry["size"]}:
+            return False
+    extensions = ["gz", "br"] if brotli is not None else ["gz"]
+    return all(extension in entry and os.path.exists(f"{path}.{extension}") for extension in extensions)
+
+
+def publish(
+    outdir: str, filenames: List[str], generated: str, sources_hash: str, jobs: Optional[int] = None
+) -> Dict[str, Any]:
+    """Compresses the artifacts and writes the artifact manifest
+
+    Artifacts that did not change since the previous manifest was written are not compressed again.
+    The artifacts are compressed in parallel.
+
+    Parameters
+    ----------
+    outdir : str
+        Directory of the artifacts
+    filenames : List[str]
+        Filenames of the artifacts to compress, relative to outdir
+    generated : str
+        The generation timestamp of the artifacts
+    sources_hash : str
+        The content hash of all sources, see content_hash
+    jobs : Optional[int], optional
+        Number of processes, by default the number of CPUs
+
+    Returns
+    -------
+    Dict[str, Any]
+        The artifact manifest
+    """
+    manifest_path = os.path.join(outdir, ARTIFACT_MANIFEST)
+    previous: Dict[str, Any] = {}
+    if os.path.exists(manifest_path):
+        previous = jsonio.load(manifest_path).get("artifacts", {})
+
+    entries: Dict[str, Any] = {}
+    stale: List[str] = []
+    for filename in filenames:
+        if _is_current(os.path.join(outdir, filename), previous.get(filename)):
+            entries[filename] = previous[filename]
+        else:
+            stale.append(filename)
+    compressed = process_map(compress_artifact, [os.path.join(outdir, filename) for filename in stale], jobs)
+    entries.update(zip(stale, compressed))
+
+    manifest = {
+        "generated": generated,
+        "content_hash": sources_hash,
+        "artifacts": {filename: entries[filename] for filename in filenames},
+    }
+    with io.open(manifest_path, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps_pretty(manifest, sort_keys=True))
+        f.write("\n")
+    return manifest
@@ -0,0 +1,135 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .jsonio import round_floats
+
+PRECISION = 5
+_SCALE = 10.0**PRECISION
+# Below this magnitude, x * _SCALE is exact to well within 1e-6
+_MAX_SCALED = 2.0**31
+
+
+def round_coordinates(values: np.ndarray) -> np.ndarray:
+    """Rounds values to 5 decimal points, exactly like Python's round(value, 5)
+
+    round rounds the exact decimal value of the float, while rint(value * 1e5) / 1e5 rounds the
+    product, which is off by up to half an ulp. The results only differ if the product is within
+    that error of a tie, so these values and values too large for the product to be exact are
+    rounded with round instead.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Floats of any shape
+
+    Returns
+    -------
+    np.ndarray
+        The rounded values
+    """
+    scaled = values * _SCALE
+    rounded = np.rint(scaled) / _SCALE
+    with np.errstate(invalid="ignore"):
+        uncertain = ~(np.abs(scaled) < _MAX_SCALED) | (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in np.flatnonzero(uncertain):
+        rounded.flat[index] = round(float(values.flat[index]), PRECISION)
+    return rounded
+
+
+def quantize_rings(rings: List[List[List[float]]]) -> List[List[List[float]]]:
+    """Rounds the positions of rings to 5 decimal points and drops the positions rounding collapsed
+
+    All positions are rounded in one array operation. A position which only equals the previous
+    one after rounding is dropped, duplicates which are already in the source are kept. Integers
+    stay integers, so the serialized coordinates only differ from rounding every float on its own
+    by the dropped positions. Rings which would be left with less than 4 positions keep them.
+
+    Parameters
+    ----------
+    rings : List[List[List[float]]]
+        The linear rings, e.g. the coordinates of a Polygon
+
+    Returns
+    -------
+    List[List[List[float]]]
+        The quantized rings
+    """
+    positions = [position for ring in rings for position in ring]
+    if not positions:
+        return round_floats(rings)
+    try:
+        coordinates = np.array(positions)
+    except ValueError:
+        coordinates = np.array([], dtype=object)
+    if coordinates.ndim != 2 or coordinates.dtype.kind not in "if":
+        # Positions of different dimensions or with non-numeric values
+        return round_floats(rings)
+
+    if coordinates.dtype.kind == "f":
+        quantized = round_coordinates(coordinates)
+        result = quantized.tolist()
+        # Restore integers mixed into float positions, integers are not rounded
+        for i, j in np.argwhere(coordinates == np.floor(coordinates)):
+            if type(positions[i][j]) is int:
+                result[i][j] = positions[i][j]
+    else:
+        # Integers are not rounded, so no positions collapse
+        return [[list(position) for position in ring] for ring in rings]
+
+    keep = np.ones(len(positions), dtype=bool)
+    keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1) | np.all(coordinates[1:] == coordinates[:-1], axis=1)
+    quantized_rings = []
+    start = 0
+    for ring in rings:
+        end = start + len(ring)
+        ring_keep = keep[start:end]
+        # The first position of a ring is never a duplicate of the previous ring
+        ring_keep[:1] = True
+        if ring_keep.all() or np.count_nonzero(ring_keep) < 4:
+            quantized_rings.append(result[start:end])
+        else:
+            quantized_rings.append([result[start + i] for i in np.flatnonzero(ring_keep)])
+        start = end
+    return quantized_rings
+
+
+def quantize_geometry(geometry: Dict[str, Any]) -> Dict[str, Any]:
+    """Quantizes the coordinates of a Polygon or MultiPolygon, see quantize_rings
+
+    Other geometries only have their floats rounded.
+    """
+    quantized = dict(geometry)
+    coordinates = geometry.get("coordinates")
+    if geometry.get("type") == "Polygon" and isinstance(coordinates, list):
+        quantized["coordinates"] = quantize_rings(coordinates)
+    elif geometry.get("type") == "MultiPolygon" and isinstance(coordinates, list):
+        rings = quantize_rings([ring for polygon in coordinates for ring in polygon])
+        polygons = []
+        start = 0
+        for polygon in coordinates:
+            polygons.append(rings[start : start + len(polygon)])
+            start += len(polygon)
+        quantized["coordinates"] = polygons
+    else:
+        return round_floats(geometry)
+    for key, value in geometry.items():
+        if key != "coordinates":
+            quantized[key] = round_floats(value)
+    return quantized
+
+
+def quantize_source(source: Dict[str, Any]) -> Dict[str, Any]:
+    """Rounds all floats of a source parsed with native floats to 5 decimal points
+
+    The geometry is quantized with quantize_geometry, all other members with round_floats.
+    """
+    if not isinstance(source, dict):
+        return round_floats(source)
+    quantized = {}
+    for key, value in source.items():
+        if key == "geometry" and isinstance(value, dict):
+            quantized[key] = quantize_geometry(value)
+        else:
+            quantized[key] = round_floats(value)
+    return quantized
@@ -0,0 +1,130 @@
+import math
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import shapely
+from shapely.geometry import box, shape
+
+from . import artifacts, jsonio
+from .artifacts import Source
+
+
+class SourceIndex:
+    """Spatial index answering which sources cover a location
+
+    The geometries of all sources are prepared and kept in a shapely STRtree. Queries first
+    select candidates by their bounding box from the tree and then test the prepared
+    geometries, so a lookup takes microseconds instead of scanning all geometries. Sources
+    without geometry cover the whole world and match every query.
+
+    Matches are returned in the order the sources were passed to the index.
+    """
+
+    def __init__(self, sources: Sequence[Source]) -> None:
+        """Inits the SourceIndex
+
+        Parameters
+        ----------
+        sources : Sequence[Source]
+            The sources to index, as loaded from the source files or the features of imagery.geojson
+        """
+        self.sources = list(sources)
+        properties = [source.get("properties") or {} for source in self.sources]
+        self._min_zoom = np.array([props.get("min_zoom", 0) for props in properties], dtype=float)
+        self._max_zoom = np.array([props.get("max_zoom", math.inf) for props in properties], dtype=float)
+        self._overlay = np.array([bool(props.get("overlay", False)) for props in properties], dtype=bool)
+        self._type = np.array([props.get("type", "") for props in properties], dtype=object)
+
+        self._global = np.array([i for i, source in enumerate(self.sources) if not source.get("geometry")], dtype=int)
+        self._local = np.array([i for i, source in enumerate(self.sources) if source.get("geometry")], dtype=int)
+        self._geoms = np.array([shape(self.sources[i]["geometry"]) for i in self._local], dtype=object)
+        shapely.prepare(self._geoms)
+        self._tree = shapely.STRtree(self._geoms)
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str], jobs: Optional[int] = 1) -> "SourceIndex":
+        """Builds the index from source files"""
+        return cls(artifacts.load_sources(paths, jobs))
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "SourceIndex":
+        """Builds the index from the features of imagery.geojson"""
+        return cls(jsonio.load(path)["features"])
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def _filter(
+        self,
+        indices: np.ndarray,
+        zoom: Optional[float],
+        overlay: Optional[bool],
+        types: Optional[Iterable[str]],
+    ) -> List[Source]:
+        mask = np.ones(len(indices), dtype=bool)
+        if zoom is not None:
+            mask &= (self._min_zoom[indices] <= zoom) & (zoom <= self._max_zoom[indices])
+        if overlay is not None:
+            mask &= self._overlay[indices] == overlay
+        if isinstance(types, str):
+            # A single type, not the characters of it
+            types = [types]
+        if types is not None:
+            mask &= np.isin(self._type[indices], list(types))
+        return [self.sources[i] for i in np.sort(indices[mask])]
+
+    def _query(
+        self,
+        geometry: shapely.Geometry,
+        zoom: Optional[float],
+        overlay: Optional[bool],
+        types: Optional[Iterable[str]],
+    ) -> List[Source]:
+        # Testing the candidates against the prepared tree geometries is considerably faster than
+        # STRtree.query(geometry, predicate="intersects"), which prepares the query geometry instead
+        candidates = self._tree.query(geometry)
+        hits = candidates[shapely.intersects(self._geoms[candidates], geometry)]
+        return self._filter(np.concatenate([self._global, self._local[hits]]), zoom, overlay, types)
+
+    def at_point(
+        self,
+        lon: float,
+        lat: float,
+        zoom: Optional[float] = None,
+        overlay: Optional[bool] = None,
+        types: Optional[Iterable[str]] = None,
+    ) -> List[Source]:
+        """Sources covering the location lon/lat
+
+        Parameters
+        ----------
+        lon : float
+            Longitude (WGS84)
+        lat : float
+            Latitude (WGS84)
+        zoom : Optional[float], optional
+            Only return sources with min_zoom <= zoom <= max_zoom, by default all zoom levels
+        overlay : Optional[bool], optional
+            Only return overlays (True) or only background imagery (False), by default both
+        types : Optional[Iterable[str]], optional
+            Only return sources of these types, e.g. ["tms", "wmts"] or "wms", by default all types
+
+        Returns
+        -------
+        List[Source]
+            The matching sources
+        """
+        return self._query(shapely.points(lon, lat), zoom, overlay, types)
+
+    def in_bbox(
+        self,
+        west: float,
+        south: float,
+        east: float,
+        north: float,
+        zoom: Optional[float] = None,
+        overlay: Optional[bool] = None,
+        types: Optional[Iterable[str]] = None,
+    ) -> List[Source]:
+        """Sources intersecting the bounding box, see at_point for the filters"""
+        return self._query(box(west, south, east, north), zoom, overlay, types)
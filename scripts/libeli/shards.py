@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import artifacts, jsonio, publish
+from .artifacts import SourceFragments
+
+WORLD_SHARD = "world"
+SHARD_INDEX = "index.json"
+WORLD_BBOX = [-180.0, -90.0, 180.0, 90.0]
+
+
+def shard_key(path: str) -> str:
+    """The shard of the source at path, derived from the sources/<continent>/<country> layout
+
+    Sources in sources/world form the "world" shard, sources in a country directory the
+    "<continent>/<country>" shard and sources directly within a continent directory the
+    "<continent>" shard. Other source directories are expected to follow the same layout, with
+    path relative to the parent of the source directory.
+
+    Parameters
+    ----------
+    path : str
+        Path of the source file, e.g. sources/europe/de/Foo.geojson
+
+    Returns
+    -------
+    str
+        The shard key, e.g. europe/de
+    """
+    parts = os.path.normpath(path).split(os.sep)
+    # Strip the source directory, e.g. "sources" or "private-sources"
+    if "sources" in parts[:-1]:
+        parts = parts[parts.index("sources") + 1 :]
+    else:
+        parts = parts[1:]
+    directories = parts[:-1]
+    if not directories or directories[0] == WORLD_SHARD:
+        return WORLD_SHARD
+    return "/".join(directories[:2])
+
+
+def _merge_bbox(bbox: Optional[List[float]], other: Optional[List[float]]) -> List[float]:
+    # Sources without geometry cover the whole world
+    if bbox is None or other is None:
+        return list(WORLD_BBOX)
+    return [min(bbox[0], other[0]), min(bbox[1], other[1]), max(bbox[2], other[2]), max(bbox[3], other[3])]
+
+
+def write_shards(
+    outdir: str, paths: Sequence[str], fragments: Sequence[SourceFragments], generated: str
+) -> Dict[str, Any]:
+    """Writes a GeoJSON FeatureCollection per shard and the shard index
+
+    The shards carry no generation timestamp, so a shard only changes if one of its sources
+    changes. The index maps every shard to its file, bbox, country codes, number of sources
+    and the SHA-256 and size of the shard file.
+
+    Parameters
+    ----------
+    outdir : str
+        Directory to write the shards to
+    paths : Sequence[str]
+        Paths of all sources of the build
+    fragments : Sequence[SourceFragments]
+        Fragments of the sources in the order of paths
+    generated : str
+        The generation timestamp of the build, only written to the index
+
+    Returns
+    -------
+    Dict[str, Any]
+        The shard index
+    """
+    shards: Dict[str, List[SourceFragments]] = defaultdict(list)
+    for path, fragment in zip(paths, fragments):
+        shards[shard_key(path)].append(fragment)
+
+    index: Dict[str, Any] = {}
+    for key in sorted(shards):
+        shard_fragments = shards[key]
+        f = io.StringIO()
+        f.write('{"features":[')
+        f.write(",".join(fragment.geojson for fragment in shard_fragments))
+        meta = {"format_version": artifacts.GEOJSON_FORMAT_VERSION, "shard": key}
+        f.write(f'],"meta":{artifacts.dumps(meta)},"type":"FeatureCollection"}}\n')
+        data = f.getvalue().encode("utf-8")
+
+        filename = f"{key}.geojson"
+        path = os.path.join(outdir, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with io.open(path, "wb") as shard_file:
+            shard_file.write(data)
+
+        bbox = shard_fragments[0].bbox
+        for fragment in shard_fragments[1:]:
+            bbox = _merge_bbox(bbox, fragment.bbox)
+        index[key] = {
+            "path": filename,
+            "bbox": bbox if bbox is not None else list(WORLD_BBOX),
+            "country_codes": sorted({fragment.country_code for fragment in shard_fragments if fragment.country_code}),
+            "sources": len(shard_fragments),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+        }
+
+    # Remove shards of a previous build which have no sources anymore, with their compressed siblings
+    index_path = os.path.join(outdir, SHARD_INDEX)
+    if os.path.exists(index_path):
+        previous = jsonio.load(index_path).get("shards", {})
+        for key, shard in previous.items():
+            if key not in index:
+                publish.remove_artifact(os.path.join(outdir, shard["path"]))
+
+    shard_index = {"format_version": artifacts.GEOJSON_FORMAT_VERSION, "generated": generated, "shards": index}
+    with io.open(index_path, "w", encoding="utf-8") as f:
+        f.write(artifacts.dumps(shard_index))
+        f.write("\n")
+    return shard_index
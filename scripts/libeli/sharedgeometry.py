@@ -0,0 +1,84 @@
+import io
+from typing import Any, Dict, List, Sequence, TextIO
+
+from . import artifacts, jsonio
+from .artifacts import SourceFragments
+
+SHARED_GEOMETRY_FILENAME = "imagery.shared.geojson"
+# Artifact with the full geometry of every feature, for clients not resolving geometry_ref
+FALLBACK_FILENAME = "imagery.geojson"
+
+
+def write_shared_geojson(fragments: Sequence[SourceFragments], f: TextIO, generated: str) -> Dict[str, int]:
+    """Writes the features of imagery.geojson to f with every distinct geometry stored only once
+
+    Geometries are distinct if their geometry_hash differs. They are written to the "geometries"
+    member of the collection in the order of their first feature. Every feature with a geometry
+    has a null geometry and its position in "geometries" as "geometry_ref" instead. Features
+    without geometry are written as in imagery.geojson. "meta" names imagery.geojson as fallback
+    for clients not resolving geometry_ref, see resolve_geometries.
+
+    Parameters
+    ----------
+    fragments : Sequence[SourceFragments]
+        Fragments of all sources of the build
+    f : TextIO
+        Stream to write the collection to
+    generated : str
+        The generation timestamp of the build
+
+    Returns
+    -------
+    Dict[str, int]
+        The number of features and of distinct geometries
+    """
+    refs: Dict[str, int] = {}
+    geometries: List[str] = []
+    features: List[str] = []
+    for fragment in fragments:
+        if fragment.geometry_hash is None:
+            features.append(fragment.geojson)
+            continue
+        feature = jsonio.loads(fragment.geojson)
+        ref = refs.get(fragment.geometry_hash)
+        if ref is None:
+            ref = refs[fragment.geometry_hash] = len(geometries)
+            geometries.append(jsonio.dumps(feature["geometry"]))
+        feature["geometry"] = None
+        feature["geometry_ref"] = ref
+        features.append(jsonio.dumps(feature))
+
+    meta = dict(artifacts.geojson_collection([], generated)["meta"], fallback=FALLBACK_FILENAME)
+    f.write('{"features":[')
+    f.write(",".join(features))
+    f.write('],"geometries":[')
+    f.write(",".join(geometries))
+    f.write(f'],"meta":{jsonio.dumps(meta)},"type":"FeatureCollection"}}')
+    return {"features": len(features), "geometries": len(geometries)}
+
+
+def write_shared_geometry(path: str, fragments: Sequence[SourceFragments], generated: str) -> Dict[str, int]:
+    """Writes imagery.shared.geojson to path, see write_shared_geojson"""
+    with io.open(path, "w", encoding="utf-8") as f:
+        stats = write_shared_geojson(fragments, f, generated)
+        f.write("\n")
+    return stats
+
+
+def resolve_geometries(collection: Dict[str, Any]) -> Dict[str, Any]:
+    """Turns the collection of imagery.shared.geojson into a plain FeatureCollection
+
+    Every feature gets the geometry it references, which is the geometry of the first feature
+    sharing it, so rings may start at another vertex or run the other way than in imagery.geojson.
+    Features with the same geometry share the same geometry object, which must not be modified
+    in place.
+    """
+    geometries = collection["geometries"]
+    features = []
+    for feature in collection["features"]:
+        if "geometry_ref" in feature:
+            feature = dict(feature, geometry=geometries[feature["geometry_ref"]])
+            del feature["geometry_ref"]
+        features.append(feature)
+    meta = {key: value for key, value in collection["meta"].items() if key != "fallback"}
+    return {"type": "FeatureCollection", "meta": meta, "features": features}
@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, mapping, shape
+from shapely.geometry.base import BaseGeometry
+
+SIMPLIFICATION_ZOOMS = (4, 8, 12)
+
+# JOSM shapes are limited to 999 points
+MAX_SHAPE_POINTS = 999
+# Smallest tolerance worth trying, the sources are rounded to 5 decimal points
+MIN_TOLERANCE = 1e-5
+
+
+def zoom_tolerance(zoom: int) -> float:
+    """Size of a pixel of a 256 px web mercator tile at zoom, in degrees at the equator"""
+    return 360.0 / (256 * 2**zoom)
+
+
+def _segment_distances(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Distances of points to the segments from starts to ends"""
+    direction = ends - starts
+    offset = points - starts
+    length2 = np.einsum("ij,ij->i", direction, direction)
+    t = np.einsum("ij,ij->i", offset, direction) / np.where(length2 > 0, length2, 1.0)
+    return np.hypot(*(offset - np.clip(t, 0.0, 1.0)[:, None] * direction).T)
+
+
+def _ring_keys(ring_index: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """The ring index and position of every row as one comparable value"""
+    rows = np.ascontiguousarray(np.column_stack([ring_index.astype(float), coords]))
+    return rows.view(np.dtype((np.void, rows.dtype.itemsize * 3))).ravel()
+
+
+def max_deviation(geom: BaseGeometry, simplified_geom: BaseGeometry) -> float:
+    """Largest distance of a removed vertex of geom from the simplified geometry, in degrees
+
+    The vertices of a simplified ring are a subset of the vertices of the ring, though it may start at
+    another vertex. Every removed vertex is measured against the segment between the kept vertices
+    around it, for all rings at once. If the rings do not match up like this, e.g. as a vertex occurs
+    twice in a ring, the vertices are measured against the nearest segment of simplified_geom instead,
+    which is several times slower.
+    """
+    rings = shapely.get_rings(shapely.get_parts(geom))
+    simplified_rings = shapely.get_rings(shapely.get_parts(simplified_geom))
+    if len(rings) == len(simplified_rings):
+        coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+        simplified_coords, simplified_index = shapely.get_coordinates(simplified_rings, return_index=True)
+        # Leave out the closing position of every ring
+        ring_count = np.arange(len(rings))
+        closing = np.append(np.searchsorted(ring_index, ring_count[1:]), len(coords)) - 1
+        is_open = np.ones(len(coords), dtype=bool)
+        is_open[closing] = False
+        coords, ring_index = coords[is_open], ring_index[is_open]
+        ring_starts = closing - ring_count - np.bincount(ring_index, minlength=len(rings))
+        ring_ends = closing - ring_count - 1
+        kept = np.isin(_ring_keys(ring_index, coords), _ring_keys(simplified_index, simplified_coords))
+        expected = np.bincount(simplified_index, minlength=len(rings)) - 1
+        if np.array_equal(np.bincount(ring_index[kept], minlength=len(rings)), expected) and expected.min() > 0:
+            positions = np.arange(len(coords))
+            kept_positions = positions[kept]
+            first_kept = kept_positions[np.searchsorted(kept_positions, ring_starts)]
+            last_kept = kept_positions[np.searchsorted(kept_positions, ring_ends, side="right") - 1]
+            removed = ~kept
+            ring = ring_index[removed]
+            # The kept vertices before and after every removed vertex, wrapping around within its ring
+            before = np.maximum.accumulate(np.where(kept, positions, -1))[removed]
+            before = np.where(before < ring_starts[ring], last_kept[ring], before)
+            after = np.minimum.accumulate(np.where(kept, positions, len(coords))[::-1])[::-1][removed]
+            after = np.where(after > ring_ends[ring], first_kept[ring], after)
+            return float(_segment_distances(coords[removed], coords[before], coords[after]).max(initial=0.0))
+    points = shapely.points(shapely.get_coordinates(geom))
+    return float(shapely.distance(points, shapely.boundary(simplified_geom)).max(initial=0.0))
+
+
+def simplify_source(source: Dict[str, Any], zoom: int) -> Dict[str, Any]:
+    """Simplifies the geometry of source for display at zoom
+
+    The geometry is simplified with a tolerance of one pixel at zoom (see zoom_tolerance). Each polygon
+    keeps its topology, i.e. rings stay valid and holes do not leave their shell. The largest distance
+    of a removed vertex from the simplified geometry (see max_deviation) is recorded in degrees as
+    max_deviation in the "simplification" member of the feature, or 0 if no vertex was removed. It is
+    usually close to the tolerance, and far less if the simplification barely changed the geometry.
+
+    Parameters
+    ----------
+    source : Dict[str, Any]
+        The source, with floats already rounded to 5 decimal points
+    zoom : int
+        The zoom level to simplify for
+
+    Returns
+    -------
+    Dict[str, Any]
+        Copy of source with the simplified geometry
+    """
+    simplified = dict(source)
+    geometry = source.get("geometry")
+    deviation = 0.0
+    if geometry:
+        geom = shape(geometry)
+        tolerance = zoom_tolerance(zoom)
+        simplified_geom = shapely.simplify(geom, tolerance, preserve_topology=True)
+        if shapely.get_num_coordinates(simplified_geom) < shapely.get_num_coordinates(geom):
+            simplified["geometry"] = mapping(simplified_geom)
+            deviation = max_deviation(geom, simplified_geom)
+    simplified["simplification"] = {"zoom": zoom, "max_deviation": deviation}
+    return simplified
+
+
+def simplified_meta(zoom: int) -> Dict[str, Dict[str, float]]:
+    """The meta member of the simplified imagery.z<zoom>.geojson"""
+    return {"simplification": {"zoom": zoom, "tolerance": zoom_tolerance(zoom)}}
+
+
+def simplified_filenames(zooms: Sequence[int]) -> List[str]:
+    """Filenames of the simplified variants of imagery.geojson for zooms"""
+    return [f"imagery.z{zoom}.geojson" for zoom in zooms]
+
+
+def fit_ring(
+    coords: Sequence[Tuple[float, float]], max_points: int = MAX_SHAPE_POINTS
+) -> Tuple[List[Tuple[float, float]], float]:
+    """Simplifies the closed ring coords to at most max_points points
+
+    The ring is simplified with the smallest tolerance, found by bisection to within about 1%, that
+    fits the budget. The result is a valid ring whose points are a subset of coords, so no point of
+    coords is further away from it than the tolerance.
+
+    Parameters
+    ----------
+    coords : Sequence[Tuple[float, float]]
+        The closed ring, e.g. the exterior of a polygon
+    max_points : int, optional
+        The maximum number of points of the ring including the closing point, by default MAX_SHAPE_POINTS
+
+    Returns
+    -------
+    Tuple[List[Tuple[float, float]], float]
+        The points of the ring and the maximum deviation from coords in degrees, 0 if coords
+        already fits the budget
+    """
+    if len(coords) <= max_points:
+        return list(coords), 0.0
+    polygon = Polygon(coords)
+
+    def simplified(tolerance: float) -> List[Tuple[float, float]]:
+        return list(shapely.simplify(polygon, tolerance, preserve_topology=True).exterior.coords)
+
+    def num_points(tolerance: float) -> int:
+        return shapely.get_num_coordinates(shapely.simplify(polygon.exterior, tolerance, preserve_topology=False))
+
+    # Removing collinear points alone may suffice
+    if len(simplified(0.0)) <= max_points:
+        return simplified(0.0), 0.0
+
+    # Searching without preserving topology is several times faster. Preserving topology never
+    # removes more points, so the tolerance is then increased until the valid ring fits as well.
+    low, high = 0.0, MIN_TOLERANCE
+    while num_points(high) > max_points:
+        low, high = high, high * 2
+    while high - low > 0.01 * high:
+        middle = (low + high) / 2
+        if num_points(middle) > max_points:
+            low = middle
+        else:
+            high = middle
+    while len(simplified(high)) > max_points:
+        high *= 1.01
+    return simplified(high), high
@@ -0,0 +1,123 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+# Web mercator tiles end at this latitude
+MAX_LATITUDE = math.degrees(math.atan(math.sinh(math.pi)))
+
+# Covered tiles of a single row of a zoom level: y, first x and last x
+TileRange = Tuple[int, int, int]
+
+
+def tile_bounds(zoom: int, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """West, south, east and north bounds of the web mercator tiles x/y at zoom in degrees"""
+    n = 2.0**zoom
+
+    def latitude(row: np.ndarray) -> np.ndarray:
+        return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, latitude(y + 1), (x + 1) / n * 360.0 - 180.0, latitude(y)
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """The web mercator tile x/y at zoom containing lon/lat"""
+    n = 2**zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _expand(zoom: int, x: np.ndarray, y: np.ndarray, target: int) -> Tuple[np.ndarray, ...]:
+    """Rows, first and last x of the descendants of the tiles x/y at zoom on the target zoom level"""
+    shift = target - zoom
+    size = 1 << shift
+    rows = np.repeat(y << shift, size) + np.tile(np.arange(size, dtype=np.int64), len(y))
+    first = np.repeat(x << shift, size)
+    return rows, first, first + size - 1
+
+
+def _merge_ranges(rows: np.ndarray, first: np.ndarray, last: np.ndarray) -> List[TileRange]:
+    """Sorts the disjoint ranges and merges adjacent ranges of the same row"""
+    order = np.lexsort((first, rows))
+    rows, first, last = rows[order], first[order], last[order]
+    starts = np.ones(len(rows), dtype=bool)
+    starts[1:] = (rows[1:] != rows[:-1]) | (first[1:] != last[:-1] + 1)
+    groups = np.flatnonzero(starts)
+    if len(groups) == 0:
+        return []
+    ends = np.append(groups[1:], len(rows)) - 1
+    return list(zip(rows[groups].tolist(), first[groups].tolist(), last[ends].tolist()))
+
+
+def geometry_tiles(geometry: Optional[Dict[str, Any]], zooms: Sequence[int]) -> Dict[int, List[TileRange]]:
+    """The tiles intersecting geometry at each of zooms, as ranges of tiles per row
+
+    The tiles are found by descending a quadtree: tiles covered completely by the geometry are
+    expanded to ranges without testing their descendants, only the tiles along the boundary of the
+    geometry are split further. Sources without geometry cover all tiles.
+
+    Parameters
+    ----------
+    geometry : Optional[Dict[str, Any]]
+        GeoJSON geometry of a source
+    zooms : Sequence[int]
+        The zoom levels to find tiles for
+
+    Returns
+    -------
+    Dict[int, List[TileRange]]
+        Ranges of the intersecting tiles keyed by zoom level, sorted by row and first x
+    """
+    tiles: Dict[int, List[TileRange]] = {zoom: [] for zoom in zooms}
+    x = np.zeros(1, dtype=np.int64)
+    y = np.zeros(1, dtype=np.int64)
+    if not zooms:
+        return tiles
+    if not geometry:
+        for zoom in zooms:
+            tiles[zoom] = _merge_ranges(*_expand(0, x, y, zoom))
+        return tiles
+
+    geom = shape(geometry)
+    shapely.prepare(geom)
+    # Tiles covered completely by the geometry, keyed by their zoom
+    full: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    for zoom in range(max(zooms) + 1):
+        if zoom > 0:
+            # Split the tiles of the boundary into their four children
+            x = np.repeat(x * 2, 4) + np.tile([0, 1, 0, 1], len(x))
+            y = np.repeat(y * 2, 4) + np.tile([0, 0, 1, 1], len(y))
+        boxes = shapely.box(*tile_bounds(zoom, x, y))
+        intersecting = np.flatnonzero(shapely.intersects(geom, boxes))
+        covered = shapely.covers(geom, boxes[intersecting])
+        full[zoom] = (x[intersecting[covered]], y[intersecting[covered]])
+        x, y = x[intersecting[~covered]], y[intersecting[~covered]]
+        if zoom in tiles:
+            ranges = [(y, x, x)]
+            ranges += [_expand(z, full_x, full_y, zoom) for z, (full_x, full_y) in full.items()]
+            tiles[zoom] = _merge_ranges(*(np.concatenate(column) for column in zip(*ranges)))
+    return tiles
+
+
+def index_zooms(source: Dict[str, Any], zooms: Sequence[int]) -> List[int]:
+    """The levels of zooms the source is indexed at
+
+    A level serves the lookups from its zoom up to the next level, so a source is left out of
+    levels where none of these zooms is within its min_zoom and max_zoom.
+    """
+    properties = source.get("properties") or {}
+    min_zoom = properties.get("min_zoom", 0)
+    max_zoom = properties.get("max_zoom", math.inf)
+    levels = sorted(zooms)
+    upper = [next_level - 1 for next_level in levels[1:]] + [math.inf]
+    return [zoom for zoom, last in zip(levels, upper) if min_zoom <= last and max_zoom >= zoom]
+
+
+def source_tiles(source: Dict[str, Any], zooms: Sequence[int]) -> Dict[str, List[List[int]]]:
+    """The tile ranges of source at the levels of zooms it is indexed at, keyed by the zoom as string"""
+    tiles = geometry_tiles(source.get("geometry"), index_zooms(source, zooms))
+    return {str(zoom): [list(tile_range) for tile_range in ranges] for zoom, ranges in tiles.items()}
@@ -0,0 +1,227 @@
+import io
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import artifacts, jsonio
+from .artifacts import SourceFragments
+from .quantize import PRECISION
+
+TOPOLOGY_FILENAME = "imagery.topo.json"
+TOPOLOGY_OBJECT = "imagery"
+_SCALE = 10**PRECISION
+# Quantized positions are packed into a single int, x in the upper bits
+_SHIFT = 32
+
+
+def _quantize(value: float) -> int:
+    return int(round(value * _SCALE))
+
+
+def _polygons(geometry: Dict[str, Any]) -> List[List[List[List[float]]]]:
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    raise ValueError(f"Unsupported geometry type {geometry['type']}")
+
+
+class _ArcBuilder:
+    """Splits rings of packed positions into arcs shared by all rings containing them
+
+    As in TopoJSON, a position is a junction if it has different neighbours in different rings,
+    i.e. where shared boundaries begin or end. The first position of every ring is a junction as
+    well, so the rings are rebuilt exactly as they were. Rings are cut into arcs at the
+    junctions, and an arc equal to an existing arc, forwards or reversed, refers to it.
+    """
+
+    def __init__(self) -> None:
+        self.arcs: List[Tuple[int, ...]] = []
+        self._indexes: Dict[Tuple[int, ...], int] = {}
+        self._neighbours: Dict[int, Tuple[int, int]] = {}
+        self._junctions: set = set()
+
+    def add_ring(self, ring: List[int]) -> None:
+        """Records the neighbours of the positions of a closed ring"""
+        open_ring = ring[:-1]
+        self._junctions.add(open_ring[0])
+        for i, position in enumerate(open_ring):
+            before, after = open_ring[i - 1], open_ring[(i + 1) % len(open_ring)]
+            pair = (before, after) if before < after else (after, before)
+            if self._neighbours.setdefault(position, pair) != pair:
+                self._junctions.add(position)
+
+    def ring_arcs(self, ring: List[int]) -> List[int]:
+        """The references to the arcs of a closed ring added before, ~index for reversed arcs"""
+        cuts = [i for i, position in enumerate(ring[:-1]) if position in self._junctions] + [len(ring) - 1]
+        return [self._arc(tuple(ring[start : end + 1])) for start, end in zip(cuts, cuts[1:])]
+
+    def _arc(self, arc: Tuple[int, ...]) -> int:
+        index = self._indexes.get(arc)
+        if index is not None:
+            return index
+        index = self._indexes.get(arc[::-1])
+        if index is not None:
+            return ~index
+        index = self._indexes[arc] = len(self.arcs)
+        self.arcs.append(arc)
+        return index
+
+
+def build_topology(fragments: Sequence[SourceFragments], generated: str) -> Dict[str, Any]:
+    """Converts the features of imagery.geojson into a TopoJSON topology
+
+    Positions are quantized to the precision of the sources (see quantize.PRECISION), so no
+    position moves. Boundaries shared by several sources are stored only once as an arc, see
+    _ArcBuilder, and the positions of every arc are delta encoded as in TopoJSON. The topology
+    has a GeometryCollection TOPOLOGY_OBJECT with a geometry per feature, in the order of
+    imagery.geojson, with the id and properties of the source. Sources without geometry have a
+    geometry of type null. Topology decodes the features again.
+
+    Parameters
+    ----------
+    fragments : Sequence[SourceFragments]
+        Fragments of all sources of the build
+    generated : str
+        The generation timestamp of the build
+
+    Returns
+    -------
+    Dict[str, Any]
+        The topology
+    """
+    features = [jsonio.loads(fragment.geojson) for fragment in fragments]
+    positions = [
+        position
+        for feature in features
+        if feature.get("geometry")
+        for polygon in _polygons(feature["geometry"])
+        for ring in polygon
+        for position in ring
+    ]
+    translate = [min((position[i] for position in positions), default=0.0) for i in (0, 1)]
+    origin = [_quantize(value) for value in translate]
+
+    def pack(ring: List[List[float]]) -> List[int]:
+        return [(_quantize(x) - origin[0]) << _SHIFT | (_quantize(y) - origin[1]) for x, y, *_ in ring]
+
+    packed = []
+    builder = _ArcBuilder()
+    for feature in features:
+        polygons = None
+        if feature.get("geometry"):
+            polygons = [[pack(ring) for ring in polygon] for polygon in _polygons(feature["geometry"])]
+            for polygon in polygons:
+                for ring in polygon:
+                    builder.add_ring(ring)
+        packed.append(polygons)
+
+    geometries = []
+    for feature, polygons in zip(features, packed):
+        properties = feature.get("properties") or {}
+        geometry: Dict[str, Any] = {"type": None, "id": properties.get("id"), "properties": properties}
+        if polygons is not None:
+            arcs = [[builder.ring_arcs(ring) for ring in polygon] for polygon in polygons]
+            if feature["geometry"]["type"] == "Polygon":
+                geometry.update(type="Polygon", arcs=arcs[0])
+            else:
+                geometry.update(type="MultiPolygon", arcs=arcs)
+        geometries.append(geometry)
+
+    mask = (1 << _SHIFT) - 1
+    encoded_arcs = []
+    for arc in builder.arcs:
+        encoded = []
+        previous_x = previous_y = 0
+        for position in arc:
+            x, y = position >> _SHIFT, position & mask
+            encoded.append([x - previous_x, y - previous_y])
+            previous_x, previous_y = x, y
+        encoded_arcs.append(encoded)
+
+    return {
+        "type": "Topology",
+        "meta": artifacts.geojson_collection([], generated)["meta"],
+        "transform": {"scale": [1 / _SCALE, 1 / _SCALE], "translate": translate},
+        "objects": {TOPOLOGY_OBJECT: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded_arcs,
+    }
+
+
+def write_topology(path: str, fragments: Sequence[SourceFragments], generated: str) -> Dict[str, Any]:
+    """Writes the topology of build_topology to path and returns it"""
+    topology = build_topology(fragments, generated)
+    with io.open(path, "w", encoding="utf-8") as f:
+        f.write(jsonio.dumps(topology))
+        f.write("\n")
+    return topology
+
+
+class Topology:
+    """Rebuilds the features of a topology of build_topology on demand
+
+    Only the arcs of the requested features are decoded, and every decoded arc is kept for the
+    other features sharing it. The positions are the ones of imagery.geojson, as the topology is
+    quantized to their precision.
+    """
+
+    def __init__(self, topology: Dict[str, Any]) -> None:
+        self.meta: Dict[str, Any] = topology.get("meta", {})
+        self._geometries: List[Dict[str, Any]] = topology["objects"][TOPOLOGY_OBJECT]["geometries"]
+        self._arcs: List[List[List[int]]] = topology["arcs"]
+        self._origin = [_quantize(value) for value in topology["transform"]["translate"]]
+        self._decoded: Dict[int, List[List[float]]] = {}
+        self._positions = {geometry["id"]: i for i, geometry in enumerate(self._geometries)}
+
+    @classmethod
+    def from_file(cls, path: str) -> "Topology":
+        return cls(jsonio.load(path))
+
+    @property
+    def ids(self) -> List[str]:
+        """Ids of the features, in the order of imagery.geojson"""
+        return [geometry["id"] for geometry in self._geometries]
+
+    def _arc(self, index: int) -> List[List[float]]:
+        arc = self._decoded.get(index)
+        if arc is None:
+            deltas = self._arcs[index]
+            xs = accumulate(delta[0] for delta in deltas)
+            ys = accumulate(delta[1] for delta in deltas)
+            # Dividing the exact integer yields the float closest to the decimal position
+            arc = [[(x + self._origin[0]) / _SCALE, (y + self._origin[1]) / _SCALE] for x, y in zip(xs, ys)]
+            self._decoded[index] = arc
+        return arc
+
+    def _ring(self, references: List[int]) -> List[List[float]]:
+        ring: List[List[float]] = []
+        for reference in references:
+            arc = self._arc(reference) if reference >= 0 else self._arc(~reference)[::-1]
+            # Every arc starts at the last position of the previous arc
+            ring.extend(list(position) for position in arc[1 if ring else 0 :])
+        return ring
+
+    def geometry(self, source_id: str) -> Optional[Dict[str, Any]]:
+        """The GeoJSON geometry of the source, None if it has none
+
+        Raises
+        ------
+        KeyError
+            If the topology has no source with the id
+        """
+        geometry = self._geometries[self._positions[source_id]]
+        if geometry["type"] == "Polygon":
+            return {"type": "Polygon", "coordinates": [self._ring(ring) for ring in geometry["arcs"]]}
+        if geometry["type"] == "MultiPolygon":
+            coordinates = [[self._ring(ring) for ring in polygon] for polygon in geometry["arcs"]]
+            return {"type": "MultiPolygon", "coordinates": coordinates}
+        return None
+
+    def feature(self, source_id: str) -> Dict[str, Any]:
+        """The GeoJSON feature of the source, like in imagery.geojson"""
+        properties = self._geometries[self._positions[source_id]]["properties"]
+        return {"type": "Feature", "properties": properties, "geometry": self.geometry(source_id)}
+
+    def features(self) -> Iterator[Dict[str, Any]]:
+        """All features, in the order of imagery.geojson"""
+        for source_id in self.ids:
+            yield self.feature(source_id)
@@ -0,0 +1,254 @@
+import hashlib
+import io
+import mmap
+import os
+import struct
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from . import localize
+from .parallel import process_map
+
+CATALOG_MAGIC = b"ELII18N\0"
+CATALOG_VERSION = 1
+# Magic, version, SHA-256 of the translation files and the number of strings, languages, ids and entries
+_HEADER = struct.Struct("<8sI32sIIII")
+# Offset and length of a string in the string data
+_STRING = struct.Struct("<II")
+# Language code string and the range of its entries
+_LANGUAGE = struct.Struct("<III")
+_ID = struct.Struct("<I")
+# Index of the source id and the name, description and attribution text strings
+_ENTRY = struct.Struct("<IIII")
+# String index of strings which are not translated
+NO_STRING = 0xFFFFFFFF
+
+
+class Translation(NamedTuple):
+    """The translated strings of a source, None if not translated"""
+
+    name: Optional[str]
+    description: Optional[str]
+    attribution: Optional[str]
+
+
+def _translation(strings: Any) -> Translation:
+    """The Translation of the strings of a source in a translation file, empty strings are not translated"""
+    strings = strings or {}
+    attribution = strings.get("attribution") or {}
+    return Translation(
+        name=strings.get("name") or None,
+        description=strings.get("description") or None,
+        attribution=attribution.get("text") or None,
+    )
+
+
+def translations_hash(paths: Sequence[str]) -> bytes:
+    """SHA-256 of the names and contents of the translation files"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with io.open(path, "rb") as f:
+            data = f.read()
+        digest.update(os.path.basename(path).encode("utf-8"))
+        digest.update(hashlib.sha256(data).digest())
+    return digest.digest()
+
+
+def encode_catalog(languages: Dict[str, Dict[str, Any]], inputs_hash: bytes = bytes(32)) -> bytes:
+    """Encodes the translations of all languages into a binary catalog
+
+    Every distinct string is stored once. Languages and source ids are sorted by their UTF-8
+    bytes, so TranslationCatalog finds them by binary search within the mapped file.
+
+    Parameters
+    ----------
+    languages : Dict[str, Dict[str, Any]]
+        The translated strings of each source id in the format of i18n/en.yaml, keyed by language
+    inputs_hash : bytes, optional
+        SHA-256 of the translation files, see translations_hash
+
+    Returns
+    -------
+    bytes
+        The catalog
+    """
+    strings: List[bytes] = []
+    string_indexes: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = string_indexes.get(value)
+        if index is None:
+            index = string_indexes[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return index
+
+    all_ids = {source_id for imagery in languages.values() for source_id in imagery}
+    ids = sorted(all_ids, key=lambda source_id: source_id.encode("utf-8"))
+    id_indexes = {source_id: index for index, source_id in enumerate(ids)}
+    id_strings = [intern(source_id) for source_id in ids]
+
+    language_rows = []
+    entries = []
+    for language in sorted(languages, key=lambda language: language.encode("utf-8")):
+        start = len(entries)
+        imagery = languages[language]
+        for source_id in sorted(imagery, key=id_indexes.__getitem__):
+            translation = _translation(imagery[source_id])
+            if any(translation):
+                entries.append((id_indexes[source_id], *(intern(value) for value in translation)))
+        language_rows.append((intern(language), start, len(entries)))
+
+    f = io.BytesIO()
+    f.write(
+        _HEADER.pack(
+            CATALOG_MAGIC, CATALOG_VERSION, inputs_hash, len(strings), len(language_rows), len(ids), len(entries)
+        )
+    )
+    offset = 0
+    for data in strings:
+        f.write(_STRING.pack(offset, len(data)))
+        offset += len(data)
+    for row in language_rows:
+        f.write(_LANGUAGE.pack(*row))
+    for string_index in id_strings:
+        f.write(_ID.pack(string_index))
+    for entry in entries:
+        f.write(_ENTRY.pack(*entry))
+    for data in strings:
+        f.write(data)
+    return f.getvalue()
+
+
+def _read_inputs_hash(path: str) -> Optional[bytes]:
+    """The inputs hash of the catalog at path, or None if there is no catalog of this version"""
+    try:
+        with io.open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, inputs_hash, *_ = _HEADER.unpack(header)
+    if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+        return None
+    return inputs_hash
+
+
+def write_catalog(path: str, translations_dir: str, jobs: Optional[int] = None) -> bool:
+    """Compiles all translation files of translations_dir, including the template, into the catalog at path
+
+    The catalog records the hash of the translation files, so it is only compiled again if a
+    translation file was added, changed or removed. The files are parsed in parallel.
+
+    Returns
+    -------
+    bool
+        Whether the catalog was compiled, False if it was up to date
+    """
+    languages = localize.find_languages(translations_dir, include_template=True)
+    inputs_hash = translations_hash(list(languages.values()))
+    if _read_inputs_hash(path) == inputs_hash:
+        return False
+    imagery = process_map(localize.load_translations, list(languages.values()), jobs)
+    data = encode_catalog(dict(zip(languages, imagery)), inputs_hash)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with io.open(tmp_path, "wb") as f:
+        f.write(data)
+    # A service reading the catalog keeps the mapping of the previous file
+    os.replace(tmp_path, path)
+    return True
+
+
+class TranslationCatalog:
+    """Reads translated names of sources from a catalog written by write_catalog
+
+    The catalog is memory mapped and nothing is decoded up front, so opening it is instant.
+    Languages and source ids are found by binary search, only the strings of the requested
+    translation are decoded.
+    """
+
+    def __init__(self, path: str) -> None:
+        with io.open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{path} is not a translation catalog")
+        magic, version, self.inputs_hash, strings, languages, ids, entries = _HEADER.unpack_from(self._mmap)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            raise ValueError(f"{path} is not a translation catalog of version {CATALOG_VERSION}")
+        self._strings_offset = _HEADER.size
+        self._languages_offset = self._strings_offset + strings * _STRING.size
+        self._ids_offset = self._languages_offset + languages * _LANGUAGE.size
+        self._entries_offset = self._ids_offset + ids * _ID.size
+        self._data_offset = self._entries_offset + entries * _ENTRY.size
+        self._language_count = languages
+        self._id_count = ids
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "TranslationCatalog":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _bytes(self, index: int) -> bytes:
+        offset, length = _STRING.unpack_from(self._mmap, self._strings_offset + index * _STRING.size)
+        start = self._data_offset + offset
+        return self._mmap[start : start + length]
+
+    def _string(self, index: int) -> Optional[str]:
+        return None if index == NO_STRING else self._bytes(index).decode("utf-8")
+
+    def _language(self, position: int) -> bytes:
+        (code,) = _ID.unpack_from(self._mmap, self._languages_offset + position * _LANGUAGE.size)
+        return self._bytes(code)
+
+    def _id(self, position: int) -> bytes:
+        (string,) = _ID.unpack_from(self._mmap, self._ids_offset + position * _ID.size)
+        return self._bytes(string)
+
+    @staticmethod
+    def _search(key: Any, count: int, get: Callable[[int], Any]) -> Optional[int]:
+        """Position of key in a sorted table of count keys, or None"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if get(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < count and get(low) == key else None
+
+    def languages(self) -> List[str]:
+        """Codes of all languages of the catalog, sorted"""
+        return [self._language(position).decode("utf-8") for position in range(self._language_count)]
+
+    def get(self, language: str, source_id: str) -> Optional[Translation]:
+        """The translation of the source source_id into language, or None if it is not translated"""
+        language_position = self._search(language.encode("utf-8"), self._language_count, self._language)
+        id_position = self._search(source_id.encode("utf-8"), self._id_count, self._id)
+        if language_position is None or id_position is None:
+            return None
+        language_offset = self._languages_offset + language_position * _LANGUAGE.size
+        _, start, end = _LANGUAGE.unpack_from(self._mmap, language_offset)
+
+        def entry_id(position: int) -> int:
+            return _ID.unpack_from(self._mmap, self._entries_offset + (start + position) * _ENTRY.size)[0]
+
+        position = self._search(id_position, end - start, entry_id)
+        if position is None:
+            return None
+        _, *strings = _ENTRY.unpack_from(self._mmap, self._entries_offset + (start + position) * _ENTRY.size)
+        return Translation(*(self._string(index) for index in strings))
+
+    def name(self, language: str, source_id: str, default: Optional[str] = None) -> Optional[str]:
+        """The translated name of the source source_id, or default if it is not translated"""
+        translation = self.get(language, source_id)
+        if translation is None or translation.name is None:
+            return default
+        return translation.name
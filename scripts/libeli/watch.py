@@ -0,0 +1,182 @@
+import io
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import artifacts, jsonio
+from .checks import SourceChecker
+from .manifest import BuildManifest, ManifestUpdate
+
+# Size and mtime of a source file
+FileState = Tuple[int, int]
+# Seconds without a rebuild after which the manifest is saved
+SAVE_DELAY = 5.0
+
+
+def scan_sources(directories: Sequence[str]) -> Dict[str, FileState]:
+    """Size and mtime of all .geojson files below directories, keyed by path"""
+    files: Dict[str, FileState] = {}
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(".geojson"):
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+@dataclass
+class WatchUpdate:
+    """The result of a rebuild of SourceWatcher"""
+
+    changed: List[str]
+    removed: List[str]
+    # Path -> error of the changed sources which failed to parse or to check
+    errors: Dict[str, str] = field(default_factory=dict)
+    manifest: Optional[ManifestUpdate] = None
+    seconds: float = 0.0
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Replaces the file at path at once, so readers never see a partially written artifact"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with io.open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SourceWatcher:
+    """Keeps the artifacts of a sources directory up to date while the sources are edited
+
+    The fragments of all sources are kept in memory in a BuildManifest. Every poll only stats
+    the source files; added or changed sources are checked, rendered and spliced into
+    imagery.geojson, imagery.json, imagery.xml and i18n/en.yaml. Sources which fail to parse,
+    e.g. while an editor is still writing them, are left out of the artifacts until they are
+    fixed. The manifest is not saved by a rebuild, but by run once no source changed for
+    SAVE_DELAY seconds and when it stops.
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[str],
+        outdir: str = ".",
+        manifest: Optional[BuildManifest] = None,
+        checker: Optional[SourceChecker] = None,
+        jobs: Optional[int] = None,
+    ) -> None:
+        """Inits the SourceWatcher
+
+        Parameters
+        ----------
+        directories : Sequence[str]
+            The source directories to watch
+        outdir : str, optional
+            Directory to write the artifacts to, by default the working directory
+        manifest : Optional[BuildManifest], optional
+            Manifest to keep the fragments in, by default one kept in memory only
+        checker : Optional[SourceChecker], optional
+            Checker of the changed sources, by default sources are not checked
+        jobs : Optional[int], optional
+            Number of processes rendering changed sources, by default the number of CPUs
+        """
+        self.directories = list(directories)
+        self.outdir = outdir
+        self.manifest = manifest if manifest is not None else BuildManifest()
+        self.checker = checker
+        self.jobs = jobs
+        self.files: Dict[str, FileState] = {}
+        # Paths of sources which failed to parse and are left out of the artifacts
+        self.broken: Dict[str, str] = {}
+        # Time of the last rebuild, if it was not saved to the manifest yet
+        self._unsaved: Optional[float] = None
+
+    def poll(self) -> Optional[WatchUpdate]:
+        """Rebuilds the artifacts if a source was added, changed or removed since the last poll
+
+        Returns
+        -------
+        Optional[WatchUpdate]
+            The changes, or None if no source changed
+        """
+        files = scan_sources(self.directories)
+        changed = sorted(path for path, state in files.items() if self.files.get(path) != state)
+        removed = sorted(path for path in self.files if path not in files)
+        self.files = files
+        if not changed and not removed:
+            return None
+        return self.rebuild(changed, removed)
+
+    def rebuild(self, changed: List[str], removed: List[str]) -> WatchUpdate:
+        """Checks the changed sources and rewrites the artifacts"""
+        start = time.perf_counter()
+        update = WatchUpdate(changed=changed, removed=removed)
+        for path in removed:
+            self.broken.pop(path, None)
+            if self.checker is not None:
+                self.checker.forget(path)
+        for path in changed:
+            self.broken.pop(path, None)
+            try:
+                source = jsonio.load(path, unique_keys=True)
+            except Exception as e:
+                self.broken[path] = update.errors[path] = f"Could not parse file: {e}"
+                continue
+            if self.checker is not None:
+                try:
+                    self.checker.check(path, source)
+                except Exception as e:
+                    update.errors[path] = str(e)
+
+        paths = sorted(path for path in self.files if path not in self.broken)
+        try:
+            update.manifest = self.manifest.update(paths, self.jobs)
+        except Exception as e:
+            # Rendering failed for a source which parsed fine, keep the previous artifacts
+            update.errors["build"] = f"Could not render sources: {e}"
+        else:
+            self.write(paths)
+            self._unsaved = time.monotonic()
+        update.seconds = time.perf_counter() - start
+        return update
+
+    def write(self, paths: List[str]) -> None:
+        """Writes the artifacts of the sources of paths"""
+        fragments = self.manifest.fragments(paths)
+        generated = artifacts.format_generated()
+        # The same bytes as written by build.py
+        texts = {
+            "imagery.geojson": artifacts.join_geojson(fragments, generated),
+            "imagery.json": artifacts.join_json(fragments),
+            os.path.join("i18n", "en.yaml"): artifacts.join_i18n(fragments),
+        }
+        for filename, text in texts.items():
+            _write_atomic(os.path.join(self.outdir, filename), (text + "\n").encode("utf-8"))
+        _write_atomic(os.path.join(self.outdir, "imagery.xml"), artifacts.join_xml(fragments))
+
+    def save(self) -> None:
+        """Saves the manifest if a rebuild changed it"""
+        if self._unsaved is not None:
+            self.manifest.save()
+            self._unsaved = None
+
+    def run(self, interval: float, report: Callable[[WatchUpdate], None]) -> None:
+        """Polls every interval seconds until interrupted and reports every rebuild
+
+        The manifest is saved once no rebuild happened for SAVE_DELAY seconds and when polling stops.
+        """
+        try:
+            while True:
+                update = self.poll()
+                if update is not None:
+                    report(update)
+                elif self._unsaved is not None and time.monotonic() - self._unsaved >= SAVE_DELAY:
+                    self.save()
+                time.sleep(interval)
+        finally:
+            self.save()
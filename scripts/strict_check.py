@@ -22,7 +22,8 @@ import requests
 import urllib3
 import validators
 from jsonschema import Draft4Validator, RefResolver, ValidationError
-from libeli import eliutils, tmshelper, wmshelper, wmtshelper
+from libeli import eliutils, jsonio, tmshelper, wmshelper, wmtshelper
+from libeli.cache import SourceCache, default_cache_path
 from requests.models import Response
 from shapely.geometry import Point, Polygon, box
 from shapely.geometry.geo import mapping, shape
@@ -47,17 +48,6 @@ class Message:
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)  # type: ignore
 
 
-def dict_raise_on_duplicates(ordered_pairs: List[Tuple[Any, Any]]) -> Dict[Any, Any]:
-    """Reject duplicate keys."""
-    d: Dict[Any, Any] = {}
-    for k, v in ordered_pairs:
-        if k in d:
-            raise ValidationError("duplicate key: %r" % (k,))
-        else:
-            d[k] = v
-    return d
-
-
 parser = ArgumentParser(description="Strict checks for ELI sources newly added")
 parser.add_argument("path", nargs="+", help="Path of files to check.")
 
@@ -72,6 +62,7 @@ schema = json.load(io.open("schema.json", encoding="utf-8"))
 
 resolver = RefResolver("", None)
 validator = Draft4Validator(schema, resolver=resolver)
+cache = SourceCache(default_cache_path())
 
 borkenbuild = False
 spacesave = 0
@@ -839,11 +830,12 @@ for filename in arguments.path:
 
         messages: List[Message] = []
 
-        # dict_raise_on_duplicates raises error on duplicate keys in geojson
-        source = json.load(
-            io.open(filename, encoding="utf-8"),
-            object_pairs_hook=dict_raise_on_duplicates,
-        )
+        # The cache raises an error on duplicate keys in geojson
+        try:
+            source = cache.load(filename)
+        except jsonio.DuplicateKeyError as e:
+            logger.error(f"{filename}: {e}")
+            raise ValidationError(f"{filename}: {e}")
 
         # jsonschema validate
         try:
@@ -1097,6 +1089,7 @@ for filename in arguments.path:
         borkenbuild = True
     except Exception as e:
         logger.exception(f"Failed: {e}")
+cache.save()
 if spacesave > 0:
     logger.warning(f"Disembedding all icons would save {round(spacesave / 1024.0, 2)} KB")
 if borkenbuild:
@@ -1,10 +1,7 @@
 import argparse
 import asyncio
-import glob
 import io
-import json
 import logging
-import os
 import ssl
 from asyncio.events import AbstractEventLoop
 from collections import defaultdict
@@ -24,14 +21,14 @@ from typing import (
 )
 from urllib.parse import parse_qsl, urlparse
 
-import aiofiles
 import aiohttp
 import imagehash
 import magic
 import mercantile
 from aiohttp import ClientSession
 from imagehash import ImageHash
-from libeli import eliutils, wmshelper
+from libeli import eliutils, jsonio, wmshelper
+from libeli.catalog import SourceCatalog
 from PIL import Image
 from pyproj.crs.crs import CRS
 from shapely.geometry import MultiPolygon, Point, Polygon, box
@@ -59,6 +56,7 @@ parser.add_argument(
 
 args = parser.parse_args()
 sources_directory = str(args.sources)
+catalog = SourceCatalog([sources_directory])
 
 
 # We ignore SSL issues as best we can
@@ -474,9 +472,7 @@ async def update_wms(url: str, session: ClientSession, messages: List[str]) -> O
 
 async def process_source(filename: str, session: ClientSession):
     try:
-        async with aiofiles.open(filename, mode="r", encoding="utf-8") as f:
-            contents = await f.read()
-            source = json.loads(contents)
+        source = catalog.source(filename)
 
         # Exclude sources
         # Skip non wms layers
@@ -722,8 +718,7 @@ async def process_source(filename: str, session: ClientSession):
 
         if url_has_changed or projections_have_changed:
             with open(filename, "w", encoding="utf-8") as out:
-                json.dump(source, out, indent=4, sort_keys=False, ensure_ascii=False)
-                out.write("\n")
+                jsonio.dump_source(source, out)
     except Exception as e:
         logging.exception(f"{filename}: Error occurred while processing source: {e}")
 
@@ -743,10 +738,11 @@ async def start_processing(sources_directory: str):
     conn = aiohttp.TCPConnector(limit_per_host=1)
     async with ClientSession(headers=headers, timeout=timeout, connector=conn) as session:
         jobs: List[Coroutine[Any, Any, None]] = []
-        files = glob.glob(os.path.join(sources_directory, "**", "*.geojson"), recursive=True)
-        for filename in files:
-            jobs.append(process_source(filename, session))
+        # Only WMS sources are opened
+        for entry in catalog.filter(type="wms"):
+            jobs.append(process_source(entry.path, session))
         await asyncio.gather(*jobs)
+    catalog.save()
 
     print("")
     print("")
@@ -0,0 +1,21 @@
+from typing import Any, Dict, List, Optional
+
+
+def get_source(source_id: str, coordinates: Optional[List[List[float]]] = None, **properties: Any) -> Dict[str, Any]:
+    """A minimal source, with a polygon of the ring coordinates as geometry if given"""
+    geometry = None
+    if coordinates is not None:
+        geometry = {"type": "Polygon", "coordinates": [coordinates]}
+    properties.setdefault("name", source_id)
+    properties.setdefault("type", "tms")
+    properties.setdefault("url", f"https://{source_id.lower()}.example.com/{{zoom}}/{{x}}/{{y}}")
+    properties["id"] = source_id
+    return {"type": "Feature", "properties": properties, "geometry": geometry}
+
+
+def get_rectangle(west: float, south: float, east: float, north: float) -> List[List[float]]:
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+def get_square(west: float, south: float, size: float) -> List[List[float]]:
+    return get_rectangle(west, south, west + size, south + size)
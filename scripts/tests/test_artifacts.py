@@ -0,0 +1,141 @@
+import io
+import json
+import math
+import xml.etree.ElementTree as ET
+from typing import Any, Dict
+
+from libeli import artifacts
+
+
+def get_source() -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "properties": {
+            "id": "test",
+            "name": "Test",
+            "type": "tms",
+            "url": "https://example.com/{zoom}/{x}/{y}.png",
+            "i18n": True,
+            "start_date": "2020",
+            "end_date": "2020",
+            "max_zoom": 25,
+            "attribution": {"text": "Test attribution", "required": True},
+        },
+        "geometry": {"type": "Polygon", "coordinates": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]},
+    }
+
+
+def test_round_float():
+    assert artifacts.round_float("1.123456789") == 1.12346
+
+
+def test_legacy_json_source():
+    converted = artifacts.legacy_json_source(get_source(), gen_bbox=True)
+    assert converted["id"] == "test"
+    assert "i18n" not in converted
+    assert converted["extent"]["max_zoom"] == 25
+    assert converted["extent"]["bbox"] == {"min_lon": 0.0, "max_lon": 1.0, "min_lat": 0.0, "max_lat": 1.0}
+    assert converted["extent"]["polygon"] == [[(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 0.0)]]
+
+
+def test_load_legacy_json_source_without_polygons(tmp_path):
+    path = tmp_path / "test.geojson"
+    path.write_text(json.dumps(get_source()))
+    converted = artifacts.load_legacy_json_source(str(path), remove_polygons=True)
+    assert converted == artifacts.legacy_json_source(get_source(), remove_polygons=True)
+    assert "polygon" not in converted["extent"]
+    assert artifacts.load_source_without_coordinates(str(path))["geometry"] == {"type": "Polygon", "coordinates": None}
+
+
+def test_legacy_json_source_tms_only():
+    source = get_source()
+    source["properties"]["type"] = "wms"
+    assert artifacts.legacy_json_source(source, tms_only=True) == {}
+
+
+def test_add_xml_entry():
+    root = ET.Element("imagery")
+    artifacts.add_xml_entry(root, get_source())
+    entry = root.find("entry")
+    assert entry is not None
+    assert entry.findtext("date") == "2020"
+    assert entry.findtext("max-zoom") == "24"
+    assert entry.findtext("category") == "photo"
+    assert entry.find("attribution-text").get("mandatory") == "true"  # type: ignore
+    assert len(entry.findall("bounds/shape/point")) == 4
+
+
+def test_add_xml_entry_large_shape():
+    source = get_source()
+    ring = [[math.cos(2 * math.pi * i / 2000), math.sin(2 * math.pi * i / 2000)] for i in range(2000)]
+    triangle = source["geometry"]["coordinates"][0]
+    source["geometry"] = {"type": "MultiPolygon", "coordinates": [[ring + [ring[0]]], [triangle]]}
+    root = ET.Element("imagery")
+    simplified = artifacts.add_xml_entry(root, source)
+    shapes = root.findall("entry/bounds/shape")
+    assert len(shapes) == 2
+    assert 4 < len(shapes[0]) <= 999
+    assert len(shapes[1]) == 4
+    assert len(simplified) == 1
+    points, deviation = simplified[0]
+    assert points == len(shapes[0])
+    assert 0 < deviation < 0.001
+
+
+def test_xml_entry_reports_simplified_shapes(capsys):
+    source = get_source()
+    ring = [[math.cos(2 * math.pi * i / 2000), math.sin(2 * math.pi * i / 2000)] for i in range(2000)]
+    source["geometry"] = {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+    entry = ET.fromstring(artifacts.xml_entry(source))
+    points = len(entry.findall("bounds/shape/point"))
+    assert f"Simplified shape of test to {points} points" in capsys.readouterr().out
+
+
+def test_i18n_strings():
+    data = artifacts.i18n_strings([get_source()])
+    assert data == {"test": {"name": "Test", "attribution": {"text": "Test attribution"}}}
+
+
+def test_join_fragments():
+    sources = [get_source(), get_source()]
+    sources[1]["properties"]["id"] = "test2"
+    sources[1]["geometry"] = None
+    fragments = [artifacts.render_fragments(source) for source in sources]
+
+    generated = "2020-01-01 00:00:00"
+    assert artifacts.join_geojson(fragments, generated) == artifacts.dumps(
+        artifacts.geojson_collection(sources, generated)
+    )
+    assert artifacts.join_json(fragments) == artifacts.dumps(
+        [artifacts.legacy_json_source(source) for source in sources]
+    )
+    assert artifacts.join_i18n(fragments) == artifacts.i18n_yaml(sources)
+
+
+def test_join_xml(tmp_path):
+    sources = [get_source()]
+    path = str(tmp_path / "imagery.xml")
+    artifacts.write_xml(artifacts.xml_tree(sources), path)
+    with open(path, "rb") as f:
+        assert artifacts.join_xml([artifacts.render_fragments(source) for source in sources]) == f.read()
+
+    artifacts.write_xml(artifacts.xml_tree([]), path)
+    with open(path, "rb") as f:
+        assert artifacts.join_xml([]) == f.read()
+
+
+def test_load_xml_entry(tmp_path):
+    path = tmp_path / "test.geojson"
+    path.write_text(json.dumps(get_source()))
+    entry = artifacts.load_xml_entry(str(path))
+    assert entry == artifacts.render_fragments(get_source()).xml
+    assert artifacts.join_xml_entries([entry]) == artifacts.join_xml([artifacts.render_fragments(get_source())])
+
+
+def test_write_geojson_lines():
+    sources = [get_source(), get_source()]
+    sources[1]["properties"]["description"] = "Line 1\nLine 2"
+    f = io.StringIO()
+    artifacts.write_geojson_lines((artifacts.dumps(source) for source in sources), f)
+    lines = f.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == sources
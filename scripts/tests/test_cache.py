@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+from libeli import jsonio
+from libeli.cache import SourceCache, decode_source, encode_source
+
+SQUARE = [[0.5, 0.5], [1.5, 0.5], [1.5, 1.5], [0.5, 1.5], [0.5, 0.5]]
+HOLE = [[0.75, 0.75], [0.75, 1.25], [1.25, 1.25], [0.75, 0.75]]
+
+
+def source(source_id, geometry):
+    return {
+        "type": "Feature",
+        "properties": {"id": source_id, "name": source_id, "type": "tms", "url": "https://example.com/{zoom}/{x}/{y}"},
+        "geometry": geometry,
+    }
+
+
+def write_source(path, source):
+    path.write_text(json.dumps(source, indent=4), encoding="utf-8")
+
+
+def test_encode_source():
+    polygon = source("a", {"type": "Polygon", "coordinates": [SQUARE, HOLE]})
+    multipolygon = source("b", {"coordinates": [[SQUARE], [SQUARE, HOLE]], "type": "MultiPolygon"})
+    for original in [polygon, multipolygon]:
+        feature, wkb = encode_source(original)
+        assert wkb is not None
+        assert b"0.75" not in feature
+        decoded = decode_source(feature, wkb)
+        assert decoded == original
+        # Member order is kept, so rewriting a source does not reorder it
+        assert jsonio.dumps(decoded, sort_keys=False) == jsonio.dumps(original, sort_keys=False)
+
+    # Integer and three dimensional coordinates do not survive WKB and are kept as JSON
+    integers = source("c", {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]})
+    ring = [[0.5, 0.5, 1.0], [1.5, 0.5, 1.0], [1.5, 1.5, 1.0], [0.5, 0.5, 1.0]]
+    three_d = source("d", {"type": "Polygon", "coordinates": [ring]})
+    for original in [integers, three_d, source("e", None)]:
+        feature, wkb = encode_source(original)
+        assert wkb is None
+        assert jsonio.dumps(decode_source(feature, wkb), sort_keys=False) == jsonio.dumps(original, sort_keys=False)
+
+
+def test_source_cache(tmp_path):
+    paths = [tmp_path / "a.geojson", tmp_path / "b.geojson", tmp_path / "c.geojson"]
+    write_source(paths[0], source("a", {"type": "Polygon", "coordinates": [SQUARE, HOLE]}))
+    write_source(paths[1], source("b", None))
+    write_source(paths[2], source("c", {"type": "MultiPolygon", "coordinates": [[SQUARE]]}))
+    paths = [str(path) for path in paths]
+    cache_path = str(tmp_path / "build" / "sources.cache")
+
+    cache = SourceCache(cache_path)
+    assert cache.load_all(paths, jobs=1) == [jsonio.load(path) for path in paths]
+    assert cache.misses == 3
+    cache.save()
+
+    # Touched and moved files are found by their content hash
+    os.utime(paths[0], ns=(0, 0))
+    moved = str(tmp_path / "moved.geojson")
+    os.rename(paths[2], moved)
+    write_source(tmp_path / "b.geojson", source("b", {"type": "Polygon", "coordinates": [SQUARE]}))
+    cache = SourceCache(cache_path)
+    assert cache.load(paths[0]) == jsonio.load(paths[0])
+    assert cache.load(moved) == jsonio.load(moved)
+    assert cache.load(paths[1])["geometry"]["coordinates"] == [SQUARE]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.properties(paths[0])["id"] == "a"
+    assert cache.geometry(paths[0]).area == 0.875
+    assert cache.geometry(paths[1]).area == 1.0
+    cache.save()
+
+    # Entries of removed files are dropped
+    cache = SourceCache(cache_path)
+    assert sorted(cache.entries) == sorted([paths[0], paths[1], moved])
+    assert cache.load(paths[1])["properties"]["id"] == "b"
+    assert cache.misses == 0
+
+
+def test_source_cache_errors(tmp_path):
+    path = tmp_path / "a.geojson"
+    path.write_text('{"type": "Feature", "type": "Feature"}', encoding="utf-8")
+    cache = SourceCache(str(tmp_path / "sources.cache"))
+    with pytest.raises(jsonio.DuplicateKeyError):
+        cache.load(str(path))
+    assert cache.entries == {}
+
+    # Invalid bundles are discarded
+    (tmp_path / "broken.cache").write_bytes(b"ELICACHE\x01")
+    assert SourceCache(str(tmp_path / "broken.cache")).entries == {}
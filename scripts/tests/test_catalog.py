@@ -0,0 +1,63 @@
+import json
+import os
+
+from libeli.cache import SourceCache
+from libeli.catalog import SourceCatalog, find_sources
+
+SQUARE = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+
+
+def write_source(path, source_id, source_type, country_code=None):
+    properties = {"id": source_id, "type": source_type, "url": "https://example.com"}
+    geometry = None
+    if country_code is not None:
+        properties["country_code"] = country_code
+        geometry = {"type": "Polygon", "coordinates": [SQUARE]}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "Feature", "properties": properties, "geometry": geometry}, f)
+
+
+def test_source_catalog(tmp_path):
+    sources = tmp_path / "sources"
+    write_source(str(sources / "world" / "a.geojson"), "a", "tms")
+    write_source(str(sources / "europe" / "de" / "b.geojson"), "b", "wms", "DE")
+    write_source(str(sources / "europe" / "fr" / "c.geojson"), "c", "wms", "FR")
+    write_source(str(sources / "europe" / "fr" / "d.geojson"), "d", "tms", "FR")
+    (sources / "README.md").write_text("not a source")
+    cache_path = str(tmp_path / "sources.cache")
+
+    catalog = SourceCatalog([str(sources)], SourceCache(cache_path), jobs=1)
+    assert [os.path.basename(path) for path in catalog.paths] == ["b.geojson", "c.geojson", "d.geojson", "a.geojson"]
+    assert len(catalog) == 4
+    assert [entry.id for entry in catalog.filter(type="wms")] == ["b", "c"]
+    assert [entry.id for entry in catalog.filter(type={"tms", "wms"}, country_code="FR")] == ["c", "d"]
+    assert [entry.id for entry in catalog.filter(country_code=["DE", None])] == ["b", "a"]
+    assert catalog.get("d").type == "tms"
+    assert catalog.get("x") is None
+    assert catalog.properties(catalog.get("b").path)["country_code"] == "DE"
+    assert catalog.source(catalog.get("b").path)["geometry"]["coordinates"] == [SQUARE]
+    assert catalog.geometry(catalog.get("b").path).area == 1.0
+    assert catalog.geometry(catalog.get("a").path) is None
+    catalog.save()
+
+    # The next catalog is built from the cache
+    cache = SourceCache(cache_path)
+    catalog = SourceCatalog([str(sources)], cache, jobs=1)
+    assert [entry.id for entry in catalog] == ["b", "c", "d", "a"]
+    assert (cache.hits, cache.misses) == (4, 0)
+
+    # Broken sources are not indexed
+    (sources / "europe" / "fr" / "e.geojson").write_text("{")
+    catalog = SourceCatalog([str(sources)], SourceCache(cache_path), jobs=1)
+    assert [entry.id for entry in catalog] == ["b", "c", "d", "a"]
+    assert list(catalog.errors) == [str(sources / "europe" / "fr" / "e.geojson")]
+
+
+def test_find_sources(tmp_path):
+    write_source(str(tmp_path / "sources" / "world" / "a.geojson"), "a", "tms")
+    path = str(tmp_path / "single.geojson")
+    write_source(path, "b", "tms")
+    expected = [path, str(tmp_path / "sources" / "world" / "a.geojson")]
+    assert find_sources([str(tmp_path / "sources"), path]) == expected
+    assert find_sources([str(tmp_path / "missing")]) == []
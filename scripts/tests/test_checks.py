@@ -0,0 +1,43 @@
+import pytest
+from jsonschema import ValidationError
+from libeli.checks import SourceChecker
+
+SQUARE = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+
+
+def source(source_id, **properties):
+    return {
+        "type": "Feature",
+        "properties": dict(
+            {"id": source_id, "type": "tms", "url": "https://example.com/{zoom}/{x}/{y}", "country_code": "DE"},
+            **properties,
+        ),
+        "geometry": {"type": "Polygon", "coordinates": [SQUARE]},
+    }
+
+
+def test_source_checker():
+    checker = SourceChecker({})
+    checker.check("sources/europe/de/a.geojson", source("a"))
+    # Checking a source again after it changed is fine, another source with the same id is not
+    checker.check("sources/europe/de/a.geojson", source("a", name="A"))
+    with pytest.raises(ValidationError, match="Id a used multiple times"):
+        checker.check("sources/europe/de/b.geojson", source("a"))
+    checker.forget("sources/europe/de/a.geojson")
+    checker.check("sources/europe/de/b.geojson", source("a"))
+
+    with pytest.raises(ValidationError, match="Missing available_projections"):
+        checker.check("sources/europe/de/c.geojson", source("c", type="wms"))
+    with pytest.raises(ValidationError, match=r"\{z\} found"):
+        checker.check("sources/europe/de/d.geojson", source("d", url="https://example.com/{z}/{x}/{y}"))
+
+    bowtie = source("e")
+    bowtie["geometry"]["coordinates"] = [[[0.0, 0.0], [1.0, 1.0], [1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]]
+    with pytest.raises(ValidationError, match="geometry is not valid"):
+        checker.check("sources/europe/de/e.geojson", bowtie)
+
+    world = source("f")
+    with pytest.raises(ValidationError, match="should have null geometry"):
+        checker.check("sources/world/f.geojson", world)
+    world["geometry"] = None
+    checker.check("sources/world/f.geojson", world)
@@ -0,0 +1,58 @@
+import io
+import os
+import random
+
+from libeli import corpus, jsonio
+from shapely.geometry import shape
+
+
+def write_source(path, geometry):
+    source = {
+        "type": "Feature",
+        "properties": {"id": "test", "name": "Test", "type": "wms", "url": "https://example.com/wms"},
+        "geometry": geometry,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with io.open(path, "w", encoding="utf-8") as f:
+        jsonio.dump_source(source, f)
+
+
+def test_source_template(tmp_path):
+    path = str(tmp_path / "sources" / "europe" / "de" / "test.geojson")
+    square = [[10.0, 50.0], [11.0, 50.0], [11.0, 51.0], [10.0, 51.0], [10.0, 50.0]]
+    write_source(path, {"type": "MultiPolygon", "coordinates": [[square], [square[:-1] + [square[0]]]]})
+    template = corpus.source_template(path)
+    assert template.directory == "europe/de"
+    assert template.geometry_type == "MultiPolygon"
+    assert template.ring_sizes == [[5], [5]]
+    assert template.bbox == [10.0, 50.0, 11.0, 51.0]
+    assert template.properties["type"] == "wms"
+
+
+def test_synthetic_source():
+    template = corpus.SourceTemplate(
+        directory="europe/de",
+        properties={"id": "test", "name": "Test", "type": "tms", "url": "https://example.com/{zoom}/{x}/{y}.png"},
+        geometry_type="MultiPolygon",
+        ring_sizes=[[100, 5, 12], [4], [2000]],
+        bbox=[10.0, 50.0, 10.01, 50.01],
+    )
+    source = corpus.synthetic_source(random.Random(0), template, 7)
+    assert source["properties"]["id"] == "synthetic-000007-test"
+    assert source["properties"]["name"] == "Test (synthetic 7)"
+    assert source["properties"]["url"] == template.properties["url"]
+    coordinates = source["geometry"]["coordinates"]
+    assert [[len(ring) for ring in polygon] for polygon in coordinates] == template.ring_sizes
+    assert shape(source["geometry"]).is_valid
+
+    template.bbox = None
+    assert corpus.synthetic_source(random.Random(0), template, 7)["geometry"] is None
+
+
+def test_write_corpus(tmp_path):
+    path = str(tmp_path / "sources" / "world" / "test.geojson")
+    write_source(path, None)
+    templates = [corpus.source_template(path)]
+    paths = corpus.write_corpus(str(tmp_path / "corpus"), templates, 3)
+    assert paths == [str(tmp_path / "corpus" / "world" / f"synthetic-00000{i}.geojson") for i in range(3)]
+    assert [jsonio.load(path)["properties"]["id"] for path in paths] == [f"synthetic-00000{i}-test" for i in range(3)]
@@ -0,0 +1,43 @@
+from conftest import get_rectangle, get_source
+from libeli import artifacts
+from libeli.coverage import COVERAGE_ZOOMS, CoverageIndex, build_coverage, rank_sources
+
+
+def test_rank_sources() -> None:
+    sources = [
+        get_source("old", start_date="2010", end_date="2012"),
+        get_source("undated", max_zoom=20),
+        get_source("new", start_date="2020"),
+        get_source("new_detailed", start_date="2020", max_zoom=21),
+        get_source("best", best=True),
+    ]
+    assert [sources[i]["properties"]["id"] for i in rank_sources(sources)] == [
+        "best",
+        "new_detailed",
+        "new",
+        "old",
+        "undated",
+    ]
+
+
+def test_coverage_index() -> None:
+    sources = [
+        get_source("germany", get_rectangle(6.0, 47.3, 15.0, 55.0), start_date="2018"),
+        get_source("berlin", get_rectangle(13.0, 52.3, 13.8, 52.7), start_date="2021", min_zoom=10),
+        get_source("world", max_zoom=19),
+    ]
+    fragments = [artifacts.render_fragments(source, coverage_zooms=COVERAGE_ZOOMS) for source in sources]
+    coverage = build_coverage(fragments, "2024-01-01 00:00:00")
+    assert coverage["sources"]["id"] == ["berlin", "germany", "world"]
+    index = CoverageIndex(coverage)
+
+    assert index.at_point(13.4, 52.5, 14) == ["berlin", "germany", "world"]
+    assert index.at_point(13.4, 52.5, 9) == ["germany", "world"]
+    assert index.at_point(13.4, 52.5, 20) == ["berlin", "germany"]
+    assert index.at_point(9.0, 50.0, 14) == ["germany", "world"]
+    assert index.at_point(-70.0, -30.0, 14) == ["world"]
+    # The z0 level has a single tile
+    assert index.at_point(-70.0, -30.0, 0) == ["germany", "world"]
+    assert index.at_point(13.4, 52.5, 2) == ["germany", "world"]
+    # Equal candidates share a set
+    assert len(coverage["sets"]) == len({tuple(candidates) for candidates in coverage["sets"]})
@@ -0,0 +1,90 @@
+import sqlite3
+from typing import Any, List
+
+import pytest
+from conftest import get_source, get_square
+from libeli import artifacts, database
+
+
+@pytest.mark.parametrize(
+    "url,expected_host",
+    [
+        ("https://Tiles.Example.com:8080/{zoom}/{x}/{y}.png", "tiles.example.com"),
+        ("https://{switch:a,b,c}.tile.example.com/{zoom}/{x}/{y}", "{switch}.tile.example.com"),
+        ("https://osm-{switch:a,b,c}.example.com/{zoom}/{x}/{y}", "osm-{switch}.example.com"),
+        ("{zoom}/{x}/{y}", None),
+    ],
+)
+def test_url_host(url, expected_host):
+    assert database.url_host(url) == expected_host
+
+
+def test_write_database(tmp_path):
+    sources = [
+        get_source(
+            "Berlin",
+            get_square(13.0, 52.3, 0.8),
+            type="wms",
+            url="https://fbinter.stadt-berlin.de/fb/wms?FORMAT=image/jpeg",
+            country_code="DE",
+            category="photo",
+            start_date="2014",
+            end_date="2014",
+            available_projections=["EPSG:25833", "EPSG:4326", "EPSG:25833"],
+        ),
+        get_source(
+            "Bavaria",
+            get_square(9.0, 47.3, 4.5),
+            type="wms",
+            url="https://geoservices.bayern.de/wms?FORMAT=image/png",
+            country_code="DE",
+            start_date="2020",
+            available_projections=["EPSG:25832", "EPSG:4326"],
+        ),
+        get_source("World", category="map", max_zoom=19, best=True),
+    ]
+    path = tmp_path / database.DATABASE_FILENAME
+    database.write_database(str(path), [artifacts.render_fragments(source) for source in sources], "2024-01-01")
+
+    connection = sqlite3.connect(str(path))
+
+    def ids(query: str, *parameters: Any) -> List[str]:
+        return [source_id for source_id, in connection.execute(query, parameters)]
+
+    assert dict(connection.execute("SELECT key, value FROM meta")) == {
+        "format_version": artifacts.GEOJSON_FORMAT_VERSION,
+        "generated": "2024-01-01",
+        "schema_version": "1",
+    }
+    assert ids(
+        "SELECT s.id FROM sources s JOIN projections p ON p.source = s.fid "
+        "WHERE s.type = ? AND s.country_code = ? AND p.code = ?",
+        "wms",
+        "DE",
+        "EPSG:25832",
+    ) == ["Bavaria"]
+    assert ids("SELECT id FROM sources WHERE end_date < ?", "2015") == ["Berlin"]
+    assert ids("SELECT id FROM sources WHERE host = ?", "geoservices.bayern.de") == ["Bavaria"]
+    assert ids("SELECT id FROM sources WHERE best ORDER BY id") == ["World"]
+    assert ids(
+        "SELECT s.id FROM sources s JOIN sources_rtree r ON r.fid = s.fid "
+        "WHERE r.min_lon <= ? AND r.max_lon >= ? AND r.min_lat <= ? AND r.max_lat >= ? ORDER BY s.fid",
+        13.4,
+        13.4,
+        52.5,
+        52.5,
+    ) == ["Berlin", "World"]
+    assert ids("SELECT s.id FROM sources s JOIN projections p ON p.source = s.fid WHERE p.code = 'EPSG:4326'") == [
+        "Berlin",
+        "Bavaria",
+    ]
+    assert connection.execute("SELECT properties, geometry FROM sources WHERE id = 'World'").fetchone() == (
+        '{"best":true,"category":"map","id":"World","max_zoom":19,"name":"World","type":"tms",'
+        '"url":"https://world.example.com/{zoom}/{x}/{y}"}',
+        None,
+    )
+    plan = " ".join(
+        row[-1] for row in connection.execute("EXPLAIN QUERY PLAN SELECT id FROM sources WHERE host = 'x'")
+    )
+    assert "sources_host" in plan
+    connection.close()
@@ -0,0 +1,85 @@
+import io
+from typing import Any, Dict, List
+
+import pytest
+from conftest import get_source
+from libeli import artifacts, delta, jsonio
+
+
+def build(tmp_path, sources: List[Dict[str, Any]], generated: str) -> Dict[str, Any]:
+    fragments = [artifacts.render_fragments(source) for source in sources]
+    with io.open(tmp_path / "imagery.geojson", "w", encoding="utf-8") as f:
+        artifacts.write_geojson((fragment.geojson for fragment in fragments), f, generated)
+        f.write("\n")
+    return delta.write_deltas(str(tmp_path / "deltas"), str(tmp_path / "imagery.geojson"), fragments, generated)
+
+
+def read_geojson(tmp_path) -> bytes:
+    return (tmp_path / "imagery.geojson").read_bytes()
+
+
+def test_build_delta():
+    previous = [artifacts.render_fragments(get_source(source_id)) for source_id in "ABCDE"]
+    sources = [get_source("B"), get_source("D"), get_source("C", max_zoom=18), get_source("F"), get_source("E")]
+    fragments = [artifacts.render_fragments(source) for source in sources]
+    state = [[delta._feature_id(f), delta._feature_hash(f.geojson)] for f in previous]
+
+    result = delta.build_delta(state, fragments, "from", "to", "2024-01-02")
+
+    # D moved before C, so one of them is removed and added again
+    assert sorted(result["removed"]) == ["A", "D"]
+    assert [feature["properties"]["id"] for feature in result["changed"]] == ["C"]
+    assert [(position, feature["properties"]["id"]) for position, feature in result["added"]] == [(1, "D"), (3, "F")]
+
+
+def test_write_deltas_chain(tmp_path):
+    versions = [
+        [get_source("A"), get_source("B"), get_source("C")],
+        [get_source("A"), get_source("B", max_zoom=18), get_source("C")],
+        [get_source("B", max_zoom=18), get_source("C"), get_source("D")],
+        [get_source("D"), get_source("B", max_zoom=18), get_source("C")],
+    ]
+    geojsons = []
+    for day, sources in enumerate(versions, 1):
+        index = build(tmp_path, sources, f"2024-01-0{day}")
+        geojsons.append(read_geojson(tmp_path))
+    assert len(index["deltas"]) == 3
+    assert index["latest"] == delta.geojson_hash(geojsons[-1])
+
+    # Every previous version catches up with the chain of deltas starting at it
+    for data in geojsons:
+        chain = delta.delta_chain(index, delta.geojson_hash(data))
+        assert chain is not None
+        for entry in chain:
+            data = delta.apply_delta(data, jsonio.load(str(tmp_path / "deltas" / entry["path"])))
+        assert data == geojsons[-1]
+    assert delta.delta_chain(index, "unknown") is None
+
+
+def test_write_deltas_unchanged(tmp_path):
+    build(tmp_path, [get_source("A")], "2024-01-01")
+    index = build(tmp_path, [get_source("A")], "2024-01-01")
+    assert index["deltas"] == []
+    assert sorted(path.name for path in (tmp_path / "deltas").iterdir()) == [delta.DELTA_INDEX, delta.DELTA_STATE]
+
+
+def test_write_deltas_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta, "DELTA_HISTORY", 2)
+    for max_zoom in range(10, 14):
+        index = build(tmp_path, [get_source("A", max_zoom=max_zoom)], "2024-01-01")
+        # The compressed siblings written by --compress
+        for entry in index["deltas"]:
+            (tmp_path / "deltas" / f"{entry['path']}.gz").write_bytes(b"")
+    assert len(index["deltas"]) == 2
+    files = {path.name for path in (tmp_path / "deltas").iterdir()}
+    paths = {entry["path"] for entry in index["deltas"]}
+    assert files == {delta.DELTA_INDEX, delta.DELTA_STATE} | paths | {f"{path}.gz" for path in paths}
+
+
+def test_apply_delta_wrong_version(tmp_path):
+    build(tmp_path, [get_source("A")], "2024-01-01")
+    old = read_geojson(tmp_path)
+    index = build(tmp_path, [get_source("A"), get_source("B")], "2024-01-02")
+    entry = index["deltas"][0]
+    with pytest.raises(ValueError):
+        delta.apply_delta(old + b" ", jsonio.load(str(tmp_path / "deltas" / entry["path"])))
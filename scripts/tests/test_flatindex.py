@@ -0,0 +1,97 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+from conftest import get_source, get_square
+from libeli import artifacts, flatindex
+from libeli.flatindex import FlatIndex
+from shapely.geometry import shape
+
+
+def test_encode_geometry():
+    # The sides of 0.5 degrees do not fit into int16 deltas
+    bbox, data = flatindex.encode_geometry({"type": "Polygon", "coordinates": [get_square(10.0, 50.0, 0.5)]})
+    assert bbox == (1000000, 5000000, 1050000, 5050000)
+    assert data[1] == 4
+    assert len(data) == 8 + 4 + 4 + 2 * 4 + 4 * 2 * 4
+    # The first position is stored on its own, so only the deltas need to fit
+    bbox, data = flatindex.encode_geometry({"type": "Polygon", "coordinates": [get_square(10.0, 50.0, 0.1)]})
+    assert data[1] == 2
+    assert len(data) == 8 + 4 + 4 + 2 * 4 + 4 * 2 * 2
+
+
+def test_flat_index_small_geometry(tmp_path):
+    source = get_source("small", [[13.1, 52.3], [13.4, 52.3], [13.45678, 52.6], [13.2, 52.55], [13.1, 52.3]])
+    assert flatindex.encode_geometry(source["geometry"])[1][1] == 2
+    path = str(tmp_path / flatindex.FLAT_INDEX_FILENAME)
+    flatindex.write_flat_index(path, [artifacts.render_fragments(source)], "2024-01-01 00:00:00", jobs=1)
+    with FlatIndex(path) as index:
+        assert index.feature(0) == source
+
+
+def test_hilbert():
+    x, y = np.meshgrid(np.arange(4), np.arange(4))
+    d = flatindex.hilbert(x.ravel(), y.ravel())
+    assert sorted(d) == list(range(16))
+    cells = np.stack([x.ravel(), y.ravel()], axis=1)[np.argsort(d)]
+    # Consecutive cells on the curve are neighbours
+    assert np.all(np.abs(np.diff(cells, axis=0)).sum(axis=1) == 1)
+
+
+def test_pack_tree():
+    bboxes = np.array([[i, i, i + 1, i + 1] for i in range(40)])
+    nodes = flatindex.pack_tree(bboxes)
+    # 40 leaves, 3 nodes and the root
+    assert len(nodes) == 44
+    assert nodes["index"][40:].tolist() == [0, 16, 32, 40]
+    assert nodes["bbox"][43].tolist() == [0, 0, 40, 40]
+    assert nodes["bbox"][42].tolist() == [32, 32, 40, 40]
+
+
+def get_sources() -> List[Dict[str, Any]]:
+    sources = [
+        get_source(f"grid{i}", get_square(-170.0 + 17 * (i % 20), -80.0 + 8 * (i // 20), 1.5), max_zoom=i % 20)
+        for i in range(400)
+    ]
+    multi = get_source("multi")
+    multi["geometry"] = {
+        "type": "MultiPolygon",
+        "coordinates": [
+            [get_square(8.0, 48.0, 1.0), get_square(8.25, 48.25, 0.5)[::-1]],
+            [get_square(12.12345, 51.0, 0.00001)],
+        ],
+    }
+    return sources[:200] + [get_source("world", attribution={"text": "World"}), multi] + sources[200:]
+
+
+@pytest.fixture
+def index(tmp_path):
+    sources = get_sources()
+    path = tmp_path / flatindex.FLAT_INDEX_FILENAME
+    fragments = [artifacts.render_fragments(source) for source in sources]
+    flatindex.write_flat_index(str(path), fragments, "2024-01-01 00:00:00", jobs=1)
+    with FlatIndex(str(path)) as index:
+        yield index
+
+
+def test_flat_index(index):
+    sources = get_sources()
+    assert len(index) == len(sources)
+    assert index.meta == {"format_version": artifacts.GEOJSON_FORMAT_VERSION, "generated": "2024-01-01 00:00:00"}
+    assert index.columns == ["attribution", "id", "max_zoom", "name", "type", "url"]
+    assert index.in_bbox(-180.0, -90.0, 180.0, 90.0) == sources
+    assert [feature["properties"]["id"] for feature in index.in_bbox(8.1, 48.1, 8.2, 48.2)] == ["world", "multi"]
+    assert [feature["properties"]["id"] for feature in index.in_bbox(12.1, 51.0, 12.2, 51.1)] == ["world", "multi"]
+
+
+def test_flat_index_search(index):
+    west, south, east, north = -20.0, -10.0, 40.0, 5.0
+    expected = []
+    for source in get_sources():
+        if source["geometry"] is not None:
+            minx, miny, maxx, maxy = shape(source["geometry"]).bounds
+            if minx > east or maxx < west or miny > north or maxy < south:
+                continue
+        expected.append(source["properties"]["id"])
+    assert len(expected) == 9
+    assert [feature["properties"]["id"] for feature in index.in_bbox(west, south, east, north)] == expected
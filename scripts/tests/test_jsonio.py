@@ -0,0 +1,87 @@
+import io
+import json
+
+import pytest
+from libeli import jsonio
+
+
+@pytest.fixture(params=["orjson", "json"])
+def json_backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(jsonio, "orjson", None)
+    return request.param
+
+
+def test_backend(json_backend):
+    assert jsonio.backend() == json_backend
+
+
+def test_loads(json_backend):
+    data = '{"a": [1.123456, 2, "1.123456"], "b": {"c": -0.000004}}'
+    assert jsonio.loads(data) == {"a": [1.123456, 2, "1.123456"], "b": {"c": -0.000004}}
+    assert jsonio.loads(data, rounded=True) == {"a": [1.12346, 2, "1.123456"], "b": {"c": -0.0}}
+    assert jsonio.loads(data.encode("utf-8"), rounded=True) == jsonio.loads(data, rounded=True)
+
+
+def test_loads_unique_keys(json_backend):
+    data = '{"a": 1, "b": {"c": 1, "c": 2}}'
+    assert jsonio.loads(data) == {"a": 1, "b": {"c": 2}}
+    with pytest.raises(jsonio.DuplicateKeyError, match="duplicate key: 'c'"):
+        jsonio.loads(data, unique_keys=True)
+    assert jsonio.loads('{"a": 1.123456}', rounded=True, unique_keys=True) == {"a": 1.12346}
+
+
+def test_loads_without_coordinates(json_backend):
+    source = {
+        "type": "Feature",
+        "properties": {"id": "a", "name": "[1, 2]"},
+        "geometry": {"type": "Polygon", "coordinates": [[[1.5, -2e-05], [3, 4], [1.5, -2e-05]]]},
+    }
+    data = json.dumps(source, indent=4).encode("utf-8")
+    parsed, coordinates = jsonio.loads_without_coordinates(data)
+    assert parsed["properties"] == source["properties"]
+    assert parsed["geometry"] == {"type": "Polygon", "coordinates": None}
+    assert coordinates.decode() == source["geometry"]["coordinates"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        # No geometry
+        b'{"properties": {"id": "a"}, "geometry": null}',
+        # "coordinates" occurs more than once
+        b'{"properties": {"coordinates": "a"}, "geometry": {"coordinates": [[[0, 0]]]}}',
+        # Not an array of numbers
+        b'{"properties": {"id": "a"}, "geometry": {"coordinates": [[["0", 0]]]}}',
+        # "coordinates" is not a member of the geometry
+        b'{"properties": {"coordinates": [1]}, "geometry": null}',
+    ],
+)
+def test_loads_without_coordinates_fallback(json_backend, data):
+    assert jsonio.loads_without_coordinates(data) == (jsonio.loads(data), None)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"b": [1e-05, -3e-05, 0.0001, 1.00001], "a": {"é": 1, "z": "\x7f\x1f 😀"}},
+        [1e16, 1.5e16, 1e-07, 1e22, -0.0, 123456789012345.6],
+        {"url": "https://example.com/3e4/0.00001", "id": 2**70},
+        1e-05,
+        {1: "non-string key"},
+        {"a": [float("nan"), float("inf"), -float("inf")], "b": (0.5, 2e-4)},
+    ],
+)
+def test_dumps(json_backend, obj):
+    expected = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    assert jsonio.dumps(obj) == expected
+    expected = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    assert jsonio.dumps(obj, sort_keys=False) == expected
+
+
+def test_dump_source():
+    f = io.StringIO()
+    jsonio.dump_source({"b": "é", "a": [1]}, f)
+    assert f.getvalue() == '{\n    "b": "é",\n    "a": [\n        1\n    ]\n}\n'
@@ -0,0 +1,80 @@
+import json
+
+from libeli import artifacts, localize
+
+
+def get_source(source_id, i18n=True):
+    properties = {
+        "id": source_id,
+        "name": f"{source_id} aerial imagery",
+        "type": "tms",
+        "url": "https://example.com/{zoom}/{x}/{y}",
+        "i18n": i18n,
+        "attribution": {"text": "Example", "required": True},
+    }
+    geometry = {"type": "Polygon", "coordinates": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]}
+    return {"type": "Feature", "properties": properties, "geometry": geometry}
+
+
+def write_translations(path, language, imagery):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({language: {"imagery": imagery}}, f, ensure_ascii=False)
+
+
+def test_localize_properties():
+    properties = get_source("a")["properties"]
+    localized = localize.localize_properties(
+        properties, {"name": "a Luftbild", "description": "Beschreibung", "attribution": {"text": "Beispiel"}}
+    )
+    assert localized == dict(properties, name="a Luftbild", attribution={"text": "Beispiel", "required": True})
+    assert properties["name"] == "a aerial imagery"
+    assert localize.localize_properties(properties, {"name": "", "attribution": None}) is None
+    assert localize.localize_properties(properties, {"name": "a aerial imagery"}) is None
+
+
+def test_write_localized(tmp_path):
+    translations = tmp_path / "i18n"
+    translations.mkdir()
+    write_translations(translations / "en.yaml", "en", {})
+    write_translations(translations / "de.yaml", "de", {"a": {"name": "a Luftbild"}, "c": {"name": "c Luftbild"}})
+    write_translations(translations / "fr.yaml", "fr", {"b": {"attribution": {"text": "Exemple"}}})
+    outdir = tmp_path / "localized"
+    state = str(tmp_path / "state.json")
+    sources = [get_source("a"), get_source("b"), get_source("c", i18n=False)]
+    fragments = [artifacts.render_fragments(source) for source in sources]
+
+    def build(fragments):
+        return localize.write_localized(str(outdir), str(translations), fragments, "2020-01-01 00:00:00", 1, state)
+
+    index, rendered = build(fragments)
+    assert rendered == ["de", "fr"]
+    assert index["languages"]["de"]["sources"] == 1
+    with open(outdir / "de.json", encoding="utf-8") as f:
+        de = json.load(f)
+    assert de == {
+        "format_version": "1.0",
+        "language": "de",
+        "sources": {"a": dict(sources[0]["properties"], name="a Luftbild")},
+    }
+    with open(outdir / localize.LOCALIZED_INDEX) as f:
+        assert json.load(f) == index
+
+    # Nothing changed
+    assert build(fragments)[1] == []
+
+    # Only the languages translating a changed source are rendered again
+    sources[1]["properties"]["url"] = "https://example.org/{zoom}/{x}/{y}"
+    fragments[1] = artifacts.render_fragments(sources[1])
+    assert build(fragments)[1] == ["fr"]
+
+    # Sources which enable i18n are picked up without a change of the translations
+    fragments[2] = artifacts.render_fragments(get_source("c"))
+    assert build(fragments)[1] == ["de"]
+
+    # Languages without translation file are removed, with their compressed siblings
+    (outdir / "fr.json.gz").write_bytes(b"")
+    (translations / "fr.yaml").unlink()
+    index, rendered = build(fragments)
+    assert list(index["languages"]) == ["de"]
+    assert not (outdir / "fr.json").exists()
+    assert not (outdir / "fr.json.gz").exists()
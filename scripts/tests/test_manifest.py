@@ -0,0 +1,68 @@
+import json
+import os
+
+from libeli.manifest import BuildManifest
+
+
+def write_source(path: str, source_id: str, name: str) -> None:
+    source = {
+        "type": "Feature",
+        "properties": {"id": source_id, "name": name, "type": "tms", "url": "https://example.com/{zoom}/{x}/{y}"},
+        "geometry": None,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+
+
+def test_manifest_update(tmp_path):
+    paths = [str(tmp_path / f"{i}.geojson") for i in range(3)]
+    for i, path in enumerate(paths):
+        write_source(path, str(i), f"Source {i}")
+    manifest_path = str(tmp_path / "build" / "manifest.sqlite")
+
+    manifest = BuildManifest(manifest_path)
+    update = manifest.update(paths)
+    assert update.added == paths
+    assert update.unchanged == 0
+    manifest.save()
+    assert os.path.exists(manifest_path)
+
+    # Only changed, added and removed sources are serialized again
+    write_source(paths[1], "1", "Renamed")
+    os.utime(paths[2], ns=(0, 0))
+    new_path = str(tmp_path / "3.geojson")
+    write_source(new_path, "3", "Source 3")
+    new_paths = paths[1:] + [new_path]
+
+    manifest = BuildManifest(manifest_path)
+    update = manifest.update(new_paths)
+    assert update.added == [new_path]
+    assert update.changed == [paths[1]]
+    assert update.removed == [paths[0]]
+    assert update.unchanged == 1
+    fragments = manifest.fragments(new_paths)
+    assert '"name":"Renamed"' in fragments[0].geojson
+    assert [json.loads(fragment.json)["id"] for fragment in fragments] == ["1", "2", "3"]
+
+    # Saving writes only the modified rows, the manifest is complete when loaded again
+    manifest.save()
+    manifest = BuildManifest(manifest_path)
+    assert sorted(manifest.entries) == sorted(new_paths)
+    assert manifest.entries[paths[2]].mtime_ns == 0
+    assert '"name":"Renamed"' in manifest.entries[paths[1]].fragments.geojson
+    update = manifest.update(new_paths)
+    assert update.unchanged == 3
+
+
+def test_manifest_invalid_file(tmp_path):
+    manifest_path = tmp_path / "manifest.sqlite"
+    manifest_path.write_text("{")
+    manifest = BuildManifest(str(manifest_path))
+    assert manifest.entries == {}
+
+    # The invalid file is replaced
+    path = str(tmp_path / "0.geojson")
+    write_source(path, "0", "Source 0")
+    manifest.update([path])
+    manifest.save()
+    assert list(BuildManifest(str(manifest_path)).entries) == [path]
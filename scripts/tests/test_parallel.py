@@ -0,0 +1,19 @@
+import pytest
+from libeli.parallel import process_imap, process_map
+
+
+@pytest.mark.parametrize("jobs", [None, 1, 2, 4])
+def test_process_map_keeps_order(jobs):
+    items = list(range(-100, 100))
+    assert process_map(abs, items, jobs) == [abs(i) for i in items]
+
+
+def test_process_map_empty():
+    assert process_map(abs, [], 4) == []
+
+
+def test_process_imap_keeps_order():
+    items = list(range(-1000, 1000))
+    results = process_imap(abs, items, 3)
+    assert next(results) == 1000
+    assert list(results) == [abs(i) for i in items[1:]]
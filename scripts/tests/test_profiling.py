@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from libeli.artifacts import profile_source_file, render_source_file
+from libeli.manifest import BuildManifest
+from libeli.profiling import (
+    Profile,
+    SourceProfile,
+    StageTimer,
+    count_vertices,
+    summary,
+    timed,
+)
+
+
+def write_source(path, geometry=None):
+    source = {
+        "type": "Feature",
+        "properties": {"id": "a", "name": "A", "type": "tms", "url": "https://example.com/{zoom}/{x}/{y}"},
+        "geometry": geometry,
+    }
+    path.write_text(json.dumps(source), encoding="utf-8")
+
+
+def test_stage_timer():
+    timer = StageTimer()
+    with timer.stage("a"):
+        pass
+    with timer.stage("a"), timed(timer, "b"):
+        pass
+    with timed(None, "c"):
+        pass
+    assert sorted(timer.stages) == ["a", "b"]
+    assert timer.stages["a"] >= timer.stages["b"] >= 0
+
+
+def test_count_vertices():
+    square = [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]
+    assert count_vertices({"type": "Polygon", "coordinates": [square, square]}) == 10
+    assert count_vertices({"type": "MultiPolygon", "coordinates": [[square], [square]]}) == 10
+    assert count_vertices(None) == 0
+    assert count_vertices({"type": "Point", "coordinates": [0, 0]}) == 0
+
+
+def test_profile_report(tmp_path):
+    profile = Profile()
+    with profile.stage("render"):
+        profile.add_source(SourceProfile("small.geojson", 5, {"decode": 0.1, "xml": 0.2}))
+        profile.add_source(SourceProfile("large.geojson", 500, {"decode": 0.05, "xml": 0.1}))
+        profile.add_source(SourceProfile("slow.geojson", 50, {"decode": 1.0}))
+    report = profile.report(top=2)
+    assert list(report["stages"]) == ["render"]
+    assert report["sources"] == 3
+    assert report["source_stages"] == pytest.approx({"decode": 1.15, "xml": 0.3})
+    assert [source["path"] for source in report["slowest_sources"]] == ["slow.geojson", "small.geojson"]
+    assert [source["path"] for source in report["largest_sources"]] == ["large.geojson", "slow.geojson"]
+
+    text = profile.write(str(tmp_path / "profile.json"))
+    assert json.loads((tmp_path / "profile.json").read_text())["sources"] == 3
+    assert "slow.geojson (decode 1.000s)" in text
+    assert summary(report, top=1).count(".geojson") == 2
+
+
+def test_profile_source_file(tmp_path):
+    path = tmp_path / "a.geojson"
+    write_source(path, {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]})
+    fragments, source_profile = profile_source_file(str(path))
+    assert fragments == render_source_file(str(path))
+    assert source_profile.vertices == 4
+    stages = {"decode", "quantize", "geojson", "legacy_json", "xml", "i18n", "shape", "simplify", "tiles"}
+    assert set(source_profile.stages) == stages
+
+    # Only the rendered sources are profiled, the fragments are the same as without profile
+    manifest = BuildManifest(None)
+    profile = Profile()
+    manifest.update([str(path)], jobs=1, profile=profile)
+    assert [source.path for source in profile.sources] == [str(path)]
+    assert list(profile.timer.stages) == ["scan", "render"]
+    assert manifest.fragments([str(path)]) == [fragments]
+    manifest.update([str(path)], jobs=1, profile=profile)
+    assert len(profile.sources) == 1
@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import subprocess
+from datetime import datetime
+
+from libeli import publish
+
+
+def test_sources_timestamp_source_date_epoch(monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1577836800")
+    assert publish.sources_timestamp([]) == datetime(2020, 1, 1)
+
+
+def test_sources_timestamp_untracked(tmp_path, monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    path = tmp_path / "source.geojson"
+    path.write_text("{}")
+    os.utime(path, (1577836800, 1577836800))
+    assert publish.sources_timestamp([str(path)]) == datetime(2020, 1, 1)
+
+
+def commit(date: str) -> None:
+    env = dict(os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    for args in [
+        ["add", "-A"],
+        ["-c", "user.name=Test", "-c", "user.email=test@example.com", "commit", "-qm", date],
+    ]:
+        subprocess.run(["git"] + args, check=True, env=env)
+
+
+def test_sources_timestamp_deleted_source(tmp_path, monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    for name in ["a.geojson", "b.geojson"]:
+        (sources / name).write_text("{}")
+
+    subprocess.run(["git", "init", "-q"], check=True)
+    commit("2020-01-01T00:00:00Z")
+    (sources / "b.geojson").unlink()
+    commit("2021-01-01T00:00:00Z")
+    # Deleting a source is a change of the sources
+    assert publish.sources_timestamp([os.path.join("sources", "a.geojson")]) == datetime(2021, 1, 1)
+
+
+def test_sources_timestamp_uncommitted_source(tmp_path, monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "scripts").mkdir()
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    (sources / "a.geojson").write_text("{}")
+    subprocess.run(["git", "init", "-q"], check=True)
+    commit("2020-01-01T00:00:00Z")
+
+    (sources / "a.geojson").write_text("[]")
+    os.utime(sources / "a.geojson", (1609459200, 1609459200))
+    # git reports the paths relative to the repository root, not to the working directory
+    monkeypatch.chdir(tmp_path / "scripts")
+    assert publish.sources_timestamp([os.path.join("..", "sources", "a.geojson")]) == datetime(2021, 1, 1)
+
+
+def test_content_hash():
+    hashes = ["00" * 32, "ff" * 32]
+    assert publish.content_hash(hashes) == publish.content_hash(list(hashes))
+    assert publish.content_hash(hashes) != publish.content_hash(hashes[::-1])
+
+
+def test_publish(tmp_path):
+    data = b'{"type":"FeatureCollection"}\n' * 100
+    (tmp_path / "imagery.geojson").write_bytes(data)
+
+    manifest = publish.publish(str(tmp_path), ["imagery.geojson"], "2020-01-01 00:00:00", "00" * 32, jobs=1)
+    entry = manifest["artifacts"]["imagery.geojson"]
+    assert entry["size"] == len(data)
+    compressed = (tmp_path / "imagery.geojson.gz").read_bytes()
+    assert gzip.decompress(compressed) == data
+    assert entry["gz"]["size"] == len(compressed)
+    with open(tmp_path / publish.ARTIFACT_MANIFEST) as f:
+        assert json.load(f) == manifest
+
+    # Unchanged artifacts are not compressed again
+    os.utime(tmp_path / "imagery.geojson.gz", ns=(0, 0))
+    assert publish.publish(str(tmp_path), ["imagery.geojson"], "2020-01-01 00:00:00", "00" * 32, jobs=1) == manifest
+    assert os.stat(tmp_path / "imagery.geojson.gz").st_mtime_ns == 0
+
+    # Equal artifacts compress to equal bytes
+    (tmp_path / "imagery.geojson").write_bytes(data + b"\n")
+    publish.publish(str(tmp_path), ["imagery.geojson"], "2020-01-01 00:00:00", "00" * 32, jobs=1)
+    (tmp_path / "imagery.geojson").write_bytes(data)
+    publish.publish(str(tmp_path), ["imagery.geojson"], "2020-01-01 00:00:00", "00" * 32, jobs=1)
+    assert (tmp_path / "imagery.geojson.gz").read_bytes() == compressed
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+from libeli.quantize import (
+    quantize_geometry,
+    quantize_rings,
+    quantize_source,
+    round_coordinates,
+)
+
+
+def test_round_coordinates():
+    rng = random.Random(0)
+    values = [rng.uniform(-180, 180) for _ in range(10000)]
+    # Decimal ties, which are mostly not exact ties in binary
+    values += [n / 1e6 for n in range(-1000005, 1000005, 10)][:10000]
+    values += [0.000005, -0.000005, 2.675, 1.000015, 0.0, -0.0, 1e20, float("inf")]
+    rounded = round_coordinates(np.array(values))
+    expected = [round(value, 5) for value in values]
+    assert rounded.tolist() == expected
+    assert [str(value) for value in rounded.tolist()] == [str(value) for value in expected]
+
+
+def test_quantize_rings():
+    ring = [[0.0, 0.0], [1.000001, 0.0], [1.0, 0.000004], [1.0, 1.0], [0, 1.123456], [0.0, 0.0]]
+    assert quantize_rings([ring]) == [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0, 1.12346], [0.0, 0.0]]]
+    assert type(quantize_rings([ring])[0][3][0]) is int
+
+    # Rings left with less than 4 positions keep their duplicates
+    tiny = [[0.0, 0.0], [0.000001, 0.0], [0.0, 0.000001], [0.0, 0.0]]
+    assert quantize_rings([tiny]) == [[[0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.0, 0.0]]]
+
+    # Duplicates which are already in the ring are kept
+    duplicate = [[0.0, 0.0], [0.0, 0.0], [1.0, 0.0], [1.000001, 0.0], [1.0, 1.0], [0.0, 0.0]]
+    assert quantize_rings([duplicate]) == [[[0.0, 0.0], [0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]
+
+    # Integer only and three dimensional positions
+    assert quantize_rings([[[0, 0], [0, 0], [1, 0], [1, 1], [0, 0]]]) == [[[0, 0], [0, 0], [1, 0], [1, 1], [0, 0]]]
+    assert quantize_rings([[[0.123456, 0, 2.000001]]]) == [[[0.12346, 0, 2.0]]]
+    assert quantize_rings([]) == []
+
+
+def test_quantize_geometry():
+    square = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+    geometry = {"type": "MultiPolygon", "coordinates": [[square, square], [[[2.0, 2.0]] + square]]}
+    assert quantize_geometry(geometry) == {
+        "type": "MultiPolygon",
+        "coordinates": [[square, square], [[[2.0, 2.0]] + square]],
+    }
+    assert quantize_geometry({"type": "Point", "coordinates": [0.123456, 1.0]}) == {
+        "type": "Point",
+        "coordinates": [0.12346, 1.0],
+    }
+
+
+def test_quantize_source():
+    source = {
+        "type": "Feature",
+        "properties": {"id": "test", "extent": 1.123456},
+        "geometry": {"type": "Polygon", "coordinates": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]},
+    }
+    quantized = quantize_source(source)
+    assert quantized["properties"] == {"id": "test", "extent": 1.12346}
+    assert quantized["geometry"] == source["geometry"]
+    assert quantize_source({"type": "Feature", "geometry": None}) == {"type": "Feature", "geometry": None}
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List
+
+from conftest import get_source
+from libeli.query import SourceIndex
+
+
+def ids(sources: List[Dict[str, Any]]) -> List[str]:
+    return [source["properties"]["id"] for source in sources]
+
+
+def get_index() -> SourceIndex:
+    square = [[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0], [0.0, 0.0]]
+    triangle = [[0.0, 0.0], [10.0, 0.0], [0.0, 10.0], [0.0, 0.0]]
+    return SourceIndex(
+        [
+            get_source("square", square, max_zoom=18),
+            get_source("world"),
+            get_source("triangle", triangle, min_zoom=10, type="wms"),
+            get_source("overlay", square, overlay=True),
+        ]
+    )
+
+
+def test_at_point():
+    index = get_index()
+    assert len(index) == 4
+    assert ids(index.at_point(2, 2)) == ["square", "world", "triangle", "overlay"]
+    # Within the bbox of the triangle, but not the triangle itself
+    assert ids(index.at_point(9, 9)) == ["square", "world", "overlay"]
+    assert ids(index.at_point(20, 20)) == ["world"]
+
+
+def test_at_point_filters():
+    index = get_index()
+    assert ids(index.at_point(2, 2, zoom=5)) == ["square", "world", "overlay"]
+    assert ids(index.at_point(2, 2, zoom=19)) == ["world", "triangle", "overlay"]
+    assert ids(index.at_point(2, 2, overlay=True)) == ["overlay"]
+    assert ids(index.at_point(2, 2, overlay=False, types=["wms"])) == ["triangle"]
+    # A single type is not split into its characters
+    assert ids(index.at_point(2, 2, types="wms")) == ["triangle"]
+
+
+def test_in_bbox():
+    index = get_index()
+    assert ids(index.in_bbox(8, 8, 12, 12)) == ["square", "world", "overlay"]
+    assert ids(index.in_bbox(-5, -5, 1, 1, zoom=12)) == ["square", "world", "triangle", "overlay"]
+    assert ids(index.in_bbox(20, 20, 30, 30)) == ["world"]
+
+
+def test_empty_index():
+    index = SourceIndex([])
+    assert index.at_point(0, 0) == []
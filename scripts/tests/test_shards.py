@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from conftest import get_source
+from libeli import artifacts, shards
+
+
+@pytest.mark.parametrize(
+    "path,expected_key",
+    [
+        ("sources/world/Bing.geojson", "world"),
+        ("sources/europe/de/Foo.geojson", "europe/de"),
+        ("sources/europe/de/by/Foo.geojson", "europe/de"),
+        ("sources/europe/Nordicsnowmobileoverlay.geojson", "europe"),
+        ("sources/antarctica/Foo.geojson", "antarctica"),
+        ("../../sources/asia/jp/Foo.geojson", "asia/jp"),
+        ("private/north-america/us/Foo.geojson", "north-america/us"),
+        ("Foo.geojson", "world"),
+    ],
+)
+def test_shard_key(path, expected_key):
+    assert shards.shard_key(path) == expected_key
+
+
+def test_write_shards(tmp_path):
+    paths = [
+        "sources/europe/de/A.geojson",
+        "sources/europe/de/B.geojson",
+        "sources/europe/fr/C.geojson",
+        "sources/world/D.geojson",
+    ]
+    sources = [
+        get_source("a", [[6.0, 48.0], [8.0, 48.0], [8.0, 50.0], [6.0, 48.0]], country_code="DE"),
+        get_source("b", [[10.0, 47.0], [12.0, 47.0], [12.0, 52.0], [10.0, 47.0]], country_code="DE"),
+        get_source("c", [[0.0, 45.0], [1.0, 45.0], [1.0, 46.0], [0.0, 45.0]], country_code="FR"),
+        get_source("d"),
+    ]
+    fragments = [artifacts.render_fragments(source) for source in sources]
+    index = shards.write_shards(str(tmp_path), paths, fragments, "2020-01-01 00:00:00")
+
+    assert list(index["shards"]) == ["europe/de", "europe/fr", "world"]
+    de = index["shards"]["europe/de"]
+    assert de["bbox"] == [6.0, 47.0, 12.0, 52.0]
+    assert de["country_codes"] == ["DE"]
+    assert de["sources"] == 2
+    assert index["shards"]["world"]["bbox"] == shards.WORLD_BBOX
+
+    with open(tmp_path / "europe" / "de.geojson") as f:
+        collection = json.load(f)
+    assert collection["features"] == sources[:2]
+    assert collection["meta"]["shard"] == "europe/de"
+    with open(tmp_path / shards.SHARD_INDEX) as f:
+        assert json.load(f) == index
+
+    # Shards without sources are removed, with their compressed siblings
+    (tmp_path / "europe" / "fr.geojson.gz").write_bytes(b"")
+    (tmp_path / "europe" / "fr.geojson.br").write_bytes(b"")
+    shards.write_shards(str(tmp_path), paths[:2], fragments[:2], "2020-01-01 00:00:00")
+    assert not (tmp_path / "europe" / "fr.geojson").exists()
+    assert not (tmp_path / "europe" / "fr.geojson.gz").exists()
+    assert not (tmp_path / "europe" / "fr.geojson.br").exists()
+    assert (tmp_path / "europe" / "de.geojson").exists()
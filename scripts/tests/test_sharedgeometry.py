@@ -0,0 +1,46 @@
+import io
+
+from conftest import get_source
+from libeli import artifacts, jsonio, sharedgeometry
+from shapely.geometry import shape
+
+SQUARE = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+# The same square, starting at another vertex and clockwise
+SQUARE_CLOCKWISE = [[1.0, 1.0], [1.0, 0.0], [0.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+OTHER_SQUARE = [[2.0, 0.0], [3.0, 0.0], [3.0, 1.0], [2.0, 1.0], [2.0, 0.0]]
+
+
+def test_geometry_hash():
+    square = artifacts.geometry_hash(shape(get_source("A", SQUARE)["geometry"]))
+    assert artifacts.geometry_hash(shape(get_source("A", SQUARE_CLOCKWISE)["geometry"])) == square
+    assert artifacts.geometry_hash(shape(get_source("A", OTHER_SQUARE)["geometry"])) != square
+    assert artifacts.render_fragments(get_source("A", SQUARE)).geometry_hash == square
+    assert artifacts.render_fragments(get_source("A")).geometry_hash is None
+
+
+def test_write_shared_geojson():
+    sources = [
+        get_source("A2020", SQUARE),
+        get_source("World"),
+        get_source("B", OTHER_SQUARE),
+        get_source("A2021", SQUARE_CLOCKWISE),
+    ]
+    f = io.StringIO()
+    stats = sharedgeometry.write_shared_geojson([artifacts.render_fragments(s) for s in sources], f, "2024-01-01")
+    assert stats == {"features": 4, "geometries": 2}
+
+    collection = jsonio.loads(f.getvalue())
+    assert collection["meta"]["fallback"] == "imagery.geojson"
+    assert [feature.get("geometry_ref") for feature in collection["features"]] == [0, None, 1, 0]
+    assert all(feature["geometry"] is None for feature in collection["features"])
+    assert collection["geometries"][0]["coordinates"] == [SQUARE]
+
+    resolved = sharedgeometry.resolve_geometries(collection)
+    assert resolved["meta"] == artifacts.geojson_collection([], "2024-01-01")["meta"]
+    for feature, source in zip(resolved["features"], sources):
+        assert feature["properties"] == source["properties"]
+        assert "geometry_ref" not in feature
+        if source["geometry"] is None:
+            assert feature["geometry"] is None
+        else:
+            assert shape(feature["geometry"]).equals(shape(source["geometry"]))
@@ -0,0 +1,84 @@
+import math
+from typing import List
+
+import pytest
+from conftest import get_source
+from libeli.simplify import (
+    fit_ring,
+    max_deviation,
+    simplified_filenames,
+    simplify_source,
+    zoom_tolerance,
+)
+from shapely.geometry import Polygon
+
+
+def get_circle(n: int) -> List[List[float]]:
+    ring = [[round(math.cos(2 * math.pi * i / n), 5), round(math.sin(2 * math.pi * i / n), 5)] for i in range(n)]
+    return ring + [ring[0]]
+
+
+def test_zoom_tolerance() -> None:
+    assert zoom_tolerance(0) == 360.0 / 256
+    assert zoom_tolerance(8) == zoom_tolerance(0) / 256
+
+
+def test_simplify_source() -> None:
+    source = get_source("test", get_circle(1000))
+    simplified = simplify_source(source, 4)
+    ring = simplified["geometry"]["coordinates"][0]
+    assert 4 <= len(ring) < 1000
+    assert simplified["simplification"]["zoom"] == 4
+    assert 0 < simplified["simplification"]["max_deviation"] <= zoom_tolerance(4)
+    assert simplified["properties"] == source["properties"]
+    # The source itself is left untouched
+    assert len(source["geometry"]["coordinates"][0]) == 1001
+    assert "simplification" not in source
+
+    # Higher zoom levels keep more vertices
+    assert len(simplify_source(source, 12)["geometry"]["coordinates"][0]) > len(ring)
+
+
+def test_simplify_source_unchanged() -> None:
+    square = [[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0], [0.0, 0.0]]
+    simplified = simplify_source(get_source("test", square), 4)
+    assert simplified["geometry"] == get_source("test", square)["geometry"]
+    assert simplified["simplification"] == {"zoom": 4, "max_deviation": 0.0}
+
+    # The deviation is measured, so a vertex barely off the edge gives a small deviation
+    almost_square = [[0.0, 0.0], [5.0, 0.001], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0], [0.0, 0.0]]
+    simplified = simplify_source(get_source("test", almost_square), 4)
+    assert len(simplified["geometry"]["coordinates"][0]) == 5
+    assert simplified["simplification"]["max_deviation"] == pytest.approx(0.001)
+
+    simplified = simplify_source(get_source("test"), 4)
+    assert simplified["geometry"] is None
+    assert simplified["simplification"] == {"zoom": 4, "max_deviation": 0.0}
+
+
+def test_max_deviation() -> None:
+    # The removed vertex is the start of the ring
+    ring = [(5.0, 0.001), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0), (0.0, 0.0), (5.0, 0.001)]
+    square = Polygon([(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)])
+    assert max_deviation(Polygon(ring), square) == pytest.approx(0.001)
+    assert max_deviation(square, square) == 0.0
+
+    # The rings do not match up, the hole is measured against the shell
+    hole = [(4.0, 4.0), (4.0, 6.0), (6.0, 6.0), (6.0, 4.0)]
+    assert max_deviation(Polygon(square.exterior.coords, [hole]), square) == pytest.approx(4.0)
+
+
+def test_simplified_filenames() -> None:
+    assert simplified_filenames([4, 12]) == ["imagery.z4.geojson", "imagery.z12.geojson"]
+
+
+def test_fit_ring() -> None:
+    ring = [tuple(point) for point in get_circle(2000)]
+    coords, deviation = fit_ring(ring, 100)
+    assert 4 < len(coords) <= 100
+    assert coords[0] == coords[-1]
+    assert set(coords) <= set(ring)
+    assert 0 < deviation < 0.01
+
+    small = ring[:50] + [ring[0]]
+    assert fit_ring(small, 100) == (small, 0.0)
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_duplicate_keys_fail(tmp_path):
+    # Duplicate keys are rejected before any request is made
+    path = tmp_path / "duplicate.geojson"
+    path.write_text(
+        '{"type": "Feature", "properties": {"id": "a", "id": "b", "name": "A", "type": "tms",'
+        ' "url": "https://example.com/{zoom}/{x}/{y}"}, "geometry": null}',
+        encoding="utf-8",
+    )
+    env = dict(os.environ, ELI_SOURCE_CACHE="")
+    result = subprocess.run(
+        [sys.executable, os.path.join("scripts", "strict_check.py"), str(path)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "duplicate key" in result.stderr
@@ -0,0 +1,30 @@
+from conftest import get_rectangle, get_source
+from libeli.tiles import geometry_tiles, index_zooms, lonlat_to_tile, source_tiles
+
+
+def test_lonlat_to_tile() -> None:
+    assert lonlat_to_tile(0.0, 0.0, 0) == (0, 0)
+    assert lonlat_to_tile(-180.0, 90.0, 4) == (0, 0)
+    assert lonlat_to_tile(180.0, -90.0, 4) == (15, 15)
+    assert lonlat_to_tile(13.4, 52.5, 12) == (2200, 1343)
+
+
+def test_geometry_tiles() -> None:
+    tiles = geometry_tiles({"type": "Polygon", "coordinates": [get_rectangle(95.0, 70.0, 175.0, 80.0)]}, [0, 1, 2, 4])
+    assert tiles[0] == [(0, 0, 0)]
+    assert tiles[1] == [(0, 1, 1)]
+    assert tiles[2] == [(0, 3, 3)]
+    assert tiles[4] == [(1, 12, 15), (2, 12, 15), (3, 12, 15)]
+
+    assert geometry_tiles(None, [2]) == {2: [(0, 0, 3), (1, 0, 3), (2, 0, 3), (3, 0, 3)]}
+
+
+def test_index_zooms() -> None:
+    assert index_zooms(get_source("a"), [0, 4, 8]) == [0, 4, 8]
+    assert index_zooms(get_source("a", min_zoom=5, max_zoom=7), [0, 4, 8]) == [4]
+    assert index_zooms(get_source("a", min_zoom=4, max_zoom=19), [0, 4, 8]) == [4, 8]
+
+
+def test_source_tiles() -> None:
+    source = get_source("a", get_rectangle(95.0, 70.0, 175.0, 80.0), min_zoom=1, max_zoom=3)
+    assert source_tiles(source, [0, 2, 4]) == {"0": [[0, 0, 0]], "2": [[0, 3, 3]]}
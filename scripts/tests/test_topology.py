@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional
+
+import pytest
+from conftest import get_source
+from libeli import artifacts, topology
+
+
+def get_feature(source_id: str, geometry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return dict(get_source(source_id), geometry=geometry)
+
+
+def get_polygon(*rings: List[List[float]]) -> Dict[str, Any]:
+    return {"type": "Polygon", "coordinates": list(rings)}
+
+
+# Two neighbouring counties sharing the border from 1.0/0.0 to 1.0/1.0 via 1.0/0.5
+WEST = [[0.0, 0.0], [1.0, 0.0], [1.0, 0.5], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+EAST = [[1.0, 1.0], [1.0, 0.5], [1.0, 0.0], [2.0, 0.0], [2.0, 1.0], [1.0, 1.0]]
+HOLE = [[0.25, 0.25], [0.25, 0.75], [0.75, 0.75], [0.75, 0.25], [0.25, 0.25]]
+
+
+def build(sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return topology.build_topology([artifacts.render_fragments(source) for source in sources], "2024-01-01")
+
+
+def test_build_topology_shares_borders():
+    sources = [get_feature("West", get_polygon(WEST)), get_feature("East", get_polygon(EAST))]
+    topo = build(sources)
+
+    assert topo["type"] == "Topology"
+    assert topo["transform"] == {"scale": [1e-5, 1e-5], "translate": [0.0, 0.0]}
+    west, east = topo["objects"][topology.TOPOLOGY_OBJECT]["geometries"]
+    assert (west["id"], east["id"]) == ("West", "East")
+    # The border is a single arc, referenced reversed by East
+    border = set(west["arcs"][0]) & {~reference for reference in east["arcs"][0]}
+    assert len(border) == 1
+    assert len(topo["arcs"][border.pop()]) == 3
+    # Both rings are cut where they start and at the ends of the border
+    assert len(topo["arcs"]) == 4
+
+
+def test_build_topology_identical_rings():
+    # The same square twice, starting at another corner and running the other way
+    square = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+    shifted = [[1.0, 1.0], [1.0, 0.0], [0.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+    topo = build([get_feature("A", get_polygon(square)), get_feature("B", get_polygon(shifted))])
+    assert len(topo["arcs"]) == 2
+    assert topo["objects"][topology.TOPOLOGY_OBJECT]["geometries"][1]["arcs"] == [[~0, ~1]]
+
+
+def test_topology_roundtrip():
+    sources = [
+        get_feature("West", get_polygon(WEST, HOLE)),
+        get_feature("World"),
+        get_feature(
+            "Islands",
+            {
+                "type": "MultiPolygon",
+                "coordinates": [
+                    [EAST],
+                    [[[-10.12345, -5.5], [-9.0, -5.5], [-9.0, -4.98765], [-10.12345, -5.5]]],
+                ],
+            },
+        ),
+    ]
+    topo = topology.Topology(build(sources))
+
+    assert topo.ids == ["West", "World", "Islands"]
+    assert topo.meta == artifacts.geojson_collection([], "2024-01-01")["meta"]
+    assert topo.geometry("World") is None
+    for source in sources:
+        assert topo.feature(source["properties"]["id"]) == source
+    assert list(topo.features()) == sources
+    with pytest.raises(KeyError):
+        topo.feature("Unknown")
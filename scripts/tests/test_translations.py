@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from libeli import translations
+from libeli.translations import Translation, TranslationCatalog
+
+
+def get_languages():
+    return {
+        "de": {
+            "Bing": {"name": "Bing Luftbild", "description": "Satellitenbilder", "attribution": None},
+            "b": {"name": "", "attribution": {"text": "Beispiel"}},
+            "untranslated": {"name": ""},
+        },
+        "en": {"Bing": {"name": "Bing aerial"}, "b": {"name": "B", "attribution": {"text": "Example"}}},
+        "pt_BR": {"Bing": {"name": "Bing aéreo"}},
+        "empty": {},
+    }
+
+
+def test_encode_catalog(tmp_path):
+    path = tmp_path / "imagery.i18n.bin"
+    path.write_bytes(translations.encode_catalog(get_languages()))
+    with TranslationCatalog(str(path)) as catalog:
+        assert catalog.languages() == ["de", "empty", "en", "pt_BR"]
+        assert catalog.get("de", "Bing") == Translation("Bing Luftbild", "Satellitenbilder", None)
+        assert catalog.get("de", "b") == Translation(None, None, "Beispiel")
+        assert catalog.get("de", "untranslated") is None
+        assert catalog.get("pt_BR", "b") is None
+        assert catalog.get("empty", "Bing") is None
+        assert catalog.get("fr", "Bing") is None
+        assert catalog.get("de", "unknown") is None
+        assert catalog.name("pt_BR", "Bing") == "Bing aéreo"
+        assert catalog.name("de", "b", "B") == "B"
+
+
+def test_encode_catalog_interns_strings():
+    languages = {language: {"a": {"name": "Name"}, "b": {"name": "Name"}} for language in ["de", "fr"]}
+    data = translations.encode_catalog(languages)
+    assert data.count("Name".encode("utf-8")) == 1
+
+
+def test_write_catalog(tmp_path):
+    translations_dir = tmp_path / "i18n"
+    translations_dir.mkdir()
+    for language, imagery in get_languages().items():
+        with open(translations_dir / f"{language}.yaml", "w", encoding="utf-8") as f:
+            json.dump({language: {"imagery": imagery}}, f, ensure_ascii=False)
+    path = str(tmp_path / "imagery.i18n.bin")
+
+    assert translations.write_catalog(path, str(translations_dir), 1)
+    assert not translations.write_catalog(path, str(translations_dir), 1)
+    with TranslationCatalog(path) as catalog:
+        assert catalog.name("en", "Bing") == "Bing aerial"
+
+    (translations_dir / "empty.yaml").unlink()
+    assert translations.write_catalog(path, str(translations_dir), 1)
+    with TranslationCatalog(path) as catalog:
+        assert "empty" not in catalog.languages()
+
+
+def test_not_a_catalog(tmp_path):
+    path = tmp_path / "imagery.i18n.bin"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError, match="not a translation catalog"):
+        TranslationCatalog(str(path))
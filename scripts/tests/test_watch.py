@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+from libeli import artifacts, watch
+from libeli.checks import SourceChecker
+from libeli.manifest import BuildManifest
+from libeli.watch import SourceWatcher
+
+
+def write_source(path, source_id, name):
+    source = {
+        "type": "Feature",
+        "properties": {
+            "id": source_id,
+            "name": name,
+            "type": "tms",
+            "url": "https://example.com/{zoom}/{x}/{y}",
+            "i18n": True,
+        },
+        "geometry": None,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    # Make the change visible even on file systems with coarse mtimes
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000))
+
+
+def test_source_watcher(tmp_path):
+    sources = str(tmp_path / "sources")
+    outdir = str(tmp_path / "out")
+    paths = [os.path.join(sources, "world", f"{i}.geojson") for i in range(3)]
+    for i, path in enumerate(paths):
+        write_source(path, str(i), f"Source {i}")
+
+    watcher = SourceWatcher([sources], outdir, checker=SourceChecker({}), jobs=1)
+    update = watcher.poll()
+    assert update.changed == paths
+    assert update.errors == {}
+    assert watcher.poll() is None
+    # The artifacts are the ones build.py writes
+    fragments = artifacts.render_source_files(paths, jobs=1)
+    with open(os.path.join(outdir, "imagery.json"), encoding="utf-8") as f:
+        assert f.read() == artifacts.join_json(fragments) + "\n"
+    with open(os.path.join(outdir, "imagery.xml"), "rb") as f:
+        assert f.read() == artifacts.join_xml(fragments)
+    with open(os.path.join(outdir, "i18n", "en.yaml"), encoding="utf-8") as f:
+        assert f.read() == artifacts.join_i18n(fragments) + "\n"
+
+    # Only the changed source is rendered again, check failures are reported
+    write_source(paths[1], "0", "Renamed")
+    update = watcher.poll()
+    assert update.changed == [paths[1]]
+    assert update.manifest.changed == [paths[1]]
+    assert update.manifest.unchanged == 2
+    assert "Id 0 used multiple times" in update.errors[paths[1]]
+    with open(os.path.join(outdir, "imagery.geojson"), encoding="utf-8") as f:
+        assert "Renamed" in f.read()
+
+    # Broken sources are left out until they are fixed
+    with open(paths[2], "w", encoding="utf-8") as f:
+        f.write("{")
+    os.remove(paths[0])
+    update = watcher.poll()
+    assert update.removed == [paths[0]]
+    assert update.errors[paths[2]].startswith("Could not parse file")
+    assert update.manifest.removed == [paths[0], paths[2]]
+    write_source(paths[2], "2", "Fixed")
+    update = watcher.poll()
+    assert update.errors == {}
+    with open(os.path.join(outdir, "imagery.json"), encoding="utf-8") as f:
+        assert [source["name"] for source in json.loads(f.read())] == ["Renamed", "Fixed"]
+
+
+def test_source_watcher_saves_manifest(tmp_path, monkeypatch):
+    path = str(tmp_path / "sources" / "0.geojson")
+    write_source(path, "0", "Source 0")
+    manifest_path = str(tmp_path / "manifest.sqlite")
+    watcher = SourceWatcher([str(tmp_path / "sources")], str(tmp_path / "out"), BuildManifest(manifest_path), jobs=1)
+
+    # Rebuilds keep the manifest in memory
+    assert watcher.poll() is not None
+    assert not os.path.exists(manifest_path)
+
+    # It is saved when the watcher stops
+    def interrupt(seconds):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(watch.time, "sleep", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        watcher.run(0.2, lambda update: None)
+    assert list(BuildManifest(manifest_path).entries) == [path]
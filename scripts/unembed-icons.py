@@ -5,6 +5,7 @@ import io
 from argparse import ArgumentParser
 import colorlog
 from base64 import b64decode
+from libeli import jsonio
 
 parser = ArgumentParser(description="Checks ELI sourcen for validity and common errors")
 parser.add_argument("path", nargs="+", help="Path of files to check.")
@@ -30,7 +31,7 @@ knownIcons = {}
 
 for filename in arguments.path:
     with io.open(filename, "r", encoding="utf-8") as f:
-        source = json.load(f)
+        source = jsonio.loads(f.read())
         if "icon" in source["properties"]:
             if source["properties"]["icon"].startswith("data:image/png"):
                 iconsize = len(source["properties"]["icon"].encode("utf-8"))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""
+usage: watch.py [-h] [-o OUTDIR] [-m MANIFEST] [-j JOBS] [-i INTERVAL] [--no-check] [directory ...]
+
+Rebuilds imagery.geojson, imagery.json, imagery.xml and i18n/en.yaml whenever a
+source is added, changed or removed, until interrupted.
+
+The fragments of all sources are kept in memory, so only the changed sources are
+parsed, checked with the checks of check.py and serialized again. The artifacts are
+the same as written by build.py, except for the generated timestamp, which is the
+time of the rebuild. Errors of changed sources are reported right away. Sources which
+fail to parse are left out of the artifacts until they are fixed.
+
+With --manifest, the fragments are also kept in the manifest file, so the first
+rebuild after a restart and build.py with the same manifest are fast as well. The
+manifest is saved once no source changed for a few seconds and on exit, not by every
+rebuild.
+
+Suggested way of running:
+
+python scripts/watch.py -m .eli-build/manifest.sqlite sources
+
+"""
+
+import io
+import json
+import logging
+from argparse import ArgumentParser
+
+from libeli.checks import SourceChecker
+from libeli.manifest import BuildManifest
+from libeli.watch import SourceWatcher, WatchUpdate
+
+parser = ArgumentParser(description="Rebuilds the ELI artifacts whenever a source changes")
+parser.add_argument("directory", nargs="*", default=["sources"], help="Source directories to watch.")
+parser.add_argument("-o", "--outdir", default=".", help="Directory to write the artifacts to.")
+parser.add_argument("-m", "--manifest", help="Path of the build manifest to keep the fragments in.")
+parser.add_argument("-j", "--jobs", type=int, help="Number of processes, defaults to the number of CPUs.")
+parser.add_argument(
+    "-i", "--interval", type=float, default=0.2, help="Seconds between polls of the sources, 0.2 by default."
+)
+parser.add_argument("--no-check", action="store_true", help="Do not check changed sources.")
+arguments = parser.parse_args()
+logging.basicConfig(level=logging.ERROR)
+
+checker = None
+if not arguments.no_check:
+    with io.open("schema.json", encoding="utf-8") as f:
+        checker = SourceChecker(json.load(f))
+
+watcher = SourceWatcher(
+    arguments.directory, arguments.outdir, BuildManifest(arguments.manifest), checker, arguments.jobs
+)
+
+
+def report(update: WatchUpdate) -> None:
+    if len(update.changed) + len(update.removed) > 10:
+        print(f"{len(update.changed)} changed and {len(update.removed)} removed sources")
+    else:
+        for path in update.changed:
+            print(f"Changed: {path}")
+        for path in update.removed:
+            print(f"Removed: {path}")
+    for path, error in update.errors.items():
+        print(f"Error in {path}: {error}")
+    if update.manifest is not None:
+        print(f"Rebuilt artifacts in {update.seconds * 1000:.0f} ms: {update.manifest}")
+
+
+print(f"Watching {', '.join(arguments.directory)}, press Ctrl+C to stop")
+try:
+    watcher.run(arguments.interval, report)
+except KeyboardInterrupt:
+    pass